@@ -0,0 +1 @@
+"""Offline benchmarks of the cleaning, LOESS and plotting stages."""
@@ -0,0 +1,72 @@
+"""Entry point for python -m benchmarks."""
+
+import argparse
+import sys
+from pathlib import Path
+
+from .suite import SIZES, STAGES, compare, run_suite, save_baseline
+
+
+def main(args: argparse.Namespace) -> int:
+    def progress(r: dict) -> None:
+        print(
+            f"{r['stage']:<24} {r['rows']:>9,} rows "
+            f"{r['seconds'] * 1e3:>11.1f} ms {r['peak_mib']:>9.1f} MiB",
+            flush=True,
+        )
+
+    results = run_suite(args.sizes, args.stages, args.repeat, progress)
+    if args.save:
+        save_baseline(results, args.save)
+    if not args.compare:
+        return 0
+    cmp = compare(results, args.compare)
+    slower = (cmp["time_ratio"] > args.threshold) & (
+        cmp["seconds"] - cmp["seconds_base"] > args.min_delta / 1e3
+    )
+    print(f"\nvs {args.compare} (time and peak memory, new / baseline):")
+    for r, slow in zip(cmp.itertuples(), slower, strict=True):
+        flag = "  SLOWER" if slow else ""
+        print(
+            f"{r.stage:<24} {r.rows:>9,} rows "
+            f"{r.time_ratio:>6.2f}x {r.mem_ratio:>6.2f}x{flag}"
+        )
+    return 1 if slower.any() else 0
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument(
+        "--sizes",
+        type=int,
+        nargs="+",
+        default=SIZES,
+        help="Table sizes in rows (default: 10^2 .. 10^6)",
+    )
+    parser.add_argument(
+        "--stages",
+        nargs="+",
+        choices=[s.name for s in STAGES],
+        help="Only run these stages",
+    )
+    parser.add_argument("--repeat", type=int, default=3, help="Timed runs per case")
+    parser.add_argument("--save", type=Path, metavar="JSON", help="Save results")
+    parser.add_argument(
+        "--compare", type=Path, metavar="JSON", help="Compare with saved results"
+    )
+    parser.add_argument(
+        "--threshold",
+        type=float,
+        default=1.25,
+        help="Time ratio above which a case counts as a regression "
+        "(exit status 1; default: %(default)s)",
+    )
+    parser.add_argument(
+        "--min-delta",
+        type=float,
+        default=5.0,
+        metavar="MS",
+        help="Ignore slowdowns smaller than this many milliseconds "
+        "(timer noise; default: %(default)s)",
+    )
+    sys.exit(main(parser.parse_args()))
@@ -0,0 +1,141 @@
+"""Import-time budget of the package and the CLI commands.
+
+Each target runs in a fresh interpreter under ``python -X importtime``; its
+import time is the sum of the cumulative times of the top-level imports that
+a bare interpreter does not make, and the modules it must not load
+(matplotlib for ``clean``, ...) are checked.
+Commands run offline in a temporary directory on a synthetic table.
+"""
+
+import argparse
+import os
+import subprocess
+import sys
+import tempfile
+from pathlib import Path
+from typing import NamedTuple
+
+from .synthetic import synthetic_table
+
+ROOT = Path(__file__).resolve().parents[1]
+HEAVY = ("matplotlib", "seaborn", "scipy", "babel", "requests", "lxml", "PIL")
+
+
+class Budget(NamedTuple):
+    """Python arguments of a target, its import-time budget and banned modules."""
+
+    name: str
+    argv: list[str]
+    max_ms: float
+    forbid: tuple[str, ...]
+
+
+def _no(*allowed: str) -> tuple[str, ...]:
+    return tuple(m for m in HEAVY if m not in allowed)
+
+
+# Budgets are two to three times the times measured when they were set; the
+# commands run in this order, each on the files written by the previous one.
+# seaborn imports scipy, so ``plot`` may load it.
+BUDGETS = [
+    Budget("import sondaggi", ["-c", "import sondaggi"], 10, (*HEAVY, "pandas")),
+    Budget("--help", ["-m", "sondaggi", "--help"], 50, (*HEAVY, "pandas")),
+    *(
+        Budget(f"import sondaggi.{m}", ["-c", f"import sondaggi.{m}"], 1000, HEAVY)
+        for m in ("data", "loess", "plot", "polls", "fetch", "store", "history")
+    ),
+    Budget(
+        "clean", ["-m", "sondaggi", "clean", "--input", "raw.csv"], 1000, _no("babel")
+    ),
+    Budget("smooth", ["-m", "sondaggi", "smooth"], 1500, _no("scipy")),
+    Budget(
+        "plot",
+        ["-m", "sondaggi", "plot", "-o", "plot.png"],
+        3000,
+        _no("matplotlib", "seaborn", "scipy", "PIL"),
+    ),
+]
+
+
+def import_times(report: str) -> dict[str, float]:
+    """Cumulative time in ms of each imported module in ``-X importtime`` output.
+
+    Nested modules are indented under the module importing them; top-level
+    ones (whose times add up to the total) have no indentation.
+    """
+    times = {}
+    for line in report.splitlines():
+        if not line.startswith("import time:") or "[us]" in line:
+            continue
+        _, cumulative, name = line.split("|")
+        times[name.rstrip()[1:]] = int(cumulative) / 1e3
+    return times
+
+
+def _run(argv: list[str], cwd: Path) -> dict[str, float]:
+    env = os.environ | {"PYTHONPATH": str(ROOT), "MPLBACKEND": "Agg"}
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", *argv],
+        cwd=cwd,
+        env=env,
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    return import_times(proc.stderr)
+
+
+def measure(
+    budget: Budget, cwd: Path, startup: set[str] = frozenset()
+) -> tuple[float, list[str]]:
+    """Import time in ms of a target and the banned modules it loaded.
+
+    Top-level modules in ``startup`` (imported by a bare interpreter) are
+    not counted.
+    """
+    times = _run(budget.argv, cwd)
+    total = sum(
+        ms
+        for name, ms in times.items()
+        if not name.startswith(" ") and name not in startup
+    )
+    loaded = {name.strip().partition(".")[0] for name in times}
+    return total, [m for m in budget.forbid if m in loaded]
+
+
+def check(budgets: list[Budget] = BUDGETS, scale: float = 1.0) -> list[dict]:
+    """Measure every target (in order, in one temporary directory)."""
+    results = []
+    with tempfile.TemporaryDirectory(prefix="sondaggi-imports-") as tmp:
+        synthetic_table(300).to_csv(Path(tmp) / "raw.csv", index=False)
+        startup = set(_run(["-c", "pass"], Path(tmp)))
+        for budget in budgets:
+            ms, loaded = measure(budget, Path(tmp), startup)
+            results.append(
+                {
+                    "target": budget.name,
+                    "ms": ms,
+                    "max_ms": budget.max_ms * scale,
+                    "forbidden": loaded,
+                    "ok": ms <= budget.max_ms * scale and not loaded,
+                }
+            )
+    return results
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument(
+        "--scale",
+        type=float,
+        default=1.0,
+        help="Multiply every budget by this factor (slower machines)",
+    )
+    results = check(scale=parser.parse_args().scale)
+    for r in results:
+        flag = "" if r["ok"] else "  OVER" if not r["forbidden"] else "  LOADS"
+        print(
+            f"{r['target']:<24} {r['ms']:>8.1f} ms / {r['max_ms']:>6.0f} ms"
+            f"{' ' + ', '.join(r['forbidden']) if r['forbidden'] else ''}{flag}"
+        )
+    sys.exit(0 if all(r["ok"] for r in results) else 1)
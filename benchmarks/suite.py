@@ -0,0 +1,240 @@
+"""Timed and memory-profiled pipeline stages on synthetic tables."""
+
+import gc
+import json
+import platform
+import subprocess
+import tempfile
+import time
+import tracemalloc
+import warnings
+from collections.abc import Callable, Iterable
+from functools import cache
+from pathlib import Path
+from typing import Any, NamedTuple
+
+import matplotlib.pyplot as plt
+import numpy as np
+import pandas as pd
+
+from sondaggi.animate import render_frames
+from sondaggi.data import (
+    merge_same_date,
+    parse_rows,
+    prepare_chunks,
+    prepare_data,
+    read_raw_chunks,
+)
+from sondaggi.loess import loess, loess_asof, loess_bootstrap, lowess
+from sondaggi.plot import house_effects, loess_curves, plot_loess
+from sondaggi.polls import Polls
+
+from .synthetic import synthetic_table
+
+SIZES = [10**e for e in range(2, 7)]
+FRAC = 0.4
+_TMP = tempfile.TemporaryDirectory(prefix="sondaggi-bench-")  # removed at exit
+
+
+class Stage(NamedTuple):
+    """A benchmarked call: ``setup(n)`` builds its input, ``run`` is timed."""
+
+    name: str
+    setup: Callable[[int], Any]
+    run: Callable[[Any], Any]
+    max_rows: int = SIZES[-1]  # LOESS stages cost ~ n * frac * n
+
+
+@cache
+def _clean(n: int) -> pd.DataFrame:
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore")
+        return prepare_data(synthetic_table(n))
+
+
+def _edited(n: int) -> tuple[pd.DataFrame, pd.DataFrame]:
+    """1% of the rows edited, and the row index of the unedited table."""
+    raw = synthetic_table(n)
+    edited = raw.copy()
+    edited.loc[::100, "Sì"] = "50,0%"
+    return edited, parse_rows(raw)
+
+
+def _csv(n: int) -> Path:
+    path = Path(_TMP.name) / f"raw_{n}.csv"
+    synthetic_table(n).to_csv(path, index=False)
+    return path
+
+
+def _xyw(n: int) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+    df = _clean(n)
+    days = (df["date"] - df["date"].min()).dt.days.to_numpy(float)
+    return days, df["yes_norm"].to_numpy(), df["sample_size"].fillna(1).to_numpy()
+
+
+def _quiet(fn: Callable, *args, **kwargs) -> Any:
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore")
+        return fn(*args, **kwargs)
+
+
+def _plot(args: tuple[pd.DataFrame, pd.DataFrame]) -> None:
+    df, curves = args
+    with tempfile.TemporaryDirectory() as tmp:
+        plot_loess(df, FRAC, Path(tmp) / "plot.png", curves=curves)
+    plt.close("all")
+
+
+def _frames(df: pd.DataFrame) -> None:
+    """20 time-lapse frames, at evenly spaced cutoffs."""
+    cutoffs = pd.date_range(df["date"].min(), df["date"].max(), periods=20)
+    with tempfile.TemporaryDirectory() as tmp:
+        render_frames(df, FRAC, Path(tmp), cutoffs, grid=500, processes=1)
+
+
+STAGES = [
+    Stage("prepare_data", synthetic_table, lambda raw: _quiet(prepare_data, raw)),
+    Stage("parse_rows_incremental", _edited, lambda a: parse_rows(*a)),
+    Stage(
+        "prepare_chunks",
+        _csv,
+        lambda path: _quiet(prepare_chunks, read_raw_chunks([path])),
+    ),
+    Stage("merge_same_date", _clean, merge_same_date),
+    Stage("merge_same_date_week", _clean, lambda df: merge_same_date(df, "W")),
+    Stage("lowess", _xyw, lambda a: lowess(*a, FRAC), max_rows=10**4),
+    Stage("polls_from_frame", _clean, Polls.from_frame),
+    Stage(
+        "loess_grid",
+        _clean,
+        lambda df: loess(
+            df["date"], df[["yes_norm", "no_norm"]], FRAC, df["sample_size"], grid=500
+        ),
+    ),
+    Stage(
+        "loess_curves_polls",
+        lambda n: Polls.from_frame(_clean(n)),
+        lambda polls: loess_curves(polls, FRAC, grid=500),
+    ),
+    Stage(
+        "house_effects",
+        lambda n: Polls.from_frame(_clean(n)),
+        lambda polls: house_effects(polls, FRAC),
+        max_rows=10**4,
+    ),
+    Stage(
+        "loess_bootstrap",
+        _clean,
+        lambda df: loess_bootstrap(
+            df["date"],
+            df[["yes_norm", "no_norm"]],
+            FRAC,
+            df["sample_size"],
+            n_boot=100,
+            grid=200,
+            processes=1,
+        ),
+        max_rows=10**4,
+    ),
+    Stage(
+        "loess_asof",
+        _clean,
+        lambda df: loess_asof(
+            df["date"],
+            df[["yes_norm", "no_norm"]],
+            FRAC,
+            df["sample_size"],
+            grid=200,
+            processes=1,
+        ),
+        max_rows=10**4,
+    ),
+    Stage(
+        "plot_render",
+        lambda n: (_clean(n), loess_curves(_clean(n), FRAC, grid=500)),
+        _plot,
+        max_rows=10**5,
+    ),
+    Stage("render_frames", _clean, _frames, max_rows=10**5),
+]
+
+
+def measure(stage: Stage, n: int, repeat: int = 3) -> dict:
+    """Best wall time of ``repeat`` runs and peak traced memory of one more."""
+    arg = stage.setup(n)
+    times = []
+    for _ in range(repeat):
+        gc.collect()
+        t0 = time.perf_counter()
+        stage.run(arg)
+        times.append(time.perf_counter() - t0)
+    gc.collect()
+    tracemalloc.start()
+    try:
+        stage.run(arg)
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return {
+        "stage": stage.name,
+        "rows": n,
+        "seconds": min(times),
+        "peak_mib": peak / 2**20,
+    }
+
+
+def run_suite(
+    sizes: Iterable[int] = SIZES,
+    stages: Iterable[str] | None = None,
+    repeat: int = 3,
+    progress: Callable[[dict], None] | None = None,
+) -> list[dict]:
+    """Measure every selected stage at every size up to its ``max_rows``."""
+    wanted = None if stages is None else set(stages)
+    results = []
+    for stage in STAGES:
+        if wanted is not None and stage.name not in wanted:
+            continue
+        for n in sizes:
+            if n <= stage.max_rows:
+                results.append(measure(stage, n, repeat))
+                if progress:
+                    progress(results[-1])
+    return results
+
+
+def environment() -> dict:
+    """Versions and commit the results were taken with."""
+    try:
+        commit = subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            capture_output=True,
+            text=True,
+            check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        commit = None
+    return {
+        "commit": commit,
+        "python": platform.python_version(),
+        "numpy": np.__version__,
+        "pandas": pd.__version__,
+        "machine": platform.machine(),
+    }
+
+
+def save_baseline(results: list[dict], path: Path) -> None:
+    path.write_text(
+        json.dumps({"environment": environment(), "results": results}, indent=2)
+    )
+
+
+def compare(results: list[dict], baseline_path: Path) -> pd.DataFrame:
+    """Results joined with a saved baseline, with new / baseline ratios."""
+    base = pd.DataFrame(json.loads(baseline_path.read_text())["results"])
+    cur = pd.DataFrame(results)
+    both = cur.merge(base, on=["stage", "rows"], suffixes=("", "_base"))
+    return both.assign(
+        time_ratio=both["seconds"] / both["seconds_base"],
+        mem_ratio=both["peak_mib"] / both["peak_mib_base"],
+    )
@@ -0,0 +1,96 @@
+"""Synthetic raw polling tables shaped like the Wikipedia Sondaggi table."""
+
+from datetime import date, timedelta
+from functools import cache
+
+import numpy as np
+import pandas as pd
+from babel.dates import format_date
+
+RAW_COLUMNS = [
+    "Data pubblicazione",
+    "Istituto",
+    "Committente",
+    "Campione",
+    "Margine di errore",
+    "Sì",
+    "No",
+    "Indeciso",
+    "Distacco",
+]
+INSTITUTES = ["Ipsos", "SWG", "Tecnè", "Noto", "Euromedia", "Demopolis", "YouTrend"]
+CLIENTS = ["Corriere della Sera", "La7", "Porta a Porta", "Agi", "—"]
+START = date(2020, 1, 1)
+MAX_DAYS = 20 * 365
+
+
+def _italian(day: date) -> str:
+    return format_date(day, "d MMMM y", locale="it_IT")
+
+
+def _percent(tenths: np.ndarray) -> np.ndarray:
+    """Percentages given in tenths of a point, as "44,5%" strings."""
+    pool = np.array([f"{t // 10},{t % 10}%" for t in range(1001)], dtype=object)
+    return pool[np.clip(tenths, 0, 1000)]
+
+
+def _with_refs(cells: np.ndarray, rng: np.random.Generator, p: float) -> np.ndarray:
+    """Append "[n]" citation refs to a fraction p of the cells."""
+    refs = np.array([f"[{i}]" for i in range(1, 100)], dtype=object)
+    hit = rng.random(len(cells)) < p
+    cells = cells.copy()
+    cells[hit] = cells[hit] + refs[rng.integers(0, len(refs), hit.sum())]
+    return cells
+
+
+@cache
+def synthetic_table(n: int, seed: int = 0) -> pd.DataFrame:
+    """Raw table of n rows, as read from ``sondaggi.csv`` (all text).
+
+    Polls are spread over up to 20 years from 2020 with several polls per
+    day (same-day duplicates grow with n), and carry the quirks the cleaner
+    handles: Italian long dates, "[n]" refs on dates and institutes,
+    "±" margins, "1.000" thousands separators, "N.D." cells, about 1% of
+    month separator rows and a few unparseable cells. Cached per (n, seed);
+    callers must not modify the result.
+    """
+    rng = np.random.default_rng(seed)
+    days = min(n // 3 + 30, MAX_DAYS)
+    names = np.array(
+        [_italian(START + timedelta(days=d)) for d in range(days)], dtype=object
+    )
+    day = np.sort(rng.integers(0, days, n))
+    yes = rng.normal(480, 40, n).astype(int)
+    undecided = rng.integers(0, 250, n)
+    no = 1000 - yes - undecided
+    size = rng.integers(50, 300, n) * 10
+    sizes = pd.Series(size).map("{:,}".format).str.replace(",", ".").to_numpy(object)
+    margin = np.array([f"±{m / 10:.1f}".replace(".", ",") for m in range(15, 60)])
+    table = pd.DataFrame(
+        {
+            "Data pubblicazione": _with_refs(names[day], rng, 0.3),
+            "Istituto": _with_refs(
+                np.array(INSTITUTES, dtype=object)[rng.integers(0, 7, n)], rng, 0.1
+            ),
+            "Committente": np.array(CLIENTS, dtype=object)[rng.integers(0, 5, n)],
+            "Campione": sizes,
+            "Margine di errore": margin[rng.integers(0, len(margin), n)].astype(object),
+            "Sì": _percent(yes),
+            "No": _percent(no),
+            "Indeciso": _percent(undecided),
+            "Distacco": np.abs(yes - no).astype(str).astype(object),
+        }
+    )
+    nd = rng.random((n, 3)) < [0.05, 0.05, 0.01]
+    table.loc[nd[:, 0], "Campione"] = "N.D."
+    table.loc[nd[:, 1], "Indeciso"] = "N.D."
+    table.loc[nd[:, 2], "Sì"] = "N.D."
+    table.loc[rng.random(n) < 0.002, "Data pubblicazione"] = "32 gennaio 2026"
+    separators = np.flatnonzero(rng.random(n) < 0.01)
+    month = (
+        pd.Series(names[day[separators]]).str.split(" ", n=1).str[1].str.capitalize()
+    )
+    table.loc[separators, RAW_COLUMNS] = np.repeat(
+        month.to_numpy(object)[:, None], len(RAW_COLUMNS), axis=1
+    )
+    return table.astype("str")
@@ -1 +1,30 @@
-"""Referendum 2026 polling analysis. Fetch polls, prepare data, and plot LOESS."""
+"""Referendum 2026 polling analysis. Fetch polls, prepare data, and plot LOESS.
+
+Submodules are imported on first access (``sondaggi.plot``), so importing
+the package loads nothing else.
+"""
+
+import importlib
+
+SUBMODULES = (
+    "animate",
+    "cache",
+    "data",
+    "fetch",
+    "history",
+    "instrument",
+    "loess",
+    "plot",
+    "polls",
+    "store",
+)
+
+
+def __getattr__(name: str):
+    if name in SUBMODULES:
+        return importlib.import_module(f".{name}", __name__)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
+def __dir__() -> list[str]:
+    return sorted({*globals(), *SUBMODULES})
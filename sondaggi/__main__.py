@@ -1,38 +1,542 @@
-"""Entry point for python -m sondaggi."""
+"""Entry point for python -m sondaggi.
+
+Without a command the whole pipeline runs; ``fetch``, ``clean``, ``smooth``
+and ``plot`` run one step from the files the previous one wrote. Only the
+standard library is imported here: each step imports what it uses, so
+``--help`` or ``clean`` never load matplotlib, scipy or requests.
+"""
 
 import argparse
+import sys
+from contextlib import nullcontext
 from datetime import date
 from pathlib import Path
 
-import pandas as pd
-
-from .data import prepare_data
-from .fetch import download_sondaggi
-from .plot import plot_loess
+from .instrument import Profiler, stage
 
 CSV_RAW = Path("sondaggi.csv")
 CSV_CLEAN = Path("sondaggi_clean.csv")
+CSV_CURVES = Path("sondaggi_curves.csv")
+CSV_HOUSE = Path("sondaggi_house_effects.csv")
+STORE_CLEAN = Path("sondaggi_clean.store")
+CACHE_DIR = Path(".sondaggi_cache")
+HISTORY_DIR = Path("sondaggi_history")
+ROWS_FILE = "rows.pkl"  # row-hash index of the last cleaned table
+
+
+def _stage_cache(args: argparse.Namespace):
+    from .cache import StageCache
+
+    return StageCache(args.cache_dir / "stages", force=args.force)
+
+
+def _fetch(args: argparse.Namespace) -> bool:
+    """Download the table to CSV_RAW, snapshotting it when it changed.
+
+    False if it is unchanged and ``--if-changed`` asks to stop there.
+    """
+    import pandas as pd
+
+    from .fetch import download_sondaggi
+    from .history import SnapshotHistory
+
+    history = SnapshotHistory(args.history_dir)
+    with stage("fetch"):
+        changed = download_sondaggi(
+            CSV_RAW, cache_dir=args.cache_dir / "http", section=args.section
+        )
+    if args.if_changed and not changed:
+        print("Wikipedia page unchanged since last run; nothing to do.")
+        return False
+    if changed or history.snapshots.empty:
+        with stage("snapshot"):
+            history.append(pd.read_csv(CSV_RAW, dtype=str))
+    return True
+
+
+def _as_of(args: argparse.Namespace) -> bytes:
+    """Raw CSV bytes of the table as recorded in the history at --as-of."""
+    from .history import SnapshotHistory
+
+    table = SnapshotHistory(args.history_dir).as_of(args.as_of)
+    if table.empty:
+        raise SystemExit(f"No snapshot in {args.history_dir} by {args.as_of}.")
+    return table.to_csv(index=False).encode()
+
+
+def _clean(raw: bytes, args: argparse.Namespace, merge: bool):
+    """prepare_data, parsing only the raw rows not seen in the previous run."""
+    from io import BytesIO
+
+    import pandas as pd
+
+    from .cache import code_version
+    from .data import parse_rows, prepare_data
+
+    df = pd.read_csv(BytesIO(raw), dtype=str)
+    path = args.cache_dir / ROWS_FILE
+    known = None
+    if path.exists() and not args.force:
+        known = pd.read_pickle(path)
+        if known.attrs.get("code") != code_version():
+            known = None
+    with stage("parse_rows", rows_in=len(df)) as record:
+        rows = parse_rows(df, known)
+        record["rows_out"] = len(rows)
+    index = rows[~rows.index.duplicated()]
+    index.attrs |= {"code": code_version()}
+    path.parent.mkdir(parents=True, exist_ok=True)
+    index.to_pickle(path)
+    return prepare_data(
+        df,
+        merge=merge,
+        start_date=args.start_date,
+        merge_window=args.merge_window,
+        with_rejected=True,
+        rows=rows,
+    )
+
+
+def _clean_step(args: argparse.Namespace, raw: bytes | None, cache):
+    """Clean --input, or ``raw``, and write CSV_CLEAN, STORE_CLEAN, --rejected.
+
+    Returns the cleaned polls and the key of the clean stage.
+    """
+    from .cache import file_digest, stage_key
+    from .data import prepare_chunks, read_raw_chunks, write_rejected
+    from .store import write_store
+
+    merge = args.merge or args.merge_window is not None
+    if args.input:
+        source = [file_digest(path) for path in args.input]
+
+        def clean():
+            return prepare_chunks(
+                read_raw_chunks(args.input, args.chunksize),
+                merge=merge,
+                start_date=args.start_date,
+                merge_window=args.merge_window,
+                with_rejected=True,
+            )
+    else:
+        source = raw
+
+        def clean():
+            return _clean(raw, args, merge)
+
+    clean_key = stage_key("clean", source, merge, args.merge_window, args.start_date)
+    with stage("clean") as record:
+        df, rejected = cache.run(clean_key, clean)
+        record["rows_out"] = len(df)
+    with stage("write", rows_in=len(df)):
+        if args.rejected:
+            write_rejected(rejected, args.rejected)
+        df.to_csv(CSV_CLEAN, index=False)
+        write_store(df, STORE_CLEAN)
+    return df, clean_key
+
+
+def _read_clean():
+    """Cleaned polls (``Polls``) from STORE_CLEAN and a key of their content."""
+    import pandas as pd
+
+    from .cache import stage_key
+    from .polls import Polls
+    from .store import read_store
+
+    if not STORE_CLEAN.exists():
+        raise SystemExit(f"No {STORE_CLEAN}; run `python -m sondaggi clean` first.")
+    df = read_store(STORE_CLEAN, mmap=False)
+    digest = pd.util.hash_pandas_object(df, index=False).to_numpy().tobytes()
+    return Polls.from_frame(df), stage_key("store", digest)
+
+
+def _smooth_step(args: argparse.Namespace, polls, clean_key: str, cache):
+    """Smooth the polls (and --backtest) and write CSV_CURVES, and CSV_HOUSE
+    with --house-effects (removing a stale one otherwise).
+
+    Returns the frac used, the curves, the house effects (or None) and the
+    key of the smooth stage.
+    """
+    from .cache import stage_key
+    from .plot import asof_curves, auto_frac, house_effects, loess_curves
+
+    frac = args.frac
+    if frac == "auto":
+        with stage("select_frac", rows_in=len(polls)):
+            frac, _ = cache.run(
+                stage_key("frac", clean_key, args.frac_criterion),
+                lambda: auto_frac(polls, args.frac_criterion),
+            )
+        print(f"Selected frac={frac:.2f} by {args.frac_criterion.upper()}.")
+    house, reference = None, args.house_reference
+    CSV_HOUSE.unlink(missing_ok=True)
+    if args.house_effects:
+        if reference is not None and reference not in polls.pollsters:
+            raise SystemExit(f"No polls by istituto {reference!r}.")
+        house = cache.run(
+            stage_key("house", clean_key, frac, reference),
+            lambda: house_effects(polls, frac, reference),
+        )
+        house.to_csv(CSV_HOUSE)
+    smooth_key = stage_key(
+        "smooth",
+        clean_key,
+        frac,
+        args.grid,
+        args.bootstrap,
+        args.sampling_error,
+        args.house_effects,
+        reference,
+    )
+    with stage("smooth", rows_in=len(polls)) as record:
+        curves = cache.run(
+            smooth_key,
+            lambda: loess_curves(
+                polls, frac, args.grid, args.bootstrap, args.sampling_error, house
+            ),
+        )
+        record["rows_out"] = len(curves)
+    curves.assign(frac=frac).to_csv(CSV_CURVES, index=False)
+    if args.backtest:
+        with stage("backtest", rows_in=len(polls)):
+            cache.file(
+                stage_key("backtest", clean_key, frac),
+                args.backtest,
+                lambda: asof_curves(polls, frac).to_csv(args.backtest, index=False),
+            )
+    return frac, curves, house, smooth_key
+
+
+def _read_curves():
+    """Frac, curves (CSV_CURVES) and house effects (CSV_HOUSE, if any) written
+    by ``smooth``, and a key of their content."""
+    import pandas as pd
+
+    from .cache import file_digest, stage_key
+
+    if not CSV_CURVES.exists():
+        raise SystemExit(f"No {CSV_CURVES}; run `python -m sondaggi smooth` first.")
+    curves = pd.read_csv(CSV_CURVES, parse_dates=["date"])
+    frac = float(curves.pop("frac").iloc[0])
+    house, digests = None, [file_digest(CSV_CURVES)]
+    if CSV_HOUSE.exists():
+        house = pd.read_csv(CSV_HOUSE, index_col="istituto")
+        digests.append(file_digest(CSV_HOUSE))
+    return frac, curves, house, stage_key("curves", digests)
+
+
+def _plot_step(args: argparse.Namespace, polls, frac: float, curves, house, key, cache):
+    """Draw the chart (and --animate) from the polls and their curves, with
+    the polls corrected for ``house`` effects if given."""
+    from .cache import stage_key
+
+    if args.animate:
+        from .animate import animate
+
+        with stage("animate", rows_in=len(polls)):
+            animate(polls, frac, args.animate, fps=args.fps)
+    from .plot import plot_loess
+
+    if args.output is None:
+        plot_loess(polls, frac, curves=curves, house=house)
+        return
+    with stage("plot"):
+        cache.file(
+            stage_key("plot", key),
+            args.output,
+            lambda: plot_loess(polls, frac, args.output, curves=curves, house=house),
+        )
+
+
+def run_fetch(args: argparse.Namespace, cache) -> None:
+    _fetch(args)
+
+
+def run_clean(args: argparse.Namespace, cache) -> None:
+    if args.input:
+        raw = None
+    elif args.as_of:
+        raw = _as_of(args)
+    elif CSV_RAW.exists():
+        raw = CSV_RAW.read_bytes()
+    else:
+        raise SystemExit(f"No {CSV_RAW}; run `python -m sondaggi fetch` first.")
+    _clean_step(args, raw, cache)
+
+
+def run_smooth(args: argparse.Namespace, cache) -> None:
+    polls, key = _read_clean()
+    _smooth_step(args, polls, key, cache)
+
+
+def run_plot(args: argparse.Namespace, cache) -> None:
+    polls, clean_key = _read_clean()
+    frac, curves, house, curves_key = _read_curves()
+    _plot_step(args, polls, frac, curves, house, f"{clean_key}-{curves_key}", cache)
+
+
+def run_all(args: argparse.Namespace, cache) -> None:
+    """The whole pipeline in one process: fetch, clean, smooth and plot."""
+    raw = None
+    if args.as_of:
+        raw = _as_of(args)
+    elif not args.input:
+        if not _fetch(args):
+            return
+        raw = CSV_RAW.read_bytes()
+    from .polls import Polls
+
+    df, clean_key = _clean_step(args, raw, cache)
+    polls = Polls.from_frame(df)  # typed and sorted once for every later stage
+    frac, curves, house, smooth_key = _smooth_step(args, polls, clean_key, cache)
+    _plot_step(args, polls, frac, curves, house, smooth_key, cache)
 
 
 def main(args: argparse.Namespace) -> None:
-    download_sondaggi(CSV_RAW)
-    df = prepare_data(
-        pd.read_csv(CSV_RAW), merge=args.merge, start_date=args.start_date
+    profiler = None
+    if args.profile or args.cprofile:
+        profiler = Profiler(args.cprofile, args.cprofile_out)
+    cache = _stage_cache(args)
+    with profiler or nullcontext():
+        args.command(args, cache)
+    if args.profile == "-":
+        print(profiler.table(), file=sys.stderr)
+    elif args.profile:
+        profiler.write(Path(args.profile))
+    cache.evict(
+        max_bytes=None if args.cache_max_mb is None else int(args.cache_max_mb * 2**20),
+        max_age=None if args.cache_max_age is None else args.cache_max_age * 86400,
     )
-    df.to_csv(CSV_CLEAN, index=False)
-    plot_loess(df, args.frac, args.output)
 
 
-if __name__ == "__main__":
-    parser = argparse.ArgumentParser()
-    parser.add_argument("--frac", type=float, default=0.4)
-    parser.add_argument("-o", "--output", type=Path, default=None)
-    parser.add_argument(
+def _parsers(suppress: bool = False) -> dict[str, argparse.ArgumentParser]:
+    """Option groups, as parent parsers shared by the commands using them.
+
+    With ``suppress`` the options have no default, for the commands: the
+    top-level parser sets the defaults, so options given before the command
+    are not overwritten.
+    """
+    common = argparse.ArgumentParser(add_help=False)
+    common.add_argument(
+        "--cache-dir",
+        type=Path,
+        default=CACHE_DIR,
+        help="Directory for cached downloads and stages (default: %(default)s)",
+    )
+    common.add_argument(
+        "--force",
+        action="store_true",
+        help="Recompute every stage, ignoring cached results",
+    )
+    common.add_argument(
+        "--cache-max-mb",
+        type=float,
+        default=None,
+        metavar="MB",
+        help="Evict least recently used stage results above this size",
+    )
+    common.add_argument(
+        "--cache-max-age",
+        type=float,
+        default=None,
+        metavar="DAYS",
+        help="Evict stage results unused for this many days",
+    )
+    common.add_argument(
+        "--profile",
+        nargs="?",
+        const="-",
+        metavar="PATH",
+        help="Report wall/CPU time, peak memory and rows per stage, on stderr "
+        "or to PATH (.json for JSON)",
+    )
+    common.add_argument(
+        "--cprofile",
+        metavar="STAGE",
+        help="Run STAGE (e.g. clean, smooth, loess) under cProfile",
+    )
+    common.add_argument(
+        "--cprofile-out",
+        type=Path,
+        metavar="PATH",
+        help="Where to dump the --cprofile stats (default: STAGE.prof)",
+    )
+
+    history = argparse.ArgumentParser(add_help=False)
+    history.add_argument(
+        "--history-dir",
+        type=Path,
+        default=HISTORY_DIR,
+        help="Append-only snapshot history of the raw table (default: %(default)s)",
+    )
+
+    fetch = argparse.ArgumentParser(add_help=False)
+    fetch.add_argument(
+        "--section",
+        type=int,
+        default=None,
+        help="Fetch only this section of the page via the MediaWiki parse API",
+    )
+    fetch.add_argument(
+        "--if-changed",
+        action="store_true",
+        help="Stop after fetching if the Wikipedia page has not changed",
+    )
+
+    clean = argparse.ArgumentParser(add_help=False)
+    clean.add_argument(
         "--merge", action="store_true", help="Merge polls on the same date"
     )
-    parser.add_argument(
+    clean.add_argument(
+        "--merge-window",
+        metavar="W|ND",
+        help="Merge polls in the same ISO week (W) or N-day bin (e.g. 3D)",
+    )
+    clean.add_argument(
+        "--rejected",
+        type=Path,
+        metavar="PATH",
+        help="Write rejected raw rows with their reason (.csv, or .json with counts)",
+    )
+    clean.add_argument(
+        "--input",
+        type=Path,
+        nargs="+",
+        metavar="CSV",
+        help="Clean these raw CSVs (e.g. a multi-source archive) in chunks "
+        "instead of fetching the table from Wikipedia",
+    )
+    clean.add_argument(
+        "--chunksize",
+        type=int,
+        default=50_000,
+        metavar="ROWS",
+        help="Rows per chunk with --input (default: %(default)s)",
+    )
+    clean.add_argument(
+        "--as-of",
+        metavar="DATE",
+        help="Use the table as recorded in the history at DATE (YYYY-MM-DD or "
+        "ISO time, UTC) instead of fetching it",
+    )
+    clean.add_argument(
         "--start-date",
         type=date.fromisoformat,
         help="Consider only polls from this date (YYYY-MM-DD) onwards",
     )
-    main(parser.parse_args())
+
+    smooth = argparse.ArgumentParser(add_help=False)
+    smooth.add_argument(
+        "--frac",
+        type=lambda v: v if v == "auto" else float(v),
+        default=0.4,
+        help="LOESS smoothing fraction, or 'auto' to select it by cross-validation",
+    )
+    smooth.add_argument(
+        "--frac-criterion",
+        choices=["gcv", "loocv"],
+        default="gcv",
+        help="Criterion for --frac auto (default: %(default)s)",
+    )
+    smooth.add_argument(
+        "--grid",
+        type=int,
+        default=None,
+        help="Evaluate LOESS directly on this many grid points (no interpolation)",
+    )
+    smooth.add_argument(
+        "--bootstrap",
+        type=int,
+        default=0,
+        metavar="N",
+        help="Shade 95%% bootstrap bands from N replicates",
+    )
+    smooth.add_argument(
+        "--sampling-error",
+        action="store_true",
+        help="Add per-poll binomial sampling error to bootstrap replicates",
+    )
+    smooth.add_argument(
+        "--house-effects",
+        action="store_true",
+        help="Fit a house effect per istituto jointly with the trend "
+        f"(backfitting), write them to {CSV_HOUSE} and correct the polls",
+    )
+    smooth.add_argument(
+        "--house-reference",
+        metavar="ISTITUTO",
+        help="With --house-effects, measure the effects from this istituto's "
+        "instead of making them sum to zero",
+    )
+    smooth.add_argument(
+        "--backtest",
+        type=Path,
+        metavar="CSV",
+        help="Write the curve as estimated on each poll date (cutoff, date, "
+        "yes_norm, no_norm), using only the polls published by then",
+    )
+
+    plot = argparse.ArgumentParser(add_help=False)
+    plot.add_argument("-o", "--output", type=Path, default=None)
+    plot.add_argument(
+        "--animate",
+        type=Path,
+        metavar="PATH",
+        help="Time-lapse of the curve over the poll dates: .gif, .mp4 (ffmpeg) "
+        "or a directory of numbered PNG frames",
+    )
+    plot.add_argument(
+        "--fps",
+        type=float,
+        default=10,
+        help="Frames per second with --animate (default: %(default)s)",
+    )
+    groups = {
+        "common": common,
+        "history": history,
+        "fetch": fetch,
+        "clean": clean,
+        "smooth": smooth,
+        "plot": plot,
+    }
+    if suppress:
+        for group in groups.values():
+            for action in group._actions:
+                if action.help:
+                    default = str(action.default)
+                    action.help = action.help.replace("%(default)s", default)
+                action.default = argparse.SUPPRESS
+    return groups
+
+
+def _parser() -> argparse.ArgumentParser:
+    """The command line: the whole pipeline, or one step per command."""
+    parser = argparse.ArgumentParser(
+        prog="python -m sondaggi",
+        description="Without a command, run fetch, clean, smooth and plot in turn.",
+        parents=list(_parsers().values()),
+    )
+    groups = _parsers(suppress=True)
+    parser.set_defaults(command=run_all)
+    commands = parser.add_subparsers(title="commands", metavar="COMMAND")
+    for name, run, uses, help in [
+        ("fetch", run_fetch, ["history", "fetch"], f"Download the table to {CSV_RAW}"),
+        (
+            "clean",
+            run_clean,
+            ["history", "clean"],
+            f"Clean {CSV_RAW} (or --input, --as-of) to {CSV_CLEAN} and {STORE_CLEAN}",
+        ),
+        ("smooth", run_smooth, ["smooth"], f"Smooth {STORE_CLEAN} to {CSV_CURVES}"),
+        ("plot", run_plot, ["plot"], f"Plot {STORE_CLEAN} and {CSV_CURVES}"),
+    ]:
+        sub = commands.add_parser(
+            name, help=help, parents=[groups["common"], *(groups[g] for g in uses)]
+        )
+        sub.set_defaults(command=run)
+    return parser
+
+
+if __name__ == "__main__":
+    main(_parser().parse_args())
@@ -0,0 +1,190 @@
+"""Time-lapse of the LOESS curves as the polls come in, one frame per cutoff."""
+
+import shutil
+import subprocess
+import tempfile
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+from pathlib import Path
+
+import matplotlib as mpl
+import matplotlib.dates as mdates
+import numpy as np
+import pandas as pd
+import seaborn as sns
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+from matplotlib.figure import Figure
+from PIL import Image
+
+from .plot import SERIES, _sizes, as_polls, asof_fits
+from .polls import Polls
+
+FRAME_PATTERN = "frame_{:05d}.png"
+# Frames per rendering task; each task sets up its figure once.
+_FRAME_CHUNK = 25
+# zlib level of the frame PNGs: intermediates, so favour speed over size.
+_PNG_LEVEL = 1
+
+
+def _title(cutoff: pd.Timestamp) -> str:
+    return (
+        "Regressione LOESS dei Sondaggi Referendum 2026\n"
+        f"(sondaggi pubblicati fino al {cutoff:%d/%m/%Y})"
+    )
+
+
+def _render_chunk(
+    polls: Polls,
+    frac: float,
+    out_dir: Path,
+    dpi: int,
+    first: int,
+    fits: pd.DataFrame,
+) -> list[Path]:
+    """Draw frames first, first + 1, ... for the cutoffs (rows) of ``fits``.
+
+    The figure and its static parts (axes, ticks, legend) are drawn once on
+    the Agg canvas; each frame restores that background, updates the polls
+    shown, the curves and the title, and redraws only those (blitting).
+    """
+    sizes = _sizes(polls)
+    x = mdates.date2num(polls.dates)
+    t = mdates.date2num(fits[SERIES[0][0]].columns)
+    with sns.axes_style("whitegrid"):
+        fig = Figure(figsize=(12, 6), dpi=dpi)
+        canvas = FigureCanvasAgg(fig)
+        ax = fig.subplots()
+    artists = []
+    for col, label, (sc, lc) in SERIES:
+        y = polls.share(col)
+        dots = ax.scatter(
+            polls.dates, y, alpha=0.4, s=sizes, label=f"{label} (raw)", color=sc
+        )
+        weighted = "weighted " if polls.weighted else ""
+        (line,) = ax.plot(
+            [],
+            [],
+            linewidth=1.5,
+            label=f"{label} ({weighted}LOESS, frac={frac:.2f})",
+            color=lc,
+        )
+        artists.append((y, fits[col].to_numpy(), dots, line))
+    ax.set(xlim=(x.min(), x.max()), xlabel="Data")
+    ax.set_ylabel("Percentuale normalizzata (%)")
+    ax.legend(loc="upper left")
+    ax.grid(True, alpha=0.3)
+    ax.tick_params(axis="x", labelrotation=45)
+    title = ax.set_title(_title(fits.index[0]))
+    fig.tight_layout()
+    animated = [title] + [a for *_, dots, line in artists for a in (dots, line)]
+    for artist in animated:
+        artist.set_animated(True)
+    canvas.draw()
+    background = canvas.copy_from_bbox(fig.bbox)
+    paths = []
+    for r, cutoff in enumerate(fits.index):
+        n = np.searchsorted(x, mdates.date2num(cutoff), side="right")
+        for y, fit, dots, line in artists:
+            dots.set_offsets(np.column_stack([x[:n], y[:n]]))
+            dots.set_sizes(sizes[:n])
+            shown = ~np.isnan(fit[r])
+            line.set_data(t[shown], fit[r][shown])
+        title.set_text(_title(cutoff))
+        canvas.restore_region(background)
+        for artist in animated:
+            fig.draw_artist(artist)
+        paths.append(out_dir / FRAME_PATTERN.format(first + r))
+        frame = Image.frombuffer(
+            "RGBA", canvas.get_width_height(), canvas.buffer_rgba()
+        )
+        frame.convert("RGB").save(paths[-1], compress_level=_PNG_LEVEL)
+    return paths
+
+
+def render_frames(
+    df: pd.DataFrame | Polls,
+    frac: float,
+    out_dir: Path,
+    cutoffs: pd.DatetimeIndex | None = None,
+    grid: int | None = None,
+    dpi: int = 100,
+    processes: int | None = None,
+) -> list[Path]:
+    """Write one numbered PNG per cutoff (default: every poll date) to out_dir.
+
+    Frame i shows the polls published by cutoff i and the curves fitted from
+    them (``loess_asof``). Frames are rendered in fixed-size chunks on a
+    process pool of ``processes`` workers (1 runs inline), which receive the
+    compact ``Polls`` rather than the DataFrame.
+    """
+    out_dir.mkdir(parents=True, exist_ok=True)
+    polls = as_polls(df)
+    fits = asof_fits(polls, frac, cutoffs, grid, processes)
+    starts = range(0, len(fits), _FRAME_CHUNK)
+    chunks = [fits.iloc[a : a + _FRAME_CHUNK] for a in starts]
+    task = partial(_render_chunk, polls, frac, out_dir, dpi)
+    if processes == 1 or len(chunks) <= 1:
+        parts = list(map(task, starts, chunks))
+    else:
+        with ProcessPoolExecutor(processes) as ex:
+            parts = list(ex.map(task, starts, chunks))
+    return [path for part in parts for path in part]
+
+
+def animate(
+    df: pd.DataFrame | Polls,
+    frac: float,
+    output: Path,
+    cutoffs: pd.DatetimeIndex | None = None,
+    grid: int | None = None,
+    fps: float = 10,
+    dpi: int = 100,
+    processes: int | None = None,
+) -> None:
+    """Time-lapse of ``render_frames``: a GIF for a ``.gif`` output, a video
+    encoded with ffmpeg for any other suffix (e.g. ``.mp4``), or the numbered
+    PNG frames themselves in an ``output`` directory without a suffix.
+    """
+    if not output.suffix:
+        render_frames(df, frac, output, cutoffs, grid, dpi, processes)
+        return
+    ffmpeg = shutil.which(mpl.rcParams["animation.ffmpeg_path"])
+    if output.suffix.lower() != ".gif" and ffmpeg is None:
+        raise RuntimeError(f"ffmpeg is needed to write {output.suffix} animations")
+    with tempfile.TemporaryDirectory() as tmp:
+        frames = render_frames(df, frac, Path(tmp), cutoffs, grid, dpi, processes)
+        if not frames:
+            raise ValueError("No cutoffs to animate")
+        if output.suffix.lower() == ".gif":
+            # One palette for all frames, from the last (it shows every poll).
+            palette = Image.open(frames[-1]).quantize(255, dither=Image.Dither.NONE)
+            gif = (
+                Image.open(path).quantize(palette=palette, dither=Image.Dither.NONE)
+                for path in frames
+            )
+            next(gif).save(
+                output,
+                save_all=True,
+                append_images=gif,
+                duration=1000 / fps,
+                loop=0,
+            )
+            return
+        subprocess.run(
+            [
+                ffmpeg,
+                "-y",
+                "-loglevel",
+                "error",
+                "-framerate",
+                str(fps),
+                "-i",
+                str(Path(tmp) / FRAME_PATTERN.replace("{:05d}", "%05d")),
+                "-vf",
+                "pad=ceil(iw/2)*2:ceil(ih/2)*2",
+                "-pix_fmt",
+                "yuv420p",
+                str(output),
+            ],
+            check=True,
+        )
@@ -0,0 +1,113 @@
+"""Content-addressed cache for the fetch → clean → smooth → plot stages."""
+
+import hashlib
+import json
+import pickle
+import shutil
+import time
+from collections.abc import Callable
+from functools import cache
+from pathlib import Path
+from typing import Any
+
+
+@cache
+def code_version() -> str:
+    """Hash of the package sources, so a code change invalidates every stage."""
+    h = hashlib.sha256()
+    for path in sorted(Path(__file__).parent.glob("*.py")):
+        h.update(path.name.encode())
+        h.update(path.read_bytes())
+    return h.hexdigest()[:16]
+
+
+def file_digest(path: Path, block: int = 1 << 20) -> str:
+    """SHA-256 of a file, read in blocks."""
+    h = hashlib.sha256()
+    with path.open("rb") as f:
+        while chunk := f.read(block):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+def stage_key(stage: str, *inputs: Any) -> str:
+    """Key of a stage from its name, the code version and its inputs.
+
+    Inputs are bytes (hashed as is), upstream keys or JSON-able parameters.
+    """
+    h = hashlib.sha256(f"{stage}\0{code_version()}".encode())
+    for item in inputs:
+        h.update(b"\0")
+        h.update(
+            item
+            if isinstance(item, bytes)
+            else json.dumps(item, sort_keys=True, default=str).encode()
+        )
+    return f"{stage}-{h.hexdigest()[:32]}"
+
+
+class StageCache:
+    """Directory of stage outputs keyed by ``stage_key``.
+
+    Entries are pickled objects (``run``) or output files (``file``); hits
+    refresh the entry's mtime, which ``evict`` uses as the last-use time.
+    With ``force`` every stage is recomputed (and the cache refreshed).
+    """
+
+    def __init__(self, root: Path, force: bool = False) -> None:
+        self.root, self.force = root, force
+        self.hits: list[str] = []
+        self.misses: list[str] = []
+
+    def _lookup(self, path: Path) -> bool:
+        if self.force or not path.exists():
+            self.misses.append(path.stem)
+            return False
+        path.touch()
+        self.hits.append(path.stem)
+        return True
+
+    def run(self, key: str, compute: Callable[[], Any]) -> Any:
+        """Cached ``compute()`` result for ``key``."""
+        path = self.root / f"{key}.pkl"
+        if self._lookup(path):
+            return pickle.loads(path.read_bytes())
+        value = compute()
+        self.root.mkdir(parents=True, exist_ok=True)
+        tmp = path.with_suffix(".tmp")
+        tmp.write_bytes(pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL))
+        tmp.replace(path)
+        return value
+
+    def file(self, key: str, output: Path, build: Callable[[], None]) -> None:
+        """Produce ``output``, copying a cached copy or calling ``build()``."""
+        path = self.root / f"{key}{output.suffix}"
+        if self._lookup(path):
+            shutil.copyfile(path, output)
+            return
+        build()
+        self.root.mkdir(parents=True, exist_ok=True)
+        shutil.copyfile(output, path)
+
+    def evict(
+        self, max_bytes: int | None = None, max_age: float | None = None
+    ) -> list[Path]:
+        """Drop entries unused for ``max_age`` seconds, then least recently
+        used ones until the cache is at most ``max_bytes``. Returns them."""
+        if not self.root.exists():
+            return []
+        entries = sorted(
+            (p.stat().st_mtime, p.stat().st_size, p)
+            for p in self.root.iterdir()
+            if p.is_file()
+        )
+        total, now, removed = sum(size for _, size, _ in entries), time.time(), []
+        for mtime, size, path in entries:
+            too_old = max_age is not None and now - mtime > max_age
+            too_big = max_bytes is not None and total > max_bytes
+            if not (too_old or too_big):
+                continue
+            path.unlink()
+            total -= size
+            removed.append(path)
+        return removed
@@ -1,26 +1,36 @@
 """Parse and prepare referendum polling data (Italian locale)."""
 
-import locale
+import json
 import re
 import warnings
+from collections.abc import Iterable, Iterator
 from datetime import date
+from functools import cache
 from math import nan
+from pathlib import Path
 
 import numpy as np
 import pandas as pd
-from babel.dates import get_month_names
-from babel.numbers import parse_decimal
 
-locale.setlocale(locale.LC_TIME, "it_IT.UTF-8")
-
-_IT_MONTHS = "|".join(
-    re.escape(m) for m in get_month_names("wide", locale="it_IT").values()
-)
-_ITALIAN_DATE_RE = re.compile(rf"^\d{{1,2}}\s+({_IT_MONTHS})\s+\d{{4}}$")
 _ITALIAN_NUMBER_RE = re.compile(r"^\d{1,3}(?:\.\d{3})*(?:,\d+)?$|^\d+(?:,\d+)?$")
 _WIKI_REF_RE = re.compile(r"\[[1-9][0-9]*\]")
 
 
+@cache
+def _italian_months() -> tuple[dict[str, int], re.Pattern]:
+    """Italian month names to numbers (from babel) and the date regex using them.
+
+    Built on first use, so importing the module does not load babel.
+    """
+    from babel.dates import get_month_names
+
+    numbers = {
+        name: num for num, name in get_month_names("wide", locale="it_IT").items()
+    }
+    months = "|".join(re.escape(m) for m in numbers)
+    return numbers, re.compile(rf"^(\d{{1,2}})\s+({months})\s+(\d{{4}})$")
+
+
 def _strip_wiki_refs(s: str | float):
     """Remove Wikipedia-style citation refs [1]..[N] and collapse whitespace."""
     if pd.isna(s):
@@ -29,6 +39,14 @@ def _strip_wiki_refs(s: str | float):
     return re.sub(r"\s+", " ", t).strip()
 
 
+REJECT_REASONS = (
+    "bad date",
+    "missing %",
+    "before start_date",
+    "bad number",
+    "zero total",
+)
+
 CLEAN_COLUMNS = [
     "date",
     "istituto",
@@ -39,22 +57,57 @@ CLEAN_COLUMNS = [
 ]
 
 
+def _to_dates(col: pd.Series) -> pd.Series:
+    """Parse a column of Italian dates ("15 gennaio 2026") to datetimes, NaT if invalid.
+
+    Each distinct cell is matched once against the ``_italian_months`` regex;
+    month names map to numbers through a table built from babel, so no system
+    locale is needed, and the datetimes are assembled in one call.
+    """
+    month_numbers, date_re = _italian_months()
+    codes, uniques = pd.factorize(col)
+    parts = pd.Series(uniques, dtype=object).str.strip().str.extract(date_re)
+    ymd = pd.DataFrame(
+        {
+            "year": pd.to_numeric(parts[2]),
+            "month": parts[1].map(month_numbers),
+            "day": pd.to_numeric(parts[0]),
+        }
+    )
+    dates = pd.to_datetime(ymd, errors="coerce").to_numpy()
+    return pd.Series(
+        np.append(dates, np.datetime64("NaT"))[codes], index=col.index
+    )  # -1: missing
+
+
 def _to_date(s: str | float):
-    if pd.isna(s) or not isinstance(s, str) or not (s := s.strip()):
+    if pd.isna(s) or not isinstance(s, str):
         return pd.NaT
-    return (
-        pd.to_datetime(s, format="%d %B %Y", errors="coerce")
-        if _ITALIAN_DATE_RE.match(s)
-        else pd.NaT
-    )
+    return _to_dates(pd.Series([s], dtype=object)).iloc[0]
+
+
+def _to_numbers(col: pd.Series) -> pd.Series:
+    """Parse a column of Italian numbers ("1.000", "44,5") to float64, NaN if invalid.
+
+    Each distinct cell is parsed once: it is validated with
+    ``_ITALIAN_NUMBER_RE`` and converted by dropping the thousands dots and
+    turning the decimal comma into a point, with vectorized string operations,
+    then by ``float`` (correctly rounded, like babel; ``pd.to_numeric`` is
+    not for long decimals).
+    """
+    codes, uniques = pd.factorize(col.astype(str))
+    s = pd.Series(uniques, dtype=object).str.strip()
+    ok = s.str.match(_ITALIAN_NUMBER_RE.pattern).to_numpy(bool)
+    digits = s[ok].str.replace(".", "", regex=False).str.replace(",", ".")
+    vals = np.full(len(s), nan)
+    vals[ok] = digits.astype(float)
+    return pd.Series(np.append(vals, nan)[codes], index=col.index)  # -1: missing
 
 
 def _to_number(s: str | float):
-    if pd.isna(s) or not (s := str(s).strip()) or s == "nan":
+    if pd.isna(s):
         return nan
-    return (
-        float(parse_decimal(s, locale="it_IT")) if _ITALIAN_NUMBER_RE.match(s) else nan
-    )
+    return float(_to_numbers(pd.Series([s], dtype=object)).iloc[0])
 
 
 def _strip_wikipedia_refs(df: pd.DataFrame) -> None:
@@ -94,73 +147,266 @@ def _clean_table(df: pd.DataFrame) -> None:
     ).replace("", np.nan)
 
 
-def _wavg(g: pd.DataFrame, w: pd.Series, c: str):
-    return (g[c] * w).sum() / w.sum() if w.sum() > 0 else g[c].mean()
+_WINDOW_RE = re.compile(r"^(\d+)D$", re.IGNORECASE)
+
 
+def _merge_key(dates: pd.Series, window: str | None) -> pd.Series:
+    """Group key: the date itself, its ISO week ("W") or an N-day bin ("ND")."""
+    if window is None:
+        return dates
+    if window.upper() == "W":
+        return dates.dt.to_period("W").dt.start_time
+    if not (m := _WINDOW_RE.match(window)) or int(m[1]) < 1:
+        raise ValueError(f"Invalid merge window: {window!r}")
+    return (dates - dates.min()).dt.days // int(m[1])
 
-def _warn_rows(df: pd.DataFrame) -> None:
-    for _, row in df.iterrows():
-        if len(set(row.values)) <= 1:
-            continue
-        warnings.warn(str(row.to_dict()), Warning, stacklevel=2)
 
+def merge_same_date(df: pd.DataFrame, window: str | None = None) -> pd.DataFrame:
+    """Merge polls sharing a date (or ``window``) into sample-weighted averages.
 
-def merge_same_date(df: pd.DataFrame) -> pd.DataFrame:
+    Percentages and margins are averaged with ``sample_size`` weights (equal
+    weights when a group's sizes sum to zero), sizes are summed and pollster
+    names joined. With ``window`` polls in the same ISO week ("W") or N-day
+    bin from the first poll ("ND") are merged and dated at their mean date.
+    """
     if df.empty:
         return df
+    cols = ["yes_norm", "no_norm", "error_margin"]
+    key = _merge_key(df["date"], window).rename("key")
+    w = df["sample_size"].fillna(0)
+    sums = df[cols].mul(w, axis=0).assign(w=w).groupby(key).sum()
+    means = df[cols].groupby(key).mean()
+    out = sums[cols].div(sums["w"], axis=0).where(sums["w"] > 0, means)
+    out["sample_size"] = sums["w"]
+    out["date"] = df["date"].groupby(key).mean().dt.normalize()
+    names = pd.DataFrame({"key": key, "istituto": df["istituto"].astype(str)})
+    out["istituto"] = names.drop_duplicates().groupby("key")["istituto"].agg(", ".join)
+    return out.reset_index(drop=True)[CLEAN_COLUMNS]
 
-    def agg(g):
-        w = g["sample_size"].fillna(0)
-        return pd.Series(
-            {
-                "date": g.name,
-                "istituto": ", ".join(g["istituto"].astype(str).unique()),
-                "yes_norm": _wavg(g, w, "yes_norm"),
-                "no_norm": _wavg(g, w, "no_norm"),
-                "sample_size": w.sum(),
-                "error_margin": _wavg(g, w, "error_margin"),
-            }
-        )
 
-    return (
-        df.groupby("date", as_index=False)
-        .apply(agg)
-        .reset_index(drop=True)[CLEAN_COLUMNS]
-    )
+def rejection_summary(rejected: pd.DataFrame) -> pd.Series:
+    """Number of rejected rows per reason."""
+    return rejected["reason"].value_counts().rename("rows")
 
 
-def prepare_data(
-    df: pd.DataFrame,
-    merge: bool = False,
-    start_date: date | None = None,
-) -> pd.DataFrame:
+def write_rejected(rejected: pd.DataFrame, path: Path) -> None:
+    """Write rejected rows as CSV, or as JSON (summary + rows) for a .json path."""
+    if path.suffix.lower() != ".json":
+        rejected.to_csv(path, index=False)
+        return
+    report = {
+        "summary": rejection_summary(rejected).to_dict(),
+        "rows": json.loads(rejected.to_json(orient="records", force_ascii=False)),
+    }
+    path.write_text(json.dumps(report, ensure_ascii=False, indent=2), encoding="utf-8")
+
+
+# Row-wise cleaning result (see ``parse_rows``): parsed clean columns and the
+# row's quality reason ("" if clean, "separator" for table section rows).
+_ROW_DTYPES = {
+    "date": "datetime64[us]",
+    "istituto": "str",
+    "yes_norm": "float64",
+    "no_norm": "float64",
+    "sample_size": "float64",
+    "error_margin": "float64",
+    "reason": "str",
+}
+
+
+def row_hashes(df: pd.DataFrame) -> pd.Index:
+    """64-bit hash of each raw row's cells (index and column names excluded)."""
+    return pd.Index(pd.util.hash_pandas_object(df, index=False), name="row_hash")
+
+
+def _parse_table(df: pd.DataFrame) -> pd.DataFrame:
+    df = df.copy()
     _strip_wikipedia_refs(df)
-    mask = (
+    date_ok = (
         df["Data pubblicazione"]
         .astype(str)
         .str.contains(r"\d{1,2}\s+\w+\s+\d{4}", na=False, regex=True)
+    )
+    mask = (
+        date_ok
         & df["Sì"].astype(str).str.contains("%", na=False)
         & df["No"].astype(str).str.contains("%", na=False)
     )
-    _warn_rows(df[~mask])
+    reason = pd.Series(np.where(date_ok, "missing %", "bad date"), index=df.index)
+    separator = df[~mask].nunique(axis=1, dropna=False) <= 1
+    reason[separator.index[separator]] = "separator"
+
     df = df[mask].copy()
     _clean_table(df)
+    yes, no = _to_numbers(df["Sì"]), _to_numbers(df["No"])
+    tot = yes + no
+    resp = tot + np.nan_to_num(_to_numbers(df["Indeciso"]), nan=0)
+    camp = _to_numbers(df["Campione"])
+    dates = _to_dates(df["Data pubblicazione"])
+    reason[mask] = np.select(
+        [dates.isna(), yes.isna() | no.isna(), tot == 0],
+        ["bad date", "bad number", "zero total"],
+        default="",
+    )
+    rows = pd.DataFrame(
+        {
+            "date": dates,
+            "istituto": df["Istituto"].astype(str),
+            "yes_norm": yes / tot * 100,
+            "no_norm": no / tot * 100,
+            "sample_size": np.where(resp > 0, camp * tot / resp, camp),
+            "error_margin": _to_numbers(df["Margine di errore"]),
+        },
+        index=df.index,
+    ).reindex(reason.index)
+    rows["reason"] = reason
+    return rows.astype(_ROW_DTYPES)
 
-    df["date"] = df["Data pubblicazione"].apply(_to_date)
-    if start_date is not None:
-        cutoff = pd.Timestamp(start_date)
-        df = df[df["date"] >= cutoff]
-    df["error_margin"] = df["Margine di errore"].apply(_to_number)
-    df["istituto"] = df["Istituto"].astype(str)
 
-    yes, no = df["Sì"].apply(_to_number), df["No"].apply(_to_number)
-    tot = yes + no
-    resp = tot + np.nan_to_num(df["Indeciso"].apply(_to_number), nan=0)
-    camp = df["Campione"].apply(_to_number)
-    df["sample_size"] = np.where(resp > 0, camp * tot / resp, camp)
-    df["yes_norm"], df["no_norm"] = yes / tot * 100, no / tot * 100
-
-    valid = df[["date", "yes_norm", "no_norm"]].notna().all(axis=1)
-    _warn_rows(df[~valid])
-    out = df[valid].sort_values("date").reset_index(drop=True)[CLEAN_COLUMNS]
-    return merge_same_date(out) if merge else out
+def parse_rows(df: pd.DataFrame, known: pd.DataFrame | None = None) -> pd.DataFrame:
+    """Row-wise cleaning of the raw table, one row per raw row, indexed by
+    ``row_hashes``.
+
+    Rows whose hash is already in ``known`` (an earlier result for a table
+    with the same columns and dtypes) are copied from it, so only new or
+    modified rows are stripped and parsed. Pass the result to
+    ``prepare_data(rows=...)`` and keep it as ``known`` for the next run.
+    """
+    hashes = row_hashes(df)
+    schema = [f"{c}:{t}" for c, t in df.dtypes.astype(str).items()]
+    if known is None or known.attrs.get("schema") != schema:
+        known = pd.DataFrame(columns=list(_ROW_DTYPES)).astype(_ROW_DTYPES)
+    known = known[~known.index.duplicated()]
+    new = ~hashes.isin(known.index)
+    if new.any():
+        fresh = _parse_table(df[new]).set_axis(hashes[new])
+        fresh = fresh[~fresh.index.duplicated()]
+        known = pd.concat([known, fresh]) if len(known) else fresh
+    rows = known.loc[hashes]
+    rows.attrs["schema"] = schema
+    return rows
+
+
+def _reasons(rows: pd.DataFrame, start_date: date | None) -> pd.Series:
+    if not start_date:
+        return rows["reason"]
+    return rows["reason"].mask(
+        rows["date"] < pd.Timestamp(start_date), "before start_date"
+    )
+
+
+def _finish(
+    clean: pd.DataFrame,
+    rejected: pd.DataFrame,
+    reasons: pd.Series,
+    text_columns: set[str],
+    merge: bool,
+    merge_window: str | None,
+    with_rejected: bool,
+) -> pd.DataFrame | tuple[pd.DataFrame, pd.DataFrame]:
+    """Table-wide end of cleaning: rejection report and warning, sort, merge."""
+    rejected = rejected.copy()
+    _strip_wikipedia_refs(rejected)
+    rejected = rejected.astype(dict.fromkeys(text_columns, "str"))
+    rejected = rejected.assign(reason=reasons.to_numpy()).sort_index()
+    quality = rejected[rejected["reason"] != "before start_date"]
+    if len(quality):
+        counts = ", ".join(f"{r}: {n}" for r, n in rejection_summary(quality).items())
+        warnings.warn(f"Rejected {len(quality)} rows ({counts})", Warning, stacklevel=3)
+
+    out = clean.sort_values("date").reset_index(drop=True)[CLEAN_COLUMNS]
+    out = merge_same_date(out, merge_window) if merge else out
+    return (out, rejected) if with_rejected else out
+
+
+def _text_columns(df: pd.DataFrame) -> set[str]:
+    """Text columns with any value (their stripped rejected cells stay str)."""
+    text = df.select_dtypes(include=["object", "string"]).notna().any()
+    return set(text.index[text])
+
+
+def prepare_data(
+    df: pd.DataFrame,
+    merge: bool = False,
+    start_date: date | None = None,
+    merge_window: str | None = None,
+    with_rejected: bool = False,
+    rows: pd.DataFrame | None = None,
+) -> pd.DataFrame | tuple[pd.DataFrame, pd.DataFrame]:
+    """Clean the raw Wikipedia table into ``CLEAN_COLUMNS``.
+
+    Rejected rows are collected with a ``reason`` (one of
+    ``REJECT_REASONS``) and reported in a single warning; with
+    ``with_rejected`` they are also returned as a second DataFrame. Rows
+    whose cells are all equal (table section separators) are not reported.
+    ``rows`` is the ``parse_rows`` result for df, if already computed.
+    """
+    rows = (parse_rows(df) if rows is None else rows).set_axis(df.index)
+    reason = _reasons(rows, start_date)
+    bad = ~reason.isin(["", "separator"])
+    return _finish(
+        rows[reason == ""],
+        df[bad],
+        reason[bad],
+        _text_columns(df),
+        merge,
+        merge_window,
+        with_rejected,
+    )
+
+
+def read_raw_chunks(
+    paths: Iterable[Path], chunksize: int = 50_000
+) -> Iterator[pd.DataFrame]:
+    """Raw CSVs as text DataFrames of at most ``chunksize`` rows.
+
+    Sources are read one after the other, numbered consecutively and given
+    the union of their columns, as if they were one table
+    (``pd.concat(..., ignore_index=True)``).
+    """
+    paths = list(paths)
+    columns = list(
+        dict.fromkeys(c for p in paths for c in pd.read_csv(p, nrows=0).columns)
+    )
+    offset = 0
+    for path in paths:
+        for chunk in pd.read_csv(path, dtype=str, chunksize=chunksize):
+            chunk = chunk.reindex(columns=columns).astype("str")
+            yield chunk.set_axis(pd.RangeIndex(offset, offset + len(chunk)))
+            offset += len(chunk)
+
+
+def prepare_chunks(
+    chunks: Iterable[pd.DataFrame],
+    merge: bool = False,
+    start_date: date | None = None,
+    merge_window: str | None = None,
+    with_rejected: bool = False,
+) -> pd.DataFrame | tuple[pd.DataFrame, pd.DataFrame]:
+    """``prepare_data`` over a stream of raw chunks (see ``read_raw_chunks``).
+
+    Each chunk is cleaned on its own and reduced to its typed clean rows and
+    its rejected raw rows, so memory holds one raw chunk plus the compact
+    clean table; the final sort and merge then give the same result as
+    ``prepare_data`` on the concatenated chunks.
+    """
+    clean, rejected, reasons, text_columns = [], [], [], set()
+    for chunk in chunks:
+        rows = _parse_table(chunk)
+        reason = _reasons(rows, start_date)
+        bad = ~reason.isin(["", "separator"])
+        clean.append(rows.loc[reason == "", CLEAN_COLUMNS])
+        rejected.append(chunk[bad])
+        reasons.append(reason[bad])
+        text_columns |= _text_columns(chunk)
+    if not clean:
+        raise ValueError("No raw chunks to prepare")
+    return _finish(
+        pd.concat(clean),
+        pd.concat(rejected),
+        pd.concat(reasons),
+        text_columns,
+        merge,
+        merge_window,
+        with_rejected,
+    )
@@ -1,27 +1,253 @@
 """Download referendum polling table from Wikipedia."""
 
-from io import StringIO
+import asyncio
+import hashlib
+import json
+from collections.abc import Iterable
+from io import BytesIO, StringIO
 from pathlib import Path
+from typing import TYPE_CHECKING, NamedTuple
+from urllib.parse import quote, unquote, urlencode, urlsplit
 
 import pandas as pd
-import requests
+
+if TYPE_CHECKING:  # requests and lxml are imported where used
+    import requests
+    from lxml import etree
+
+from .instrument import stage
 
 WIKI_URL = "https://it.wikipedia.org/wiki/Referendum_costituzionale_in_Italia_del_2026"
+HEADERS = {"User-Agent": "Mozilla/5.0 (compatible; Python script)"}
+TIMEOUT = (10, 30)  # (connect, read) seconds
+TABLE_COLUMNS = ("Istituto", "Sì")
+
+
+class Page(NamedTuple):
+    """A page to fetch: URL (or Wikipedia title), output CSV and table selector."""
+
+    url: str
+    csv_path: Path
+    columns: tuple[str, ...] = TABLE_COLUMNS
+
+
+def page_url(title_or_url: str, lang: str = "it") -> str:
+    """Full URL for a Wikipedia page title; URLs are returned unchanged."""
+    if title_or_url.startswith(("http://", "https://")):
+        return title_or_url
+    return f"https://{lang}.wikipedia.org/wiki/{quote(title_or_url.replace(' ', '_'))}"
+
+
+def make_session(
+    retries: int = 3, backoff: float = 0.5, pool_size: int = 10
+) -> "requests.Session":
+    """Pooled session that retries transient failures with exponential backoff."""
+    import requests
+    from requests.adapters import HTTPAdapter
+    from urllib3.util.retry import Retry
+
+    session = requests.Session()
+    session.headers.update(HEADERS)
+    retry = Retry(
+        total=retries,
+        backoff_factor=backoff,
+        status_forcelist=(429, 500, 502, 503, 504),
+        allowed_methods=("GET",),
+    )
+    adapter = HTTPAdapter(
+        max_retries=retry, pool_connections=pool_size, pool_maxsize=pool_size
+    )
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    return session
+
+
+def fetch_page(
+    url: str,
+    cache_dir: Path | None = None,
+    session: "requests.Session | None" = None,
+) -> tuple[str, bool]:
+    """GET url, revalidating a cached copy; returns (html, changed).
+
+    With ``cache_dir`` the body is stored with its ETag/Last-Modified headers,
+    which are sent back as a conditional request on the next call; a 304
+    answer returns the cached body with ``changed=False``.
+    """
+    session = session or make_session()
+    body_path = meta_path = None
+    meta: dict = {}
+    if cache_dir is not None:
+        key = hashlib.sha256(url.encode()).hexdigest()[:16]
+        body_path, meta_path = cache_dir / f"{key}.html", cache_dir / f"{key}.json"
+        if body_path.exists() and meta_path.exists():
+            meta = json.loads(meta_path.read_text())
+    headers = {}
+    if "etag" in meta:
+        headers["If-None-Match"] = meta["etag"]
+    if "last_modified" in meta:
+        headers["If-Modified-Since"] = meta["last_modified"]
+    resp = session.get(url, headers=headers, timeout=TIMEOUT)
+    if resp.status_code == 304 and meta:
+        return body_path.read_text(encoding="utf-8"), False
+    resp.raise_for_status()
+    if cache_dir is not None:
+        cache_dir.mkdir(parents=True, exist_ok=True)
+        body_path.write_text(resp.text, encoding="utf-8")
+        validators = {
+            "etag": resp.headers.get("ETag"),
+            "last_modified": resp.headers.get("Last-Modified"),
+        }
+        meta = {"url": url} | {k: v for k, v in validators.items() if v}
+        meta_path.write_text(json.dumps(meta))
+    return resp.text, True
 
 
-def download_sondaggi(csv_path: Path) -> None:
-    """Download the Sondaggi table from Wikipedia and save as CSV."""
-    html = requests.get(
-        WIKI_URL, headers={"User-Agent": "Mozilla/5.0 (compatible; Python script)"}
-    ).text
-    table = next(
-        (
-            t
-            for t in pd.read_html(StringIO(html))
-            if "Istituto" in t.columns and "Sì" in t.columns
-        ),
-        None,
+def _header_cells(table: "etree._Element") -> set[str]:
+    row = next(table.iter("tr"), None)
+    if row is None:
+        return set()
+    return {" ".join("".join(c.itertext()).split()) for c in row if c.tag == "th"}
+
+
+def extract_table(html: str, columns: tuple[str, ...] = TABLE_COLUMNS) -> str | None:
+    """HTML of the first table whose header row has all ``columns``, or None.
+
+    The page is streamed with lxml iterparse; tables are only inspected as
+    their end tag is reached and non-matching top-level tables are freed,
+    so only the wanted table is ever handed to ``pd.read_html``.
+    """
+    from lxml import etree
+
+    events = etree.iterparse(
+        BytesIO(html.encode("utf-8")),
+        events=("end",),
+        tag="table",
+        html=True,
+        encoding="utf-8",
     )
+    for _, table in events:
+        if set(columns) <= _header_cells(table):
+            return etree.tostring(table, encoding="unicode", method="html")
+        if not any(a.tag == "table" for a in table.iterancestors()):
+            table.clear()
+    return None
+
+
+def section_api_url(page_url: str, section: int) -> str:
+    """MediaWiki ``action=parse`` URL returning only one section of a page."""
+    parts = urlsplit(page_url)
+    query = {
+        "action": "parse",
+        "format": "json",
+        "formatversion": 2,
+        "prop": "text",
+        "section": section,
+        "page": unquote(parts.path.rsplit("/", 1)[-1]),
+    }
+    return f"{parts.scheme}://{parts.netloc}/w/api.php?{urlencode(query)}"
+
+
+def download_sondaggi(
+    csv_path: Path,
+    cache_dir: Path | None = None,
+    session: "requests.Session | None" = None,
+    url: str = WIKI_URL,
+    section: int | None = None,
+) -> bool:
+    """Download the Sondaggi table from Wikipedia and save as CSV.
+
+    With ``section`` only that section of the page is requested, through the
+    MediaWiki parse API. Returns False, without touching an existing CSV,
+    when the page is unchanged since the copy in ``cache_dir``.
+    """
+    if section is not None:
+        url = section_api_url(url, section)
+    with stage("http"):
+        html, changed = fetch_page(url, cache_dir, session)
+    if not changed and csv_path.exists():
+        return False
+    if section is not None:
+        html = json.loads(html)["parse"]["text"]
+    with stage("read_html") as record:
+        try:
+            record["rows_out"] = _write_table(html, csv_path)
+        except LookupError:
+            raise SystemExit("Could not find Sondaggi table on Wikipedia.") from None
+    return changed
+
+
+def _write_table(
+    html: str, csv_path: Path, columns: tuple[str, ...] = TABLE_COLUMNS
+) -> int:
+    table = extract_table(html, columns)
     if table is None:
-        raise SystemExit("Could not find Sondaggi table on Wikipedia.")
-    table.to_csv(csv_path, index=False)
+        raise LookupError(f"No table with columns {columns}")
+    df = pd.read_html(StringIO(table))[0]
+    df.to_csv(csv_path, index=False)
+    return len(df)
+
+
+class _HostThrottle:
+    """Spaces request starts to the same host at least 1 / rate seconds apart."""
+
+    def __init__(self, rate: float | None) -> None:
+        self.interval = 1 / rate if rate else 0.0
+        self.next_start: dict[str, float] = {}
+        self.lock = asyncio.Lock()
+
+    async def wait(self, host: str) -> None:
+        now = asyncio.get_running_loop().time()
+        async with self.lock:
+            start = max(now, self.next_start.get(host, now))
+            self.next_start[host] = start + self.interval
+        await asyncio.sleep(start - now)
+
+
+async def download_pages(
+    pages: Iterable[Page],
+    cache_dir: Path | None = None,
+    concurrency: int = 4,
+    rate_per_host: float | None = 5.0,
+    session: "requests.Session | None" = None,
+) -> dict[Path, bool | Exception]:
+    """Fetch several pages concurrently, writing one raw CSV per page.
+
+    Each distinct URL is fetched once, its tables written for every page
+    with that URL. At most ``concurrency`` URLs are in flight, sharing one
+    pooled session (blocking I/O runs in worker threads), and requests to
+    the same host start at most ``rate_per_host`` times per second. Returns,
+    per CSV path, whether the page changed (see ``download_sondaggi``) or
+    the exception raised fetching or writing it.
+    """
+    by_url: dict[str, list[Page]] = {}
+    for p in pages:
+        by_url.setdefault(page_url(p.url), []).append(p)
+    session = session or make_session(pool_size=concurrency)
+    limit, throttle = asyncio.Semaphore(concurrency), _HostThrottle(rate_per_host)
+
+    async def write(page: Page, html: str, changed: bool) -> bool:
+        if changed or not page.csv_path.exists():
+            await asyncio.to_thread(_write_table, html, page.csv_path, page.columns)
+        return changed
+
+    async def one(url: str, group: list[Page]) -> list[bool | Exception]:
+        async with limit:
+            await throttle.wait(urlsplit(url).netloc)
+            html, changed = await asyncio.to_thread(fetch_page, url, cache_dir, session)
+            writes = (write(page, html, changed) for page in group)
+            return await asyncio.gather(*writes, return_exceptions=True)
+
+    fetched = await asyncio.gather(
+        *(one(url, group) for url, group in by_url.items()), return_exceptions=True
+    )
+    results = {}
+    for group, out in zip(by_url.values(), fetched, strict=True):
+        if isinstance(out, Exception):  # the fetch failed: every page fails
+            out = [out] * len(group)
+        results.update((p.csv_path, r) for p, r in zip(group, out, strict=True))
+    return results
+
+
+def download_all(pages: Iterable[Page], **kwargs) -> dict[Path, bool | Exception]:
+    """Blocking wrapper around ``download_pages``."""
+    return asyncio.run(download_pages(pages, **kwargs))
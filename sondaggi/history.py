@@ -0,0 +1,163 @@
+"""Append-only snapshot history of the raw Wikipedia table."""
+
+import hashlib
+import json
+from collections import defaultdict
+from datetime import UTC, date, datetime, timedelta
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from .data import _norm_date_cell, _strip_wiki_refs
+
+VERSIONS_FILE = "versions.jsonl"
+REMOVALS_FILE = "removals.jsonl"
+SNAPSHOTS_FILE = "snapshots.jsonl"
+
+
+def poll_key(row: dict) -> tuple[str, str]:
+    """(publication date, istituto) of a raw row, without refs and spacing."""
+    day = _strip_wiki_refs(row.get("Data pubblicazione"))
+    return str(_norm_date_cell(day)), str(_strip_wiki_refs(row.get("Istituto")))
+
+
+def _read_jsonl(path: Path) -> list[dict]:
+    if not path.exists():
+        return []
+    with path.open(encoding="utf-8") as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+def _append_jsonl(path: Path, records: list[dict]) -> None:
+    with path.open("a", encoding="utf-8") as f:
+        f.writelines(json.dumps(r, ensure_ascii=False) + "\n" for r in records)
+
+
+def _utc(at: datetime) -> np.datetime64:
+    if at.tzinfo is not None:
+        at = at.astimezone(UTC).replace(tzinfo=None)
+    return np.datetime64(at, "us")
+
+
+def _bound(when: date | datetime | str) -> np.datetime64:
+    """Latest snapshot time included by ``as_of(when)``; a date means its end."""
+    if isinstance(when, str):
+        when = datetime.fromisoformat(when) if "T" in when else date.fromisoformat(when)
+    if not isinstance(when, datetime):
+        when = datetime.combine(when + timedelta(days=1), datetime.min.time())
+        return np.datetime64(when, "us") - np.timedelta64(1, "us")
+    return _utc(when)
+
+
+class SnapshotHistory:
+    """Dated row versions of the raw table, stored once per distinct row.
+
+    Each ``append`` compares a table with the live rows of the previous
+    snapshot and only logs rows that appeared (a new version) or
+    disappeared (a removal); unchanged rows cost nothing. Versions and
+    removals are logged in time order, so the table as of any time is the
+    versions logged up to then minus the removals logged up to then, both
+    found by binary search on their timestamps. Times are naive UTC.
+    """
+
+    def __init__(self, root: Path) -> None:
+        self.root = root
+        self._versions = _read_jsonl(root / VERSIONS_FILE)
+        self._removals = _read_jsonl(root / REMOVALS_FILE)
+        self._snapshots = _read_jsonl(root / SNAPSHOTS_FILE)
+        self._added_at = np.array([v["at"] for v in self._versions], "datetime64[us]")
+        self._removed_at = np.array([r["at"] for r in self._removals], "datetime64[us]")
+        self._by_key: dict[tuple[str, str], list[int]] = defaultdict(list)
+        for i, v in enumerate(self._versions):
+            self._by_key[tuple(v["key"])].append(i)
+        removed = {r["version"] for r in self._removals}
+        self._live = {
+            v["id"]: i for i, v in enumerate(self._versions) if i not in removed
+        }
+
+    @property
+    def snapshots(self) -> pd.DataFrame:
+        """One row per snapshot: time, table rows, versions added and removed."""
+        return pd.DataFrame(
+            self._snapshots, columns=["at", "rows", "added", "removed"]
+        ).astype({"at": "datetime64[us]"})
+
+    def append(self, df: pd.DataFrame, at: datetime | None = None) -> dict:
+        """Record df as the table at ``at`` (default: now); returns its summary."""
+        stamp = _utc(at or datetime.now(UTC))
+        last = self._snapshots[-1]["at"] if self._snapshots else None
+        if last is not None and stamp < np.datetime64(last, "us"):
+            raise ValueError(f"Snapshot at {stamp} is older than the last one ({last})")
+        rows = json.loads(df.to_json(orient="records", force_ascii=False))
+        seen: dict[str, int] = defaultdict(int)
+        ids = []
+        for row in rows:
+            digest = hashlib.sha256(
+                json.dumps(row, sort_keys=True, ensure_ascii=False).encode()
+            ).hexdigest()[:24]
+            ids.append(f"{digest}-{seen[digest]}")  # identical rows kept apart
+            seen[digest] += 1
+        iso = str(stamp)
+        new = [
+            {"id": i, "key": poll_key(row), "at": iso, "row": row}
+            for i, row in zip(ids, rows, strict=True)
+            if i not in self._live
+        ]
+        current = set(ids)
+        gone = [
+            {"version": v, "at": iso} for i, v in self._live.items() if i not in current
+        ]
+        snapshot = {
+            "at": iso,
+            "rows": len(rows),
+            "added": len(new),
+            "removed": len(gone),
+        }
+        self.root.mkdir(parents=True, exist_ok=True)
+        _append_jsonl(self.root / VERSIONS_FILE, new)
+        _append_jsonl(self.root / REMOVALS_FILE, gone)
+        _append_jsonl(self.root / SNAPSHOTS_FILE, [snapshot])
+        for r in gone:
+            del self._live[self._versions[r["version"]]["id"]]
+        for v in new:
+            self._live[v["id"]] = len(self._versions)
+            self._by_key[tuple(v["key"])].append(len(self._versions))
+            self._versions.append(v)
+        self._removals += gone
+        self._snapshots.append(snapshot)
+        self._added_at = np.append(self._added_at, np.repeat(stamp, len(new)))
+        self._removed_at = np.append(self._removed_at, np.repeat(stamp, len(gone)))
+        return snapshot
+
+    def as_of(self, when: date | datetime | str) -> pd.DataFrame:
+        """The raw table as of the last snapshot taken at or before ``when``.
+
+        A date (or "YYYY-MM-DD") includes the snapshots of that whole day.
+        Rows keep the order in which their versions were first recorded.
+        """
+        bound = _bound(when)
+        n_added = np.searchsorted(self._added_at, bound, side="right")
+        n_removed = np.searchsorted(self._removed_at, bound, side="right")
+        removed = {r["version"] for r in self._removals[:n_removed]}
+        rows = [
+            v["row"] for i, v in enumerate(self._versions[:n_added]) if i not in removed
+        ]
+        return pd.DataFrame(rows)
+
+    def versions(self, day: str, istituto: str) -> pd.DataFrame:
+        """Every version of one poll, keyed as in ``poll_key``, with the time it
+        was recorded and removed (NaT while still live)."""
+        idx = self._by_key.get((day, istituto), [])
+        removed_at = {r["version"]: r["at"] for r in self._removals}
+        return pd.DataFrame(
+            [
+                {
+                    "recorded": self._versions[i]["at"],
+                    "removed": removed_at.get(i),
+                    **self._versions[i]["row"],
+                }
+                for i in idx
+            ],
+            columns=None if idx else ["recorded", "removed"],
+        ).astype({"recorded": "datetime64[us]", "removed": "datetime64[us]"})
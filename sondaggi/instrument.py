@@ -0,0 +1,129 @@
+"""Per-stage timing and memory records for the pipeline (``--profile``)."""
+
+import cProfile
+import json
+import os
+import sys
+import time
+import tracemalloc
+from collections.abc import Iterator
+from contextlib import contextmanager
+from contextvars import ContextVar
+from pathlib import Path
+from typing import Self
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+_ACTIVE: ContextVar["Profiler | None"] = ContextVar("profiler", default=None)
+
+
+def max_rss_mib() -> float | None:
+    """High-water mark of this process's resident memory, if available."""
+    if resource is None:
+        return None
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return rss / 2**20 if sys.platform == "darwin" else rss / 2**10
+
+
+def _cpu() -> float:
+    t = os.times()
+    return t.user + t.system + t.children_user + t.children_system
+
+
+class Profiler:
+    """Collects one record per ``stage`` run while active (``with Profiler():``).
+
+    Each record has the wall and CPU time (including child processes), the
+    tracemalloc peak of Python allocations during the stage, the process's
+    peak RSS at its end and, when given, the rows in and out. Nested stages
+    are recorded with their depth. With ``cprofile_stage`` that stage also
+    runs under cProfile and its stats are dumped to ``cprofile_path``.
+    """
+
+    def __init__(
+        self, cprofile_stage: str | None = None, cprofile_path: Path | None = None
+    ) -> None:
+        self.records: list[dict] = []
+        self._peaks: list[int] = []  # running peak of each open stage
+        self.cprofile_stage = cprofile_stage
+        self.cprofile_path = cprofile_path or Path(f"{cprofile_stage}.prof")
+        self._cprofile = cProfile.Profile() if cprofile_stage else None
+
+    def __enter__(self) -> Self:
+        tracemalloc.start()
+        self._token = _ACTIVE.set(self)
+        return self
+
+    def __exit__(self, *exc) -> None:
+        _ACTIVE.reset(self._token)
+        tracemalloc.stop()
+
+    @contextmanager
+    def stage(self, name: str, rows_in: int | None = None) -> Iterator[dict]:
+        record = {"stage": name, "depth": len(self._peaks), "rows_in": rows_in}
+        if self._peaks:  # keep the enclosing stage's peak so far
+            self._peaks[-1] = max(self._peaks[-1], tracemalloc.get_traced_memory()[1])
+        tracemalloc.reset_peak()
+        self._peaks.append(0)
+        self.records.append(record)
+        profile = self._cprofile if name == self.cprofile_stage else None
+        wall, cpu = time.perf_counter(), _cpu()
+        if profile:
+            profile.enable()
+        try:
+            yield record
+        finally:
+            if profile:
+                profile.disable()
+                profile.dump_stats(self.cprofile_path)
+            peak = max(self._peaks.pop(), tracemalloc.get_traced_memory()[1])
+            if self._peaks:
+                self._peaks[-1] = max(self._peaks[-1], peak)
+            record |= {
+                "wall_s": time.perf_counter() - wall,
+                "cpu_s": _cpu() - cpu,
+                "py_peak_mib": peak / 2**20,
+                "max_rss_mib": max_rss_mib(),
+            }
+            record.setdefault("rows_out", None)
+
+    def table(self) -> str:
+        """Records as an aligned text table, nested stages indented."""
+        head = f"{'stage':<24}{'wall s':>9}{'cpu s':>9}{'py peak MiB':>13}"
+        head += f"{'max RSS MiB':>13}{'rows in':>10}{'rows out':>10}"
+        lines = [head]
+        for r in self.records:
+            rss = "" if r["max_rss_mib"] is None else f"{r['max_rss_mib']:.1f}"
+            rows = [
+                "" if r[k] is None else f"{r[k]:,}" for k in ("rows_in", "rows_out")
+            ]
+            lines.append(
+                f"{'  ' * r['depth'] + r['stage']:<24}{r['wall_s']:>9.3f}"
+                f"{r['cpu_s']:>9.3f}{r['py_peak_mib']:>13.1f}{rss:>13}"
+                f"{rows[0]:>10}{rows[1]:>10}"
+            )
+        return "\n".join(lines)
+
+    def write(self, path: Path) -> None:
+        """Write the records as JSON (a .json path) or as the text table."""
+        if path.suffix.lower() == ".json":
+            path.write_text(json.dumps(self.records, indent=2))
+        else:
+            path.write_text(self.table() + "\n")
+
+
+@contextmanager
+def stage(name: str, rows_in: int | None = None) -> Iterator[dict]:
+    """Record a stage on the active ``Profiler``; a no-op when none is active.
+
+    Yields the stage's record: set ``record["rows_out"]`` inside the block.
+    """
+    profiler = _ACTIVE.get()
+    if profiler is None:
+        yield {}
+        return
+    with profiler.stage(name, rows_in) as record:
+        yield record
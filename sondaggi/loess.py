@@ -1,17 +1,143 @@
 """LOESS regression; dense curve on a time grid."""
 
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+
 import numpy as np
 import pandas as pd
-from scipy.interpolate import interp1d
 
+# Max number of (query, neighbour) pairs materialised at once by the window kernel.
+_BLOCK_ELEMS = 1 << 16
+# Bootstrap replicates per task; fixed so results do not depend on the pool size.
+_BOOT_CHUNK = 50
+# Default frac candidates for select_frac.
+FRACS = np.round(np.arange(0.1, 0.95, 0.1), 2)
+# Cutoffs per loess_asof task, as for the bootstrap.
+_ASOF_CHUNK = 50
+# Data points at which frac_scores evaluates the criteria (evenly spaced).
+_CV_POINTS = 2000
+# Kernel pairs (points * sum of k) below which frac_scores runs without a pool.
+_POOL_MIN_ELEMS = 1 << 24
+# Backfitting (backfit_days) stops when no house effect moves by more than
+# this many percentage points, or after this many iterations.
+_BACKFIT_TOL = 1e-4
+_BACKFIT_ITER = 50
 
-def lowess(
-    x: np.ndarray, y: np.ndarray, weights: np.ndarray, frac: float
+
+def _windows(xs: np.ndarray, q: np.ndarray, k: int) -> np.ndarray:
+    """Start index of the k nearest neighbours of each query in sorted xs.
+
+    The neighbours of q form a contiguous window [lo, lo + k). A two-pointer
+    sweep advances lo while xs[lo + k] is closer to q than xs[lo], i.e. while
+    xs[lo] + xs[lo + k] < 2q; since those pair sums are sorted, the final lo
+    for every query is found at once with searchsorted.
+    """
+    n = len(xs)
+    if k >= n:
+        return np.zeros(len(q), dtype=np.intp)
+    return np.searchsorted(xs[: n - k] + xs[k:], 2 * q, side="left")
+
+
+def _windows_rows(xr: np.ndarray, q: np.ndarray, k: int) -> np.ndarray:
+    """``_windows`` for every row of an (R, n) array of sorted rows at once.
+
+    Each row's pair sums are shifted by a row offset wider than their range,
+    so one searchsorted over the flattened rows serves all of them.
+    """
+    r, n = xr.shape
+    if k >= n:
+        return np.zeros((r, len(q)), dtype=np.intp)
+    span = max(xr.max(), q.max()) - min(xr.min(), q.min())
+    off = np.arange(r)[:, None] * (2 * span + 1)
+    sums = (xr[:, : n - k] + xr[:, k:] + off).ravel()
+    pos = np.searchsorted(sums, 2 * q[None, :] + off, side="left")
+    return pos - np.arange(r)[:, None] * (n - k)
+
+
+def _local_fit(
+    xs: np.ndarray,
+    ys: np.ndarray,
+    ws: np.ndarray,
+    k: int,
+    q: np.ndarray,
+    fallback: np.ndarray | None = None,
+    lo: np.ndarray | None = None,
+    points: np.ndarray | None = None,
+    hat: np.ndarray | None = None,
 ) -> np.ndarray:
-    n, k = len(x), max(int(frac * len(x)), 2)
-    o = np.argsort(x)
-    xs, ys, ws = x[o], y[o], weights[o]
-    out = np.column_stack([xs, np.empty(n)])
+    """Local linear fit at each query q from its k nearest points in sorted xs.
+
+    ``ys`` may be 1-D or an (n, m) matrix of response columns: neighbourhoods
+    and kernel weights are computed once and shared by all columns. Queries
+    whose neighbourhood has zero total weight get ``fallback`` (default: the
+    y of the nearest point); where the weight sits on a single x (no spread to
+    fit a slope) the weighted mean is used. Precomputed window starts ``lo``
+    may be passed to fit several independent series laid end to end in xs.
+    When the queries are the data points ``xs[points]`` (default: all of
+    xs), the hat-matrix diagonal there (the weight of each y in its own fit)
+    is written to ``hat`` if given.
+    """
+    if lo is None:
+        k = min(k, len(xs))
+        lo = _windows(xs, q, k)
+    # int32 days and float32 values (``Polls``) are upcast once, not per block.
+    xs, ws = xs.astype(float, copy=False), ws.astype(float, copy=False)
+    y2 = ys.reshape(len(ys), -1).astype(float, copy=False)
+    fit = np.empty((len(q), y2.shape[1]))
+    step = max(_BLOCK_ELEMS // max(k * y2.shape[1], 1), 1)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        for a in range(0, len(q), step):
+            b = min(a + step, len(q))
+            j = lo[a:b, None] + np.arange(k)
+            x_c = xs[j] - q[a:b, None]
+            d = np.abs(x_c)
+            u = d / np.where((dmax := d.max(axis=1, keepdims=True)) > 0, dmax, np.inf)
+            t = 1 - u * u * u
+            w = ws[j] * (t * t * t)
+            wxc = w * x_c
+            s = w.sum(axis=1)
+            wx, wx2 = wxc.sum(axis=1) / s, (wxc * x_c).sum(axis=1) / s
+            y_n = y2[j]
+            wy = np.einsum("bk,bkm->bm", w, y_n) / s[:, None]
+            wxy = np.einsum("bk,bkm->bm", wxc, y_n) / s[:, None]
+            var = wx2 - wx**2
+            line = ((wx2 > 1e-10) & (var > 1e-10 * wx2))[:, None]
+            slope = (wxy - wx[:, None] * wy) / var[:, None]
+            fit[a:b] = np.where(line, wy - slope * wx[:, None], wy)
+            if (empty := ~(s > 0)).any():
+                fb = (
+                    y_n[np.arange(b - a), d.argmin(axis=1)]
+                    if fallback is None
+                    else fallback[a:b].reshape(b - a, -1)
+                )
+                fit[a:b][empty] = fb[empty]
+            if hat is not None:
+                # Point i sits at x_c = 0 with kernel weight ws[i]; its entry
+                # in the smoother row is w / s * (1 - wx * (x_c - wx) / var).
+                i = np.arange(a, b) if points is None else points[a:b]
+                own = (i >= lo[a:b]) & (i < lo[a:b] + k)
+                h = np.where(own, ws[i] / s, 0.0)
+                hat[a:b] = np.where(
+                    empty, 1.0, np.where(line[:, 0], h * (1 + wx**2 / var), h)
+                )
+    return fit.reshape((len(q),) + ys.shape[1:])
+
+
+def _lowess_window(
+    xs: np.ndarray, ys: np.ndarray, ws: np.ndarray, k: int
+) -> np.ndarray:
+    """Sliding-window kernel on sorted data: O(n log n) search, batched sums."""
+    return _local_fit(xs, ys, ws, k, xs, ys)
+
+
+def _lowess_reference(
+    xs: np.ndarray, ys: np.ndarray, ws: np.ndarray, k: int
+) -> np.ndarray:
+    """Original per-point kernel (full argsort per point, O(n^2 log n))."""
+    if ys.ndim == 2:
+        return np.column_stack([_lowess_reference(xs, c, ws, k) for c in ys.T])
+    n = len(xs)
+    fit = np.empty(n)
     for i in range(n):
         j = np.argsort(np.abs(xs - xs[i]))[:k]
         x_n, y_n, w_n = xs[j], ys[j], ws[j]
@@ -20,29 +146,519 @@ def lowess(
             (1 - np.minimum(d / d.max(), 1) ** 3) ** 3 if d.max() > 0 else np.ones(k)
         )
         if (s := w.sum()) <= 0:
-            out[i, 1] = ys[i]
+            fit[i] = ys[i]
             continue
         x_c = x_n - xs[i]
         wx, wy = (w * x_c).sum() / s, (w * y_n).sum() / s
         wxy, wx2 = (w * x_c * y_n).sum() / s, (w * x_c**2).sum() / s
-        out[i, 1] = (
+        fit[i] = (
             wy - (wxy - wx * wy) / (wx2 - wx**2) * wx
             if wx2 > 1e-10
             else np.average(y_n, weights=w)
         )
-    return out
+    return fit
 
 
-def loess(
-    dates: pd.Series, values: pd.Series, frac: float, weights: pd.Series
-) -> tuple[pd.Series, pd.Series]:
+LOWESS_METHODS = {"window": _lowess_window, "reference": _lowess_reference}
+
+
+def lowess(
+    x: np.ndarray,
+    y: np.ndarray,
+    weights: np.ndarray,
+    frac: float,
+    method: str = "window",
+) -> np.ndarray:
+    """Weighted local linear fit at each x; returns sorted (x, fit) pairs.
+
+    ``y`` may be an (n, m) matrix of response columns sharing x and weights;
+    the result then has one fit column per response, after the x column.
+    ``method`` selects the kernel: ``"window"`` (default, sliding window) or
+    ``"reference"`` (the original per-point argsort implementation).
+    """
+    if method not in LOWESS_METHODS:
+        raise ValueError(f"Unknown lowess method: {method!r}")
+    k = max(int(frac * len(x)), 2)
+    o = np.argsort(x, kind="stable")
+    xs, ys, ws = x[o], y[o], weights[o]
+    return np.column_stack([xs, LOWESS_METHODS[method](xs, ys, ws, k)])
+
+
+class LowessModel:
+    """Per-point ``lowess`` fit that can absorb appended points.
+
+    Keeps the sorted arrays, each point's neighbour window and its fit.
+    ``update`` inserts new points and refits only the points whose k-nearest
+    window changed: about k points per new point as long as k = frac * n
+    stays the same (every point is refit when k grows). The fit always
+    equals ``lowess`` on all points seen so far, in arrival order.
+    """
+
+    def __init__(
+        self, x: np.ndarray, y: np.ndarray, weights: np.ndarray, frac: float
+    ) -> None:
+        self.frac = frac
+        o = np.argsort(x, kind="stable")
+        self.xs = np.asarray(x, dtype=float)[o]
+        self.ys = np.asarray(y, dtype=float)[o]
+        self.ws = np.asarray(weights, dtype=float)[o]
+        self.k = min(max(int(frac * len(x)), 2), len(x))
+        self.lo = _windows(self.xs, self.xs, self.k)
+        self.fit = _local_fit(self.xs, self.ys, self.ws, self.k, self.xs, self.ys)
+
+    def update(self, x: np.ndarray, y: np.ndarray, weights: np.ndarray) -> np.ndarray:
+        """Append points; returns the sorted indices whose fit was recomputed."""
+        o = np.argsort(x, kind="stable")
+        x_new = np.asarray(x, dtype=float)[o]
+        pos = np.searchsorted(self.xs, x_new, side="right")
+        n_old, n = len(self.xs), len(self.xs) + len(x_new)
+        self.xs = np.insert(self.xs, pos, x_new)
+        self.ys = np.insert(self.ys, pos, np.asarray(y, dtype=float)[o], axis=0)
+        self.ws = np.insert(self.ws, pos, np.asarray(weights, dtype=float)[o])
+        # New index of every old point, and of every inserted point.
+        moved = np.arange(n_old) + np.searchsorted(pos, np.arange(n_old), "right")
+        added = np.setdiff1d(np.arange(n), moved, assume_unique=True)
+        k = min(max(int(self.frac * n), 2), n)
+        lo = _windows(self.xs, self.xs, k)
+        if k != self.k:
+            stale = np.arange(n)
+        else:
+            lo_old, hi_old = moved[self.lo], moved[self.lo + k - 1]
+            same = (lo[moved] == lo_old) & (hi_old - lo_old == k - 1)
+            stale = np.union1d(moved[~same], added)
+        self.k, self.lo = k, lo
+        self.fit = np.insert(self.fit, pos, np.nan, axis=0)
+        self.fit[stale] = _local_fit(
+            self.xs, self.ys, self.ws, k, self.xs[stale], self.ys[stale], lo[stale]
+        )
+        return stale
+
+    def result(self) -> np.ndarray:
+        """Sorted (x, fit) pairs, as returned by ``lowess``."""
+        return np.column_stack([self.xs, self.fit])
+
+
+def lowess_at(
+    x: np.ndarray,
+    y: np.ndarray,
+    weights: np.ndarray,
+    frac: float,
+    x_eval: np.ndarray,
+) -> np.ndarray:
+    """Evaluate the weighted local linear fit directly at arbitrary x_eval.
+
+    Neighbourhoods are the k = frac * n data points nearest to each query, as
+    in ``lowess``; a query whose neighbourhood has zero weight takes the y of
+    its nearest data point. ``y`` may be an (n, m) matrix, as in ``lowess``.
+    """
+    k = max(int(frac * len(x)), 2)
+    o = np.argsort(x, kind="stable")
+    xs, ys, ws = x[o], y[o], weights[o]
+    return _local_fit(xs, ys, ws, k, np.asarray(x_eval, dtype=float))
+
+
+def _frac_score(
+    xs: np.ndarray,
+    ys: np.ndarray,
+    ws: np.ndarray,
+    points: np.ndarray,
+    criterion: str,
+    k: int,
+) -> float:
+    """LOOCV or GCV score of the k-neighbour fit, averaged over xs[points]."""
+    hat = np.empty(len(points))
+    q = xs[points]
+    lo = _windows(xs, q, k)
+    fit = _local_fit(xs, ys, ws, k, q, ys[points], lo, points, hat)
+    r2 = ((ys[points] - fit).reshape(len(q), -1) ** 2).mean(axis=1) * ws[points]
+    with np.errstate(divide="ignore", invalid="ignore"):
+        if criterion == "loocv":
+            score = np.mean(r2 / (1 - hat) ** 2)
+        else:
+            score = np.mean(r2) / (1 - hat.mean()) ** 2
+    return np.inf if np.isnan(score) else float(score)  # fits that interpolate
+
+
+def frac_scores(
+    x: np.ndarray,
+    y: np.ndarray,
+    weights: np.ndarray,
+    fracs: np.ndarray = FRACS,
+    criterion: str = "gcv",
+    processes: int | None = None,
+) -> np.ndarray:
+    """Cross-validation score of ``lowess`` for each frac (lower is better).
+
+    ``criterion`` is ``"loocv"``, the weighted mean of the squared
+    leave-one-out residuals (y - fit) / (1 - h), or ``"gcv"``, the weighted
+    mean squared residual over (1 - tr(H) / n)^2; h is the hat-matrix
+    diagonal, computed alongside each fit rather than by refitting n times
+    (the standard closed form, exact as long as dropping a point leaves the
+    others' neighbourhoods unchanged). Both are means over the data points,
+    estimated on at most ``_CV_POINTS`` evenly spaced ones (each fit still
+    uses every point), so the whole grid costs about as much as a few
+    ``lowess`` fits. ``y`` may be an (n, m) matrix: scores are averaged over
+    columns. Large problems are spread over a process pool of ``processes``
+    workers (1 runs inline).
+    """
+    if criterion not in ("loocv", "gcv"):
+        raise ValueError(f"Unknown criterion: {criterion!r}")
+    n = len(x)
+    o = np.argsort(x, kind="stable")
+    xs, ys, ws = x[o], y[o], weights[o]
+    points = np.unique(np.linspace(0, n - 1, min(n, _CV_POINTS)).astype(np.intp))
+    ks = [min(max(int(f * n), 2), n) for f in fracs]
+    task = partial(_frac_score, xs, ys, ws, points, criterion)
+    if processes == 1 or len(ks) == 1 or len(points) * sum(ks) < _POOL_MIN_ELEMS:
+        return np.array(list(map(task, ks)))
+    with ProcessPoolExecutor(processes) as ex:
+        return np.array(list(ex.map(task, ks)))
+
+
+def _loess_inputs(
+    dates: pd.Series, weights: pd.Series
+) -> tuple[np.ndarray, np.ndarray]:
+    """Day offsets from the first date and mean-normalised, NaN-filled weights."""
     days = (dates - dates.min()).dt.days.values
-    days_dense = np.linspace(days.min(), days.max(), len(days) * 5)
-    w = weights.fillna(weights.mean()).values
+    w = weights.fillna(weights.mean()).to_numpy(dtype=float)
     w = np.where(np.isnan(w), 1.0, w) / np.nanmean(w) * len(w)
-    sm = lowess(days, values.values, w, frac)
+    return days, w
+
+
+def _like(values: pd.Series | pd.DataFrame, vals: np.ndarray):
+    if isinstance(values, pd.DataFrame):
+        return pd.DataFrame(vals, columns=values.columns)
+    return pd.Series(vals)
+
+
+def loess(
+    dates: pd.Series,
+    values: pd.Series | pd.DataFrame,
+    frac: float,
+    weights: pd.Series,
+    grid: int | None = None,
+) -> tuple[pd.Series, pd.Series | pd.DataFrame]:
+    """Smooth values over dates; returns (grid dates, smoothed values).
+
+    A DataFrame of values is smoothed in a single pass (shared neighbourhoods
+    and kernel weights) and returned as a DataFrame with the same columns.
+
+    With ``grid=None`` the fit is computed at the observed days and
+    cubic-interpolated on ``len(dates) * 5`` points. With an integer ``grid``
+    the local regression is evaluated directly on that many evenly spaced
+    days, independently of the number of polls.
+    """
+    days, w = _loess_inputs(dates, weights)
+    days_dense, vals = loess_days(days, values.values, w, frac, grid)
+    return dates.min() + pd.to_timedelta(days_dense, unit="D"), _like(values, vals)
+
+
+def loess_days(
+    days: np.ndarray,
+    y: np.ndarray,
+    w: np.ndarray,
+    frac: float,
+    grid: int | None = None,
+) -> tuple[np.ndarray, np.ndarray]:
+    """``loess`` on day numbers and normalised weights: (grid days, fits)."""
+    if grid is not None:
+        days_dense = np.linspace(days.min(), days.max(), grid)
+        return days_dense, lowess_at(days, y, w, frac, days_dense)
+    from scipy.interpolate import interp1d  # only this path needs scipy
+
+    days_dense = np.linspace(days.min(), days.max(), len(days) * 5)
+    sm = lowess(days, y, w, frac)
     xu, idx = np.unique(sm[:, 0], return_index=True)
-    yu = sm[idx, 1]
-    f = interp1d(xu, yu, kind="cubic", fill_value="extrapolate")
-    vals = f(days_dense)
-    return dates.min() + pd.to_timedelta(days_dense, unit="D"), pd.Series(vals)
+    yu = sm[idx, 1:].reshape((len(xu),) + y.shape[1:])
+    f = interp1d(xu, yu, kind="cubic", axis=0, fill_value="extrapolate")
+    return days_dense, f(days_dense)
+
+
+def select_frac(
+    dates: pd.Series,
+    values: pd.Series | pd.DataFrame,
+    weights: pd.Series,
+    fracs: np.ndarray = FRACS,
+    criterion: str = "gcv",
+    processes: int | None = None,
+) -> tuple[float, pd.Series]:
+    """Frac minimising ``frac_scores`` for ``loess`` on these polls.
+
+    Returns the chosen frac and the score of every candidate, indexed by frac.
+    """
+    days, w = _loess_inputs(dates, weights)
+    scores = frac_scores(days, values.values, w, fracs, criterion, processes)
+    scores = pd.Series(scores, index=pd.Index(fracs, name="frac"), name=criterion)
+    return float(scores.idxmin()), scores
+
+
+def backfit_days(
+    days: np.ndarray,
+    y: np.ndarray,
+    w: np.ndarray,
+    codes: np.ndarray,
+    n_groups: int,
+    frac: float,
+    reference: int | None = None,
+) -> tuple[np.ndarray, int]:
+    """House effects of y = trend(days) + effect[codes] + noise, by backfitting.
+
+    Alternates the trend, one ``lowess`` pass over y minus the current
+    effects (neighbourhoods are computed once, days being sorted), with the
+    effects, the weighted mean of y minus the trend for each code (bincount
+    over the codes). The level is shared by the trend and the effects, so
+    it is pinned after each update: the effects of the groups with polls
+    are centred, or with a ``reference`` code measured from that group's
+    (which is then 0). Codes of -1 (no group) have no effect. Returns the
+    (n_groups, ...) effects and the number of iterations.
+    """
+    n = len(days)
+    k = min(max(int(frac * n), 2), n)
+    lo = _windows(days, days, k)
+    y2 = y.reshape(n, -1).astype(float)
+    known = codes >= 0
+    c, wk = codes[known], w[known]
+    wsum = np.bincount(c, weights=wk, minlength=n_groups)
+    has = wsum > 0
+    if reference is not None and not has[reference]:
+        raise ValueError(f"Reference group {reference} has no polls")
+    effects = np.zeros((n_groups + 1, y2.shape[1]))  # last row: code -1
+    for it in range(1, _BACKFIT_ITER + 1):
+        adjusted = y2 - effects[codes]
+        trend = _local_fit(days, adjusted, w, k, days, adjusted, lo)
+        resid = (y2 - trend)[known] * wk[:, None]
+        new = (
+            np.column_stack(
+                [np.bincount(c, weights=r, minlength=n_groups) for r in resid.T]
+            )
+            / np.where(has, wsum, 1)[:, None]
+        )
+        if reference is not None:
+            new[has] -= new[reference]
+        elif has.any():
+            new[has] -= new[has].mean(axis=0)
+        delta = np.abs(new - effects[:-1]).max(initial=0)
+        effects[:-1] = new
+        if delta < _BACKFIT_TOL:
+            break
+    return effects[:-1].reshape((n_groups,) + y.shape[1:]), it
+
+
+def _bootstrap_chunk(
+    days: np.ndarray,
+    y: np.ndarray,
+    w: np.ndarray,
+    sd: np.ndarray | None,
+    frac: float,
+    q: np.ndarray,
+    n_rep: int,
+    seed: np.random.SeedSequence,
+) -> np.ndarray:
+    """Fit n_rep bootstrap replicates of (days, y, w), days sorted, at q."""
+    rng = np.random.default_rng(seed)
+    n = len(days)
+    k = min(max(int(frac * n), 2), n)
+    idx = np.sort(rng.integers(0, n, (n_rep, n)), axis=1)
+    ys = y[idx]
+    if sd is not None:
+        ys = ys + rng.standard_normal(ys.shape) * sd[idx]
+    lo = _windows_rows(days[idx], q, k) + np.arange(n_rep)[:, None] * n
+    fit = _local_fit(
+        days[idx].ravel(),
+        ys.reshape((n_rep * n,) + y.shape[1:]),
+        w[idx].ravel(),
+        k,
+        np.tile(q, n_rep),
+        lo=lo.ravel(),
+    )
+    return fit.reshape((n_rep, len(q)) + y.shape[1:])
+
+
+def loess_bootstrap(
+    dates: pd.Series,
+    values: pd.Series | pd.DataFrame,
+    frac: float,
+    weights: pd.Series,
+    n_boot: int = 2000,
+    level: float = 0.95,
+    grid: int | None = None,
+    sample_sizes: pd.Series | None = None,
+    seed: int = 0,
+    processes: int | None = None,
+) -> tuple[pd.Series, pd.DataFrame | pd.Series, pd.DataFrame | pd.Series]:
+    """Percentile bootstrap band of the LOESS curve; returns (t, lower, upper).
+
+    Polls are resampled with replacement and each replicate is evaluated
+    directly on the same grid as ``loess`` (``len(dates) * 5`` points unless
+    ``grid`` is given). If ``sample_sizes`` is given, each resampled
+    percentage is also perturbed by its binomial sampling error,
+    sqrt(p * (100 - p) / n). Replicates run in fixed-size chunks seeded from
+    ``seed`` on a process pool of ``processes`` workers (1 runs inline); the
+    result is the same for any pool size. Values are percentages.
+    """
+    days, w = _loess_inputs(dates, weights)
+    o = np.argsort(days, kind="stable")
+    q = np.linspace(days.min(), days.max(), grid or len(days) * 5)
+    lower, upper = bootstrap_days(
+        days[o],
+        values.values[o],
+        w[o],
+        frac,
+        q,
+        None if sample_sizes is None else sample_sizes.to_numpy(dtype=float)[o],
+        n_boot,
+        level,
+        seed,
+        processes,
+    )
+    t = dates.min() + pd.to_timedelta(q, unit="D")
+    return t, _like(values, lower), _like(values, upper)
+
+
+def bootstrap_days(
+    days: np.ndarray,
+    y: np.ndarray,
+    w: np.ndarray,
+    frac: float,
+    q: np.ndarray,
+    sample_sizes: np.ndarray | None = None,
+    n_boot: int = 2000,
+    level: float = 0.95,
+    seed: int = 0,
+    processes: int | None = None,
+) -> tuple[np.ndarray, np.ndarray]:
+    """``loess_bootstrap`` on sorted day numbers and normalised weights, at q.
+
+    Returns the (lower, upper) band; NaN or 0 sample sizes (unknown, as
+    ``merge_same_date`` sums them) add no sampling error.
+    """
+    sd = None
+    if sample_sizes is not None:
+        n_s = sample_sizes.reshape((len(days),) + (1,) * (y.ndim - 1))
+        var = np.clip(y * (100 - y), 0, None)
+        sd = np.sqrt(np.divide(var, n_s, out=np.zeros(var.shape), where=n_s > 0))
+    sizes = [min(_BOOT_CHUNK, n_boot - a) for a in range(0, n_boot, _BOOT_CHUNK)]
+    seeds = np.random.SeedSequence(seed).spawn(len(sizes))
+    task = partial(_bootstrap_chunk, days, y, w, sd, frac, q)
+    if processes == 1 or len(sizes) == 1:
+        parts = list(map(task, sizes, seeds))
+    else:
+        with ProcessPoolExecutor(processes) as ex:
+            parts = list(ex.map(task, sizes, seeds))
+    reps = np.concatenate(parts)
+    alpha = (1 - level) / 2 * 100
+    lower, upper = np.nanpercentile(reps, [alpha, 100 - alpha], axis=0)
+    return lower, upper
+
+
+def _asof_chunk(
+    days: np.ndarray,
+    y: np.ndarray,
+    w: np.ndarray,
+    frac: float,
+    q: np.ndarray,
+    ends: np.ndarray,
+    cut_days: np.ndarray,
+) -> np.ndarray:
+    """Fits at q from each prefix days[:end] of sorted days, NaN after its cutoff.
+
+    Cutoffs are sorted; those with the same prefix share one fit, made for
+    the latest of them.
+    """
+    fit = np.full((len(ends), len(q)) + y.shape[1:], np.nan)
+    last_end = 0
+    for r in range(len(ends) - 1, -1, -1):
+        end = ends[r]
+        if end == 0:
+            break
+        n_q = np.searchsorted(q, cut_days[r], side="right")
+        if end != last_end:
+            ws = w[:end]
+            if (missing := np.isnan(ws)).any():  # as _loess_inputs, on this prefix
+                fill = ws[~missing].mean() if not missing.all() else 1.0
+                ws = np.where(missing, fill, ws)
+            k = min(max(int(frac * end), 2), end)
+            last = _local_fit(days[:end], y[:end], ws, k, q[:n_q])
+            last_end = end
+        fit[r, :n_q] = last[:n_q]
+    return fit
+
+
+def loess_asof(
+    dates: pd.Series,
+    values: pd.Series | pd.DataFrame,
+    frac: float,
+    weights: pd.Series,
+    cutoffs: pd.DatetimeIndex | None = None,
+    grid: int | None = None,
+    processes: int | None = None,
+) -> pd.DataFrame:
+    """LOESS curve as it could be computed on each cutoff date (backtest).
+
+    Row c is the fit from the polls dated up to and including c, evaluated
+    directly on a grid shared by all rows (as ``loess`` with ``grid``) and
+    NaN for grid days after c. Cutoffs (sorted) default to every poll date;
+    the grid to one point per day from the first to the last poll, or
+    ``grid`` evenly spaced days. The polls are sorted once and every cutoff
+    fits on a prefix view of the same arrays, once per distinct prefix (e.g.
+    daily cutoffs with no new poll reuse the previous fit); cutoffs run in
+    fixed-size chunks on a process pool of ``processes`` workers (1 runs
+    inline). Returns a cutoff x grid date frame; with DataFrame values the
+    columns are (column, date) pairs.
+    """
+    start = dates.min()
+    days = (dates - start).dt.days.to_numpy(dtype=float)
+    o = np.argsort(days, kind="stable")
+    return asof_days(
+        start,
+        days[o],
+        values.values[o],
+        weights.to_numpy(dtype=float)[o],
+        frac,
+        dates.unique() if cutoffs is None else cutoffs,
+        grid,
+        processes,
+        values.columns if isinstance(values, pd.DataFrame) else None,
+    )
+
+
+def asof_days(
+    start: pd.Timestamp,
+    days: np.ndarray,
+    y: np.ndarray,
+    w: np.ndarray,
+    frac: float,
+    cutoffs: pd.DatetimeIndex,
+    grid: int | None = None,
+    processes: int | None = None,
+    columns: pd.Index | None = None,
+) -> pd.DataFrame:
+    """``loess_asof`` on sorted day numbers, ``start`` being the date of days[0].
+
+    Weights are raw (NaN where unknown): each prefix fills and uses its own.
+    With ``columns`` (one per column of y) the frame has (column, date)
+    columns.
+    """
+    cut = pd.DatetimeIndex(cutoffs, name="cutoff").sort_values()
+    cut_days = days[0] + ((cut - start) / pd.Timedelta(days=1)).to_numpy()
+    ends = np.searchsorted(days, cut_days, side="right")
+    q = (
+        np.arange(days[0], days[-1] + 1, dtype=float)
+        if grid is None
+        else np.linspace(days[0], days[-1], grid)
+    )
+    chunks = [slice(a, a + _ASOF_CHUNK) for a in range(0, len(cut), _ASOF_CHUNK)]
+    task = partial(_asof_chunk, days, y, w, frac, q)
+    args = [ends[c] for c in chunks], [cut_days[c] for c in chunks]
+    if processes == 1 or len(chunks) <= 1:
+        parts = list(map(task, *args))
+    else:
+        with ProcessPoolExecutor(processes) as ex:
+            parts = list(ex.map(task, *args))
+    fit = np.concatenate(parts) if parts else np.empty((0, len(q)) + y.shape[1:])
+    t = pd.DatetimeIndex(start + pd.to_timedelta(q - days[0], unit="D"), name="date")
+    if columns is not None:
+        columns = pd.MultiIndex.from_product([columns, t], names=[None, "date"])
+        fit = fit.transpose(0, 2, 1).reshape(len(cut), len(columns))
+        return pd.DataFrame(fit, index=cut, columns=columns)
+    return pd.DataFrame(fit, index=cut, columns=t)
@@ -1,44 +1,227 @@
-"""Plot LOESS regression of referendum Sì/No data."""
+"""Plot LOESS regression of referendum Sì/No data.
+
+matplotlib and seaborn are imported by ``plot_loess`` only: the curve
+helpers here are used without drawing anything.
+"""
 
 from pathlib import Path
 
-import matplotlib.pyplot as plt
+import numpy as np
 import pandas as pd
-import seaborn as sns
 
-from .loess import loess
+from .instrument import stage
+from .loess import (
+    FRACS,
+    asof_days,
+    backfit_days,
+    bootstrap_days,
+    frac_scores,
+    loess_days,
+)
+from .polls import SHARES, Polls
 
 SCATTER_SIZE_MAX = 60
 SCATTER_SIZE_DEFAULT = 30
 
 
-def plot_loess(df: pd.DataFrame, frac: float, output_path: Path | None = None) -> None:
+SERIES = [
+    ("yes_norm", "Sì", ("green", "darkgreen")),
+    ("no_norm", "No", ("red", "darkred")),
+]
+
+
+def as_polls(df: pd.DataFrame | Polls) -> Polls:
+    """``Polls`` of a clean table; a ``Polls`` is returned as is."""
+    return df if isinstance(df, Polls) else Polls.from_frame(df)
+
+
+def _sizes(polls: Polls) -> np.ndarray:
+    """Scatter marker size of each poll, by sample size when known.
+
+    Polls without a sample size get the mean one, as their LOESS weight does.
+    """
+    if not polls.weighted:
+        return np.full(len(polls), SCATTER_SIZE_DEFAULT, dtype=float)
+    sizes = polls.sample_sizes()
+    sizes = np.where(np.isnan(sizes), np.nanmean(sizes), sizes) / np.nanmax(sizes)
+    return sizes * SCATTER_SIZE_MAX
+
+
+def auto_frac(
+    df: pd.DataFrame | Polls, criterion: str = "gcv"
+) -> tuple[float, pd.Series]:
+    """Frac for ``loess_curves`` chosen by cross-validation (``select_frac``)."""
+    polls = as_polls(df)
+    scores = frac_scores(polls.day, polls.values, polls.weights, FRACS, criterion)
+    scores = pd.Series(scores, index=pd.Index(FRACS, name="frac"), name=criterion)
+    return float(scores.idxmin()), scores
+
+
+def house_effects(
+    df: pd.DataFrame | Polls, frac: float, reference: str | None = None
+) -> pd.DataFrame:
+    """House effect of each istituto, fitted jointly with the LOESS trend.
+
+    Returns one row per istituto (``polls`` count and the mean lean of its
+    Sì/No shares from the trend, in points; ``backfit_days``), with the
+    number of backfitting iterations in ``attrs``. The effects sum to zero,
+    or are measured from the ``reference`` istituto's. Pass the table to
+    ``loess_curves`` or ``plot_loess`` to correct the polls.
+    """
+    polls = as_polls(df)
+    if reference is not None and reference not in polls.pollsters:
+        raise ValueError(f"No polls by istituto {reference!r}")
+    with stage("house_effects", rows_in=len(polls)) as record:
+        effects, iterations = backfit_days(
+            polls.day,
+            polls.values,
+            polls.weights,
+            polls.pollster,
+            len(polls.pollsters),
+            frac,
+            None if reference is None else polls.pollsters.get_loc(reference),
+        )
+        record["rows_out"] = len(effects)
+    table = pd.DataFrame(
+        effects, index=pd.Index(polls.pollsters, name="istituto"), columns=SHARES
+    )
+    counts = np.bincount(polls.pollster[polls.pollster >= 0], minlength=len(table))
+    table.insert(0, "polls", counts)
+    table.attrs["iterations"] = iterations
+    return table
+
+
+def loess_curves(
+    df: pd.DataFrame | Polls,
+    frac: float,
+    grid: int | None = None,
+    n_boot: int = 0,
+    sampling_error: bool = False,
+    house: pd.DataFrame | None = None,
+) -> pd.DataFrame:
+    """Smoothed Sì/No curves: ``date`` plus one column per series.
+
+    With ``n_boot`` bootstrap bands are added as ``<col>_lower`` and
+    ``<col>_upper`` columns. With a ``house`` effects table
+    (``house_effects``) the polls are corrected for their istituto's lean
+    first. A DataFrame is converted with ``as_polls``; pass a ``Polls`` to
+    smooth the same polls repeatedly.
+    """
+    polls = as_polls(df)
+    y = polls.values if house is None else polls.values - polls.house_offsets(house)
+    with stage("loess", rows_in=len(polls)) as record:
+        q, smooth = loess_days(polls.day, y, polls.weights, frac, grid)
+        record["rows_out"] = len(q)
+    curves = pd.DataFrame(smooth, columns=list(SHARES))
+    curves.insert(0, "date", polls.to_dates(q))
+    if n_boot:
+        with stage("bootstrap", rows_in=len(polls)):
+            lower, upper = bootstrap_days(
+                polls.day,
+                y,
+                polls.weights,
+                frac,
+                q,
+                polls.sample_sizes() if sampling_error and polls.weighted else None,
+                n_boot=n_boot,
+            )
+        curves = curves.join(
+            pd.DataFrame(lower, columns=list(SHARES)).add_suffix("_lower")
+        ).join(pd.DataFrame(upper, columns=list(SHARES)).add_suffix("_upper"))
+    return curves
+
+
+def asof_fits(
+    polls: Polls,
+    frac: float,
+    cutoffs: pd.DatetimeIndex | None = None,
+    grid: int | None = None,
+    processes: int | None = None,
+) -> pd.DataFrame:
+    """``loess_asof`` of the Sì/No shares of ``polls``: a cutoff x (series,
+    date) frame; cutoffs default to every poll date."""
+    return asof_days(
+        polls.start,
+        polls.day,
+        polls.values,
+        polls.sample_sizes() if polls.weighted else np.ones(len(polls)),
+        frac,
+        np.unique(polls.dates) if cutoffs is None else cutoffs,
+        grid,
+        processes,
+        pd.Index(SHARES),
+    )
+
+
+def asof_curves(
+    df: pd.DataFrame | Polls,
+    frac: float,
+    cutoffs: pd.DatetimeIndex | None = None,
+    grid: int | None = None,
+) -> pd.DataFrame:
+    """Backtest of the Sì/No curves: ``cutoff``, ``date`` and one column per
+    series, with the estimate for each date available on each cutoff
+    (``loess_asof``; dates after the cutoff are left out).
+    """
+    wide = asof_fits(as_polls(df), frac, cutoffs, grid)
+    return wide.stack(level="date").dropna(how="all").reset_index()
+
+
+def plot_loess(
+    df: pd.DataFrame | Polls,
+    frac: float,
+    output_path: Path | None = None,
+    grid: int | None = None,
+    n_boot: int = 0,
+    sampling_error: bool = False,
+    curves: pd.DataFrame | None = None,
+    house: pd.DataFrame | None = None,
+) -> None:
+    """Scatter the polls and draw the LOESS curves (from ``loess_curves``).
+
+    Precomputed ``curves`` skip the smoothing; ``grid``, ``n_boot`` and
+    ``sampling_error`` are then ignored. With a ``house`` effects table the
+    polls are drawn corrected for their istituto's lean (and smoothed so if
+    ``curves`` are not given).
+    """
+    import matplotlib.pyplot as plt
+    import seaborn as sns
+
+    polls = as_polls(df)
+    if curves is None:
+        curves = loess_curves(polls, frac, grid, n_boot, sampling_error, house)
+    y = polls.values if house is None else polls.values - polls.house_offsets(house)
     sns.set_style("whitegrid")
     _, ax = plt.subplots(figsize=(12, 6))
-    sample_sizes = df.get("sample_size")
-    use_w = sample_sizes is not None and not sample_sizes.isna().all()
-    weights = sample_sizes if use_w else pd.Series(1.0, index=df.index)
-
-    for col, label, (sc, lc) in [
-        ("yes_norm", "Sì", ("green", "darkgreen")),
-        ("no_norm", "No", ("red", "darkred")),
-    ]:
-        sz = (
-            sample_sizes / sample_sizes.max() * SCATTER_SIZE_MAX
-            if use_w
-            else SCATTER_SIZE_DEFAULT
-        )
+    use_w = polls.weighted
+    sizes = _sizes(polls)
+    t = curves["date"]
+    kind = "raw" if house is None else "corrected for house effects"
+    for col, label, (sc, lc) in SERIES:
         ax.scatter(
-            df["date"], df[col], alpha=0.4, s=sz, label=f"{label} (raw)", color=sc
+            polls.dates,
+            y[:, SHARES.index(col)],
+            alpha=0.4,
+            s=sizes,
+            label=f"{label} ({kind})",
+            color=sc,
         )
-        t, vals = loess(df["date"], df[col], frac, weights)
         ax.plot(
             t,
-            vals,
+            curves[col],
             linewidth=1.5,
             label=f"{label} ({'weighted ' if use_w else ''}LOESS, frac={frac:.2f})",
             color=lc,
         )
+        if f"{col}_lower" in curves:
+            ax.fill_between(
+                t,
+                curves[f"{col}_lower"],
+                curves[f"{col}_upper"],
+                color=lc,
+                alpha=0.15,
+                lw=0,
+            )
 
     ax.set(
         xlabel="Data",
@@ -49,8 +232,8 @@ def plot_loess(df: pd.DataFrame, frac: float, output_path: Path | None = None) -
     ax.grid(True, alpha=0.3)
     plt.xticks(rotation=45, ha="right")
     plt.tight_layout()
-    (
-        plt.savefig(output_path, dpi=300, bbox_inches="tight")
-        if output_path
-        else plt.show()
-    )
+    if output_path:
+        with stage("savefig"):
+            plt.savefig(output_path, dpi=300, bbox_inches="tight")
+    else:
+        plt.show()
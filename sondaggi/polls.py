@@ -0,0 +1,109 @@
+"""Compact typed in-memory representation of the cleaned polls."""
+
+import numpy as np
+import pandas as pd
+
+# Day numbers count from the Unix epoch, so they convert to datetime64[D].
+EPOCH = np.datetime64("1970-01-01", "D")
+# Columns of ``Polls.values``.
+SHARES = ("yes_norm", "no_norm")
+
+
+class Polls:
+    """Cleaned polls as typed arrays, sorted by date once.
+
+    ``day`` holds int32 days since ``EPOCH``, ``pollster`` the codes of the
+    polling companies in the ``pollsters`` lookup table (-1 if unknown),
+    ``values`` the float32 Sì/No shares (one column per ``SHARES`` entry),
+    ``margin`` the float32 error margins and ``sample_size`` int32 sizes (0
+    if unknown). ``order`` maps each poll to its row in the source table.
+    ``weights`` are the float32 LOESS weights: sample sizes, the mean size
+    where one is unknown (1 for all if none is known), scaled to mean n as
+    ``loess`` does, so fits use the arrays as they are.
+    """
+
+    def __init__(
+        self,
+        day: np.ndarray,
+        pollster: np.ndarray,
+        pollsters: pd.Index,
+        values: np.ndarray,
+        margin: np.ndarray,
+        sample_size: np.ndarray,
+    ) -> None:
+        self.order = np.argsort(day, kind="stable")
+        self.day = np.asarray(day, dtype=np.int32)[self.order]
+        self.pollster = np.asarray(pollster)[self.order]
+        self.pollsters = pollsters
+        self.values = np.asarray(values, dtype=np.float32)[self.order]
+        self.margin = np.asarray(margin, dtype=np.float32)[self.order]
+        self.sample_size = np.asarray(sample_size, dtype=np.int32)[self.order]
+        known = self.sample_size > 0
+        self.weighted = bool(known.any())
+        w = np.ones(len(self), dtype=np.float32)
+        if self.weighted:
+            w = np.where(known, self.sample_size, self.sample_size[known].mean())
+        self.weights = (w / w.mean() * len(w)).astype(np.float32)
+
+    @classmethod
+    def from_frame(cls, df: pd.DataFrame) -> "Polls":
+        """Polls of a clean table (``prepare_data`` or ``read_store`` columns).
+
+        Only ``date`` and the ``SHARES`` columns are required.
+        """
+        day = df["date"].to_numpy("datetime64[D]") - EPOCH
+        pollster = pd.Categorical(df.get("istituto", pd.Series(index=df.index)))
+        sizes = df.get("sample_size", pd.Series(np.nan, index=df.index))
+        return cls(
+            day.astype(np.int32),
+            pollster.codes,
+            pollster.categories,
+            df[list(SHARES)].to_numpy(np.float32),
+            df.get("error_margin", sizes * np.nan).to_numpy(np.float32),
+            np.rint(sizes.fillna(0).to_numpy(float)).astype(np.int32),
+        )
+
+    def __len__(self) -> int:
+        return len(self.day)
+
+    @property
+    def dates(self) -> np.ndarray:
+        """Poll dates as datetime64[D]."""
+        return self.day.astype("datetime64[D]")
+
+    @property
+    def start(self) -> pd.Timestamp:
+        """Date of the first poll (day ``day[0]``)."""
+        return pd.Timestamp(EPOCH + self.day[0])
+
+    def to_dates(self, days: np.ndarray) -> pd.DatetimeIndex:
+        """Timestamps of (fractional) day numbers, counted from ``start``."""
+        return self.start + pd.to_timedelta(days - self.day[0], unit="D")
+
+    def share(self, col: str) -> np.ndarray:
+        """Column ``col`` ("yes_norm" or "no_norm") of ``values``."""
+        return self.values[:, SHARES.index(col)]
+
+    def house_offsets(self, effects: pd.DataFrame) -> np.ndarray:
+        """Effect of each poll's pollster from a table indexed by pollster
+        with ``SHARES`` columns (``plot.house_effects``); 0 where none."""
+        table = effects.reindex(self.pollsters)[list(SHARES)].fillna(0)
+        offsets = np.vstack([table.to_numpy(float), np.zeros(len(SHARES))])
+        return offsets[self.pollster]  # code -1 takes the zero row
+
+    def sample_sizes(self) -> np.ndarray:
+        """Sample sizes as float64, NaN where unknown."""
+        return np.where(self.sample_size > 0, self.sample_size, np.nan)
+
+    def to_frame(self) -> pd.DataFrame:
+        """The polls as a clean table (sorted by date)."""
+        return pd.DataFrame(
+            {
+                "date": self.dates.astype("datetime64[s]"),
+                "istituto": pd.Categorical.from_codes(self.pollster, self.pollsters),
+                "yes_norm": self.share("yes_norm"),
+                "no_norm": self.share("no_norm"),
+                "sample_size": self.sample_sizes(),
+                "error_margin": self.margin,
+            }
+        )
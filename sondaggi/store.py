@@ -0,0 +1,83 @@
+"""Typed columnar store for cleaned polls: one .npy file per column."""
+
+import json
+import shutil
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from .data import CLEAN_COLUMNS
+
+# On-disk dtype of each clean column; "category" is stored as integer codes.
+STORE_DTYPES = {
+    "date": "datetime64[s]",
+    "istituto": "category",
+    "yes_norm": "float32",
+    "no_norm": "float32",
+    "sample_size": "float32",
+    "error_margin": "float32",
+}
+SCHEMA_FILE = "schema.json"
+STORE_VERSION = 1
+
+
+def write_store(df: pd.DataFrame, path: Path) -> None:
+    """Write the ``CLEAN_COLUMNS`` of df as a store directory at ``path``.
+
+    The directory is built next to ``path`` and renamed into place once
+    complete, after renaming the old store aside (then removed), so a store
+    at ``path`` is never half-written; between the two renames there is
+    briefly none.
+    """
+    tmp, old = (path.with_name(f"{path.name}.{s}") for s in ("tmp", "old"))
+    shutil.rmtree(tmp, ignore_errors=True)
+    tmp.mkdir(parents=True)
+    categories = {}
+    for col in CLEAN_COLUMNS:
+        if STORE_DTYPES[col] == "category":
+            cat = pd.Categorical(df[col])
+            categories[col] = cat.categories.tolist()
+            arr = cat.codes
+        else:
+            arr = df[col].to_numpy(dtype=STORE_DTYPES[col])
+        np.save(tmp / f"{col}.npy", arr, allow_pickle=False)
+    schema = {
+        "version": STORE_VERSION,
+        "rows": len(df),
+        "dtypes": {col: STORE_DTYPES[col] for col in CLEAN_COLUMNS},
+        "categories": categories,
+    }
+    schema_text = json.dumps(schema, ensure_ascii=False)
+    (tmp / SCHEMA_FILE).write_text(schema_text, encoding="utf-8")
+    shutil.rmtree(old, ignore_errors=True)
+    if path.exists():
+        path.rename(old)
+    tmp.rename(path)
+    shutil.rmtree(old, ignore_errors=True)
+
+
+def read_columns(
+    path: Path, columns: list[str] | None = None, mmap: bool = True
+) -> dict[str, np.ndarray | pd.Categorical]:
+    """Column arrays of a store, memory-mapped read-only unless ``mmap=False``.
+
+    Categorical columns come back as ``pd.Categorical`` over the stored codes.
+    """
+    schema = json.loads((path / SCHEMA_FILE).read_text(encoding="utf-8"))
+    if schema["version"] != STORE_VERSION:
+        raise ValueError(f"Unsupported store version: {schema['version']}")
+    out = {}
+    for col in columns or list(schema["dtypes"]):
+        arr = np.load(path / f"{col}.npy", mmap_mode="r" if mmap else None)
+        if col in schema["categories"]:
+            arr = pd.Categorical.from_codes(arr, schema["categories"][col])
+        out[col] = arr
+    return out
+
+
+def read_store(
+    path: Path, columns: list[str] | None = None, mmap: bool = True
+) -> pd.DataFrame:
+    """Store as a DataFrame; numeric and date columns share the mapped memory."""
+    return pd.DataFrame(read_columns(path, columns, mmap), copy=False)
@@ -1,5 +1,8 @@
 """Pytest configuration and shared fixtures."""
 
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
 from pathlib import Path
 
 import numpy as np
@@ -80,9 +83,9 @@ def clean_plot_minimal():
 
 
 @pytest.fixture
-def fetch_table_ok_df():
-    """Minimal table when fetch finds the right HTML table."""
-    return pd.DataFrame({"Istituto": ["X"], "Sì": ["50%"], "No": ["50%"]})
+def wiki_page_html():
+    """Article HTML with an unrelated table before the Sondaggi table."""
+    return (DATA_DIR / "wiki_page.html").read_text(encoding="utf-8")
 
 
 @pytest.fixture
@@ -90,6 +93,53 @@ def fetch_csv_path(tmp_path):
     return tmp_path / "out.csv"
 
 
+@pytest.fixture
+def wiki_server():
+    """Local stand-in for Wikipedia serving the Sondaggi page with an ETag.
+
+    ``server.body``/``server.etag``/``server.delay`` can be changed between
+    requests; ``server.hits`` records (path, If-None-Match, status) per request
+    and ``server.max_active`` the peak number of concurrent requests.
+    """
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            with server.lock:
+                server.active += 1
+                server.max_active = max(server.max_active, server.active)
+            time.sleep(server.delay)
+            with server.lock:
+                server.active -= 1
+            etag = self.headers.get("If-None-Match")
+            status = 304 if etag == server.etag else 200
+            server.hits.append((self.path, etag, status))
+            self.send_response(status)
+            self.send_header("ETag", server.etag)
+            self.send_header("Last-Modified", "Thu, 15 Jan 2026 10:00:00 GMT")
+            if status == 200:
+                body = server.body.encode()
+                self.send_header("Content-Type", "text/html; charset=utf-8")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+            else:
+                self.end_headers()
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    server.body = (DATA_DIR / "wiki_page.html").read_text(encoding="utf-8")
+    server.etag, server.hits = '"v1"', []
+    server.delay, server.active, server.max_active = 0.0, 0, 0
+    server.lock = threading.Lock()
+    server.url = f"http://127.0.0.1:{server.server_address[1]}/wiki/Sondaggi"
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
 @pytest.fixture
 def simple_xy():
     x = np.array([0.0, 1.0, 2.0, 3.0, 4.0])
@@ -97,6 +147,16 @@ def simple_xy():
     return x, y, np.ones(5)
 
 
+@pytest.fixture
+def noisy_xyw():
+    """Unsorted noisy series with repeated days and some zero weights."""
+    rng = np.random.default_rng(0)
+    x = rng.integers(0, 120, 80).astype(float)
+    y = 50 + 5 * np.sin(x / 20) + rng.normal(0, 2, 80)
+    w = rng.uniform(300, 2000, 80) * (rng.random(80) > 0.1)
+    return x, y, w
+
+
 @pytest.fixture
 def loess_series():
     """(dates_series, values_series, weights_series) for TestLoess."""
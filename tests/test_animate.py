@@ -0,0 +1,112 @@
+"""Tests for animate module: render_frames, animate."""
+
+import numpy as np
+import pandas as pd
+import pytest
+from PIL import Image
+
+import sondaggi.animate as animate
+
+
+def _pixels(path):
+    return np.asarray(Image.open(path))
+
+
+class TestRenderFrames:
+    """One PNG per cutoff, drawn by blitting onto a shared background."""
+
+    def test_one_frame_per_poll_date(self, clean_plot_minimal, tmp_path):
+        frames = animate.render_frames(clean_plot_minimal, 0.8, tmp_path, dpi=50)
+        assert [p.name for p in frames] == [
+            animate.FRAME_PATTERN.format(i) for i in range(len(clean_plot_minimal))
+        ]
+        first, last = _pixels(frames[0]), _pixels(frames[-1])
+        assert first.shape == (300, 600, 3)
+        assert (first != last).any()
+
+    def test_unsorted_input_and_cutoffs(self, clean_plot_minimal, tmp_path):
+        cutoffs = pd.DatetimeIndex(["2025-11-20", "2025-10-20"])
+        shuffled = clean_plot_minimal.iloc[::-1]
+        frames = animate.render_frames(
+            shuffled, 0.8, tmp_path / "a", cutoffs, grid=50, dpi=30
+        )
+        ref = animate.render_frames(
+            clean_plot_minimal, 0.8, tmp_path / "b", cutoffs, grid=50, dpi=30
+        )
+        assert len(frames) == 2
+        for got, expected in zip(frames, ref):
+            np.testing.assert_array_equal(_pixels(got), _pixels(expected))
+
+    def test_blitted_frames_match_fresh_figures(
+        self, clean_plot_minimal, tmp_path, monkeypatch
+    ):
+        shared = animate.render_frames(
+            clean_plot_minimal, 0.8, tmp_path / "shared", dpi=30, processes=1
+        )
+        monkeypatch.setattr(animate, "_FRAME_CHUNK", 1)
+        fresh = animate.render_frames(
+            clean_plot_minimal, 0.8, tmp_path / "fresh", dpi=30, processes=1
+        )
+        for got, expected in zip(shared, fresh):
+            np.testing.assert_array_equal(_pixels(got), _pixels(expected))
+
+    def test_pool_matches_inline(self, clean_plot_minimal, tmp_path, monkeypatch):
+        monkeypatch.setattr(animate, "_FRAME_CHUNK", 2)
+        pooled = animate.render_frames(
+            clean_plot_minimal, 0.8, tmp_path / "pool", dpi=30, processes=2
+        )
+        inline = animate.render_frames(
+            clean_plot_minimal, 0.8, tmp_path / "inline", dpi=30, processes=1
+        )
+        for got, expected in zip(pooled, inline):
+            np.testing.assert_array_equal(_pixels(got), _pixels(expected))
+
+    def test_missing_sample_sizes(self, clean_plot_minimal, tmp_path):
+        df = clean_plot_minimal.assign(
+            sample_size=clean_plot_minimal["sample_size"].mask(lambda s: s > 700)
+        )
+        assert len(animate.render_frames(df, 0.8, tmp_path, dpi=30)) == len(df)
+
+    def test_unweighted(self, clean_plot_minimal, tmp_path):
+        df = clean_plot_minimal.drop(columns="sample_size")
+        assert len(animate.render_frames(df, 0.8, tmp_path, dpi=30)) == len(df)
+
+
+class TestAnimate:
+    def test_gif(self, clean_plot_minimal, tmp_path):
+        out = tmp_path / "anim.gif"
+        animate.animate(clean_plot_minimal, 0.8, out, fps=4, dpi=30)
+        gif = Image.open(out)
+        assert gif.n_frames == len(clean_plot_minimal)
+        assert gif.info["duration"] == 250
+
+    def test_png_directory(self, clean_plot_minimal, tmp_path):
+        animate.animate(clean_plot_minimal, 0.8, tmp_path / "frames", dpi=30)
+        assert len(list((tmp_path / "frames").glob("frame_*.png"))) == 5
+
+    def test_video_with_ffmpeg(self, clean_plot_minimal, tmp_path, monkeypatch):
+        calls = []
+        monkeypatch.setattr(animate.shutil, "which", lambda name: f"/bin/{name}")
+        monkeypatch.setattr(
+            animate.subprocess, "run", lambda cmd, check: calls.append(cmd)
+        )
+        out = tmp_path / "anim.mp4"
+        animate.animate(clean_plot_minimal, 0.8, out, fps=12, dpi=30)
+        (cmd,) = calls
+        assert cmd[0] == "/bin/ffmpeg" and cmd[-1] == str(out)
+        assert cmd[cmd.index("-framerate") + 1] == "12"
+        assert cmd[cmd.index("-i") + 1].endswith("frame_%05d.png")
+
+    def test_video_needs_ffmpeg(self, clean_plot_minimal, tmp_path, monkeypatch):
+        monkeypatch.setattr(animate.shutil, "which", lambda name: None)
+        with pytest.raises(RuntimeError, match="ffmpeg is needed"):
+            animate.animate(clean_plot_minimal, 0.8, tmp_path / "anim.mp4")
+
+    def test_no_cutoffs(self, clean_plot_minimal, tmp_path):
+        with pytest.raises(ValueError, match="No cutoffs"):
+            animate.animate(
+                clean_plot_minimal,
+                0.8,
+                tmp_path / "anim.gif",
+                cutoffs=pd.DatetimeIndex([]),
+            )
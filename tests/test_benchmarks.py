@@ -0,0 +1,86 @@
+"""Tests for the benchmark suite: synthetic tables and the runner."""
+
+import json
+import warnings
+
+import pytest
+
+from benchmarks import importtime, suite
+from benchmarks.synthetic import RAW_COLUMNS, synthetic_table
+from sondaggi import data
+
+
+class TestSyntheticTable:
+    """Generated tables look like the Wikipedia table and clean mostly fine."""
+
+    def test_quirks_present(self):
+        df = synthetic_table(2000, seed=1)
+        assert list(df.columns) == RAW_COLUMNS and len(df) == 2000
+        assert df["Data pubblicazione"].str.contains(r"\[\d+\]").any()
+        assert df["Margine di errore"].str.startswith("±").any()
+        assert (df["Campione"] == "N.D.").any()
+        assert df["Campione"].str.contains(r"^\d\.\d{3}$").any()
+        assert df["Data pubblicazione"].duplicated().any()
+
+    def test_cleans(self):
+        with warnings.catch_warnings():
+            warnings.simplefilter("ignore")
+            out, rejected = data.prepare_data(synthetic_table(1000), with_rejected=True)
+        assert len(out) > 950
+        assert set(rejected["reason"]) <= set(data.REJECT_REASONS)
+
+    def test_deterministic(self):
+        synthetic_table.cache_clear()
+        first = synthetic_table(300, seed=2).copy()
+        synthetic_table.cache_clear()
+        assert synthetic_table(300, seed=2).equals(first)
+
+
+class TestSuite:
+    def test_run_save_compare(self, tmp_path):
+        results = suite.run_suite([100, 20_000], ["merge_same_date", "lowess"], 1)
+        assert [(r["stage"], r["rows"]) for r in results] == [
+            ("merge_same_date", 100),
+            ("merge_same_date", 20_000),
+            ("lowess", 100),  # capped at 10**4
+        ]
+        assert all(r["seconds"] > 0 and r["peak_mib"] > 0 for r in results)
+        path = tmp_path / "base.json"
+        suite.save_baseline(results, path)
+        assert "pandas" in json.loads(path.read_text())["environment"]
+        cmp = suite.compare(results, path)
+        assert cmp["time_ratio"].tolist() == pytest.approx([1.0, 1.0, 1.0])
+
+
+class TestImportTime:
+    """Import-time budgets: the parser and the banned-module check."""
+
+    REPORT = """\
+import time: self [us] | cumulative | imported package
+import time:       500 |       1500 |   numpy.core
+import time:      2000 |       3500 | numpy
+import time:       250 |        250 | sondaggi
+"""
+
+    def test_import_times(self):
+        assert importtime.import_times(self.REPORT) == {
+            "  numpy.core": 1.5,
+            "numpy": 3.5,
+            "sondaggi": 0.25,
+        }
+
+    def test_package_and_modules_stay_light(self):
+        results = importtime.check(
+            [
+                b
+                for b in importtime.BUDGETS
+                if b.name in ("import sondaggi", "--help", "import sondaggi.plot")
+            ],
+            scale=float("inf"),
+        )
+        assert [r["forbidden"] for r in results] == [[], [], []]
+        assert all(r["ok"] and r["ms"] > 0 for r in results)
+
+    def test_banned_module_fails(self, tmp_path):
+        budget = importtime.Budget("numpy", ["-c", "import numpy"], 1e9, ("numpy",))
+        assert importtime.measure(budget, tmp_path)[1] == ["numpy"]
@@ -0,0 +1,76 @@
+"""Tests for cache module: stage_key, StageCache."""
+
+import hashlib
+import os
+
+import pytest
+
+import sondaggi.cache as cache
+
+
+class TestStageKey:
+    """Keys depend on stage, inputs and code version only."""
+
+    def test_stable_and_input_sensitive(self):
+        key = cache.stage_key("clean", b"raw", True, None)
+        assert key == cache.stage_key("clean", b"raw", True, None)
+        assert key.startswith("clean-")
+        assert key != cache.stage_key("clean", b"raw", False, None)
+        assert key != cache.stage_key("clean", b"raw2", True, None)
+        assert key != cache.stage_key("smooth", b"raw", True, None)
+
+    def test_code_version_invalidates(self, monkeypatch):
+        key = cache.stage_key("smooth", 0.4)
+        monkeypatch.setattr(cache, "code_version", lambda: "other")
+        assert cache.stage_key("smooth", 0.4) != key
+
+
+class TestFileDigest:
+    def test_matches_sha256(self, tmp_path):
+        path = tmp_path / "raw.csv"
+        path.write_bytes(b"a,b\n" * 1000)
+        assert (
+            cache.file_digest(path, block=7)
+            == hashlib.sha256(path.read_bytes()).hexdigest()
+        )
+
+
+class TestStageCache:
+    """run/file compute once per key; force and evict behave."""
+
+    def test_run_computes_once(self, tmp_path):
+        calls = []
+        sc = cache.StageCache(tmp_path)
+        for _ in range(2):
+            assert sc.run("k", lambda: calls.append(1) or {"a": 1}) == {"a": 1}
+        assert len(calls) == 1
+        assert sc.misses == ["k"] and sc.hits == ["k"]
+
+    def test_force_recomputes(self, tmp_path):
+        cache.StageCache(tmp_path).run("k", lambda: 1)
+        assert cache.StageCache(tmp_path, force=True).run("k", lambda: 2) == 2
+        assert cache.StageCache(tmp_path).run("k", lambda: 3) == 2
+
+    def test_file_copies_cached_output(self, tmp_path):
+        sc = cache.StageCache(tmp_path / "c")
+        out = tmp_path / "plot.png"
+        sc.file("p", out, lambda: out.write_bytes(b"png"))
+        out.unlink()
+        sc.file("p", out, lambda: pytest.fail("rebuilt"))
+        assert out.read_bytes() == b"png"
+
+    def test_evict_by_age_and_size(self, tmp_path):
+        sc = cache.StageCache(tmp_path)
+        for i, name in enumerate(["old", "mid", "new"]):
+            sc.run(name, lambda: bytes(1000))
+            path = tmp_path / f"{name}.pkl"
+            os.utime(path, (0, 1_000_000 * (i + 1)))
+        os.utime(tmp_path / "new.pkl")  # recently used
+        removed = sc.evict(max_age=86400)
+        assert {p.stem for p in removed} == {"old", "mid"}
+        sc.run("other", lambda: bytes(1000))
+        removed = sc.evict(max_bytes=1500)
+        assert len(removed) == 1 and (tmp_path / "other.pkl").exists()
+
+    def test_evict_missing_root(self, tmp_path):
+        assert cache.StageCache(tmp_path / "none").evict(max_bytes=0) == []
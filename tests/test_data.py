@@ -1,5 +1,7 @@
 """Tests for data module: parsing, cleaning, merge, prepare_data."""
 
+import argparse
+import json
 import warnings
 from datetime import date
 from math import nan
@@ -7,7 +9,9 @@ from math import nan
 import numpy as np
 import pandas as pd
 import pytest
+from babel.numbers import parse_decimal
 
+import sondaggi.__main__ as cli
 import sondaggi.data as data
 
 # Parametrized parsing cases (not tabular; kept in code)
@@ -31,6 +35,26 @@ TO_NUMBER_CASES = [
 
 TO_NUMBER_INVALID = ["nan", "N.D.", "abc"]
 
+# Cells that must parse exactly as babel's parse_decimal(locale="it_IT") would
+TO_NUMBERS_COLUMN = [
+    "44,5",
+    " 1.000,25 ",
+    "1.000.000",
+    "1000000,125",
+    "007",
+    "1.00",
+    "12.3456",
+    "741,91013991615109032",  # pd.to_numeric is 1 ulp off
+    "1,",
+    "±3",
+    "",
+    "nan",
+    np.nan,
+    None,
+    800,
+    800.0,
+]
+
 # Ref-stripping: Wikipedia-style [1]..[N] removed before parsing
 STRIP_WIKI_REF_CASES = [
     ("30 settembre 2025[108]", "30 settembre 2025"),
@@ -67,6 +91,34 @@ class TestToDate:
         assert data._to_date(123) is pd.NaT
 
 
+class TestToDates:
+    """_to_dates: column-at-once Italian date parsing, no system locale."""
+
+    def test_column_matches_scalar_cases(self):
+        cells = [s for s, _ in TO_DATE_CASES] + [np.nan, 123]
+        result = data._to_dates(pd.Series(cells, dtype=object, index=range(5, 15)))
+        assert pd.api.types.is_datetime64_any_dtype(result)
+        assert list(result.index) == list(range(5, 15))
+        expected_valid = [e == "valid" for _, e in TO_DATE_CASES] + [False, False]
+        assert result.notna().tolist() == expected_valid
+
+    @pytest.mark.parametrize(
+        "s,expected",
+        [
+            (" 5  maggio 2025 ", "2025-05-05"),
+            ("05 maggio 2025", "2025-05-05"),
+            ("29 febbraio 2024", "2024-02-29"),
+            ("1 dicembre 2025", "2025-12-01"),
+        ],
+    )
+    def test_parsed_values(self, s, expected):
+        assert data._to_dates(pd.Series([s])).iloc[0] == pd.Timestamp(expected)
+
+    @pytest.mark.parametrize("s", ["29 febbraio 2025", "5 Maggio 2025", "5 May 2025"])
+    def test_invalid_dates(self, s):
+        assert pd.isna(data._to_dates(pd.Series([s])).iloc[0])
+
+
 class TestToNumber:
     """_to_number parsing (Italian decimal)."""
 
@@ -80,6 +132,33 @@ class TestToNumber:
         assert _is_nan(data._to_number(s))
 
 
+class TestToNumbers:
+    """_to_numbers: column-at-once Italian number parsing."""
+
+    def test_matches_babel_per_cell(self):
+        def reference(s):
+            if pd.isna(s) or not (s := str(s).strip()) or s == "nan":
+                return nan
+            if not data._ITALIAN_NUMBER_RE.match(s):
+                return nan
+            return float(parse_decimal(s, locale="it_IT"))
+
+        col = pd.Series(TO_NUMBERS_COLUMN, dtype=object, index=range(10, 26))
+        result = data._to_numbers(col)
+        assert result.dtype == np.float64
+        assert result.index.equals(col.index)
+        expected = [reference(s) for s in TO_NUMBERS_COLUMN]
+        np.testing.assert_array_equal(result.to_numpy(), expected)
+
+    def test_string_dtype_and_empty(self):
+        col = pd.Series(["1,5", pd.NA, "2"], dtype="string")
+        np.testing.assert_array_equal(data._to_numbers(col), [1.5, nan, 2.0])
+        assert data._to_numbers(pd.Series([], dtype=object)).empty
+
+    def test_non_ascii_digits(self):
+        assert data._to_numbers(pd.Series(["\u0663"])).iloc[0] == 3.0
+
+
 class TestStripWikiRefs:
     """_strip_wiki_refs / _strip_wikipedia_refs: remove [1]..[N] everywhere."""
 
@@ -108,24 +187,6 @@ class TestNormDateCell:
         assert pd.isna(data._norm_date_cell(np.nan))
 
 
-class TestWarnRows:
-    """_warn_rows: warns per row with >1 distinct value; skips uniform rows."""
-
-    def test_skips_row_with_single_value(self):
-        """Row where all values are equal does not emit a warning (continue branch)."""
-        df = pd.DataFrame([{"a": 1, "b": 1, "c": 1}])
-        with warnings.catch_warnings(record=True) as record:
-            warnings.simplefilter("always", Warning)
-            data._warn_rows(df)
-        assert len(record) == 0
-
-    def test_warns_row_with_mixed_values(self):
-        """Row with distinct values emits one warning."""
-        df = pd.DataFrame([{"a": 1, "b": 2}])
-        with pytest.warns(Warning, match="'a': 1"):
-            data._warn_rows(df)
-
-
 class TestMergeSameDate:
     """merge_same_date aggregates rows by date."""
 
@@ -154,6 +215,52 @@ class TestMergeSameDate:
         assert merged_row["sample_size"] == 800.0 + 200.0
         assert "A" in merged_row["istituto"] and "C" in merged_row["istituto"]
 
+    def test_matches_per_group_weighted_average(self):
+        df = pd.DataFrame(
+            {
+                "date": pd.to_datetime(["2025-10-01"] * 3 + ["2025-10-02"] * 2),
+                "istituto": ["A", "B", "A", "C", "C"],
+                "yes_norm": [50.0, 60.0, 40.0, 55.0, 45.0],
+                "no_norm": [50.0, 40.0, 60.0, 45.0, 55.0],
+                "sample_size": [1000.0, 500.0, np.nan, 0.0, np.nan],
+                "error_margin": [3.0, np.nan, 2.0, 3.0, 4.0],
+            }
+        )
+        result = data.merge_same_date(df)
+        assert list(result["istituto"]) == ["A, B", "C"]
+        np.testing.assert_allclose(result["yes_norm"], [(50e3 + 30e3) / 1500, 50.0])
+        np.testing.assert_allclose(result["error_margin"], [3e3 / 1500, 3.5])
+        np.testing.assert_array_equal(result["sample_size"], [1500.0, 0.0])
+
+    @pytest.mark.parametrize(
+        "window,dates",
+        [
+            ("W", ["2025-09-30", "2025-10-07"]),
+            ("3d", ["2025-09-30", "2025-10-06", "2025-10-08"]),
+        ],
+    )
+    def test_merge_window(self, window, dates):
+        df = pd.DataFrame(
+            {
+                "date": pd.to_datetime(
+                    ["2025-09-29", "2025-10-01", "2025-10-06", "2025-10-08"]
+                ),
+                "istituto": ["A", "B", "A", "B"],
+                "yes_norm": [50.0, 52.0, 54.0, 56.0],
+                "no_norm": [50.0, 48.0, 46.0, 44.0],
+                "sample_size": [1000.0] * 4,
+                "error_margin": [3.0] * 4,
+            }
+        )
+        result = data.merge_same_date(df, window)
+        assert list(result["date"]) == list(pd.to_datetime(dates))
+        assert list(result.columns) == data.CLEAN_COLUMNS
+
+    @pytest.mark.parametrize("window", ["0D", "week", "D"])
+    def test_invalid_window(self, clean_df, window):
+        with pytest.raises(ValueError, match="Invalid merge window"):
+            data.merge_same_date(clean_df, window)
+
 
 class TestPrepareData:
     """prepare_data: full pipeline."""
@@ -169,8 +276,12 @@ class TestPrepareData:
         with_merge = data.prepare_data(raw_df_two_dates, merge=True)
         assert len(with_merge) <= len(no_merge)
 
+    def test_merge_window(self, raw_df_two_dates):
+        result = data.prepare_data(raw_df_two_dates, merge=True, merge_window="W")
+        assert len(result) == 1
+
     def test_filters_out_bad_rows(self, raw_df_bad):
-        with pytest.warns(Warning, match="not a date"):
+        with pytest.warns(Warning, match=r"Rejected 1 rows \(bad date: 1\)"):
             result = data.prepare_data(raw_df_bad, merge=False)
         assert len(result) == 0
 
@@ -185,3 +296,184 @@ class TestPrepareData:
         result = data.prepare_data(raw_df, merge=False, start_date=date(2025, 1, 1))
         assert len(result) >= 1
         assert (result["date"] >= pd.Timestamp("2025-01-01")).all()
+
+
+class TestParseRows:
+    """parse_rows: row-hash index reused across runs, same prepare_data output."""
+
+    @pytest.fixture
+    def raw_table(self, raw_df):
+        rows = [raw_df.iloc[0].to_dict() for _ in range(4)]
+        rows[1]["Istituto"], rows[1]["Sì"] = "B", "40%"
+        rows[2]["Data pubblicazione"] = "N.D."
+        return pd.DataFrame(rows, columns=raw_df.columns)
+
+    def test_only_new_rows_parsed(self, raw_table, monkeypatch):
+        known = data.parse_rows(raw_table)
+        edited = raw_table.copy()
+        edited.loc[1, "Sì"] = "41%"
+        parsed = []
+        parse = data._parse_table
+        monkeypatch.setattr(
+            data, "_parse_table", lambda df: parsed.append(len(df)) or parse(df)
+        )
+        rows = data.parse_rows(edited, known)
+        assert parsed == [1]
+        pd.testing.assert_frame_equal(rows, data.parse_rows(edited))
+        assert rows.index.tolist() == data.row_hashes(edited).tolist()
+
+    def test_prepare_data_with_rows_matches_full(self, raw_table):
+        known = data.parse_rows(raw_table.iloc[:2])
+        rows = data.parse_rows(raw_table, known)
+        with pytest.warns(Warning, match="Rejected 1 rows"):
+            out, rejected = data.prepare_data(raw_table, with_rejected=True, rows=rows)
+        with pytest.warns(Warning, match="Rejected 1 rows"):
+            full, full_rejected = data.prepare_data(raw_table, with_rejected=True)
+        pd.testing.assert_frame_equal(out, full)
+        pd.testing.assert_frame_equal(rejected, full_rejected)
+
+    def test_schema_change_discards_known(self, raw_table, monkeypatch):
+        known = data.parse_rows(raw_table)
+        parsed = []
+        parse = data._parse_table
+        monkeypatch.setattr(
+            data, "_parse_table", lambda df: parsed.append(len(df)) or parse(df)
+        )
+        data.parse_rows(raw_table.astype({"Distacco": float}), known)
+        assert parsed == [len(raw_table)]
+
+
+class TestPrepareChunks:
+    """Streaming cleaning of raw CSVs matches prepare_data on the whole table."""
+
+    @pytest.fixture
+    def sources(self, raw_df, tmp_path):
+        rows = [raw_df.iloc[0].to_dict() for _ in range(7)]
+        for i, row in enumerate(rows):
+            row["Data pubblicazione"] = f"{i + 10} gennaio 2026"
+        rows[1]["Campione"] = ""  # pd.read_csv would infer float sizes
+        rows[2]["Sì"] = "x%"
+        rows[5] = dict.fromkeys(raw_df.columns, "Febbraio 2026")
+        table = pd.DataFrame(rows, columns=raw_df.columns)
+        paths = [tmp_path / "a.csv", tmp_path / "b.csv"]
+        table.iloc[:4].to_csv(paths[0], index=False)
+        table.iloc[4:].drop(columns="Committente").to_csv(paths[1], index=False)
+        return paths
+
+    @pytest.mark.parametrize("chunksize", [1, 3, 100])
+    @pytest.mark.parametrize(
+        "kwargs",
+        [{}, {"merge": True, "merge_window": "W"}, {"start_date": date(2026, 1, 12)}],
+    )
+    def test_matches_in_memory(self, sources, chunksize, kwargs):
+        whole = pd.concat(
+            [pd.read_csv(p, dtype=str) for p in sources], ignore_index=True
+        )
+        with warnings.catch_warnings(record=True) as full_warnings:
+            warnings.simplefilter("always", Warning)
+            expected = data.prepare_data(whole, with_rejected=True, **kwargs)
+        with warnings.catch_warnings(record=True) as chunk_warnings:
+            warnings.simplefilter("always", Warning)
+            result = data.prepare_chunks(
+                data.read_raw_chunks(sources, chunksize), with_rejected=True, **kwargs
+            )
+        for got, want in zip(result, expected, strict=True):
+            pd.testing.assert_frame_equal(got, want)
+        assert [str(w.message) for w in chunk_warnings] == [
+            str(w.message) for w in full_warnings
+        ]
+
+    def test_matches_cli(self, sources, tmp_path):
+        args = argparse.Namespace(
+            cache_dir=tmp_path / "cache",
+            force=False,
+            start_date=None,
+            merge_window=None,
+        )
+        with pytest.warns(Warning, match="Rejected 1 rows"):
+            expected = cli._clean(sources[0].read_bytes(), args, merge=False)
+        with pytest.warns(Warning, match="Rejected 1 rows"):
+            result = data.prepare_chunks(
+                data.read_raw_chunks(sources[:1]), with_rejected=True
+            )
+        for got, want in zip(result, expected, strict=True):
+            pd.testing.assert_frame_equal(got, want)
+        assert result[0]["sample_size"].notna().tolist() == [True, False, True]
+
+    def test_chunks_numbered_consecutively(self, sources):
+        chunks = list(data.read_raw_chunks(sources, chunksize=3))
+        assert [len(c) for c in chunks] == [3, 1, 3]
+        assert pd.concat(chunks).index.tolist() == list(range(7))
+        assert all("Committente" in c.columns for c in chunks)
+
+    def test_no_chunks(self):
+        with pytest.raises(ValueError, match="No raw chunks"):
+            data.prepare_chunks([])
+
+
+class TestRejections:
+    """prepare_data(with_rejected=True): one row per rejection, with reason."""
+
+    @pytest.fixture
+    def raw_mixed(self, raw_df):
+        rows = [raw_df.iloc[0].to_dict() for _ in range(7)]
+        rows[1]["Data pubblicazione"] = "N.D."
+        rows[2]["Sì"] = "44,5"
+        rows[3]["Data pubblicazione"] = "32 gennaio 2026"
+        rows[4]["Sì"], rows[4]["No"] = "0%", "0%"
+        rows[5]["No"] = "abc%"
+        rows[6] = dict.fromkeys(raw_df.columns, "Gennaio 2026")
+        return pd.DataFrame(rows, columns=raw_df.columns)
+
+    def test_reasons(self, raw_mixed):
+        with pytest.warns(Warning, match="Rejected 5 rows"):
+            out, rejected = data.prepare_data(raw_mixed, with_rejected=True)
+        assert len(out) == 1
+        assert rejected.index.tolist() == [1, 2, 3, 4, 5]
+        assert rejected["reason"].tolist() == [
+            "bad date",
+            "missing %",
+            "bad date",
+            "zero total",
+            "bad number",
+        ]
+        assert set(rejected["reason"]) <= set(data.REJECT_REASONS)
+        assert rejected.loc[2, "Sì"] == "44,5"  # raw cell, not the cleaned one
+
+    def test_before_start_date_reported_without_warning(self, raw_df):
+        with warnings.catch_warnings():
+            warnings.simplefilter("error")
+            out, rejected = data.prepare_data(
+                raw_df, start_date=date(2026, 2, 1), with_rejected=True
+            )
+        assert out.empty
+        assert rejected["reason"].tolist() == ["before start_date"]
+
+    def test_no_rejections(self, raw_df):
+        _, rejected = data.prepare_data(raw_df, with_rejected=True)
+        assert rejected.empty and "reason" in rejected.columns
+
+    def test_summary(self, raw_mixed):
+        with pytest.warns(Warning):
+            _, rejected = data.prepare_data(raw_mixed, with_rejected=True)
+        summary = data.rejection_summary(rejected)
+        assert summary.to_dict() == {
+            "bad date": 2,
+            "missing %": 1,
+            "zero total": 1,
+            "bad number": 1,
+        }
+
+    @pytest.mark.parametrize("name", ["rejected.csv", "rejected.json"])
+    def test_write_report(self, raw_mixed, tmp_path, name):
+        with pytest.warns(Warning):
+            _, rejected = data.prepare_data(raw_mixed, with_rejected=True)
+        path = tmp_path / name
+        data.write_rejected(rejected, path)
+        if path.suffix == ".json":
+            report = json.loads(path.read_text(encoding="utf-8"))
+            assert report["summary"]["bad date"] == 2
+            assert len(report["rows"]) == 5
+            assert report["rows"][0]["reason"] == "bad date"
+        else:
+            assert pd.read_csv(path)["reason"].tolist() == rejected["reason"].tolist()
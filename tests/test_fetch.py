@@ -1,5 +1,7 @@
 """Tests for fetch module: download_sondaggi."""
 
+import json
+import time
 from unittest.mock import Mock
 
 import pandas as pd
@@ -11,30 +13,220 @@ import sondaggi.fetch as fetch
 class TestDownloadSondaggi:
     """download_sondaggi finds table and writes CSV."""
 
-    def test_writes_csv_when_table_found(
-        self, fetch_csv_path, monkeypatch, fetch_table_ok_df
-    ):
-        monkeypatch.setattr(
-            "sondaggi.fetch.requests.get",
-            Mock(return_value=Mock(text="<table/>")),
-        )
-        monkeypatch.setattr(
-            "sondaggi.fetch.pd.read_html", lambda _: [fetch_table_ok_df]
+    def test_writes_csv_when_table_found(self, fetch_csv_path, wiki_page_html):
+        resp = Mock(status_code=200, text=wiki_page_html)
+        fetch.download_sondaggi(
+            fetch_csv_path, session=Mock(get=Mock(return_value=resp))
         )
-        fetch.download_sondaggi(fetch_csv_path)
         assert fetch_csv_path.exists()
         df = pd.read_csv(fetch_csv_path)
         assert "Istituto" in df.columns and "Sì" in df.columns
 
-    def test_raises_when_table_not_found(self, fetch_csv_path, monkeypatch):
-        monkeypatch.setattr(
-            "sondaggi.fetch.requests.get",
-            Mock(return_value=Mock(text="<html/>")),
-        )
+    def test_raises_when_table_not_found(self, fetch_csv_path):
+        resp = Mock(status_code=200, text="<html><table><tr><th>A</th></tr></table>")
+        with pytest.raises(SystemExit):
+            fetch.download_sondaggi(
+                fetch_csv_path, session=Mock(get=Mock(return_value=resp))
+            )
+        assert not fetch_csv_path.exists()
+
+    def test_reads_only_matching_table(
+        self, fetch_csv_path, wiki_page_html, monkeypatch
+    ):
+        seen = []
+        read_html = pd.read_html
         monkeypatch.setattr(
             "sondaggi.fetch.pd.read_html",
-            lambda _: [pd.DataFrame({"A": [1]})],
+            lambda src: seen.append(src.getvalue()) or read_html(src),
         )
-        with pytest.raises(SystemExit):
-            fetch.download_sondaggi(fetch_csv_path)
-        assert not fetch_csv_path.exists()
+        resp = Mock(status_code=200, text=wiki_page_html)
+        fetch.download_sondaggi(
+            fetch_csv_path, session=Mock(get=Mock(return_value=resp))
+        )
+        assert len(seen) == 1 and "Evento" not in seen[0]
+
+    def test_section_via_parse_api(self, wiki_server, fetch_csv_path):
+        wiki_server.body = json.dumps({"parse": {"text": wiki_server.body}})
+        fetch.download_sondaggi(fetch_csv_path, url=wiki_server.url, section=3)
+        path = wiki_server.hits[0][0]
+        assert path.startswith("/w/api.php?action=parse")
+        assert "section=3" in path and "page=Sondaggi" in path
+        assert list(pd.read_csv(fetch_csv_path)["Istituto"]) == ["X"]
+
+    def test_local_server_without_cache(self, wiki_server, fetch_csv_path):
+        assert fetch.download_sondaggi(fetch_csv_path, url=wiki_server.url)
+        df = pd.read_csv(fetch_csv_path)
+        assert list(df["Istituto"]) == ["X"]
+        assert wiki_server.hits == [("/wiki/Sondaggi", None, 200)]
+
+    def test_unchanged_page_short_circuits(self, wiki_server, fetch_csv_path, tmp_path):
+        cache = tmp_path / "cache"
+        assert fetch.download_sondaggi(fetch_csv_path, cache, url=wiki_server.url)
+        fetch_csv_path.write_text("untouched")
+        assert not fetch.download_sondaggi(fetch_csv_path, cache, url=wiki_server.url)
+        assert fetch_csv_path.read_text() == "untouched"
+        assert [h[1:] for h in wiki_server.hits] == [(None, 200), ('"v1"', 304)]
+
+    def test_unchanged_page_rebuilds_missing_csv(
+        self, wiki_server, fetch_csv_path, tmp_path
+    ):
+        cache = tmp_path / "cache"
+        fetch.download_sondaggi(fetch_csv_path, cache, url=wiki_server.url)
+        fetch_csv_path.unlink()
+        assert not fetch.download_sondaggi(fetch_csv_path, cache, url=wiki_server.url)
+        assert list(pd.read_csv(fetch_csv_path)["Istituto"]) == ["X"]
+
+    def test_changed_page_refetched(self, wiki_server, fetch_csv_path, tmp_path):
+        cache = tmp_path / "cache"
+        fetch.download_sondaggi(fetch_csv_path, cache, url=wiki_server.url)
+        wiki_server.etag = '"v2"'
+        wiki_server.body = wiki_server.body.replace("<td>X</td>", "<td>Y</td>")
+        assert fetch.download_sondaggi(fetch_csv_path, cache, url=wiki_server.url)
+        assert list(pd.read_csv(fetch_csv_path)["Istituto"]) == ["Y"]
+
+
+class TestExtractTable:
+    """extract_table: pick the poll table by its header cells."""
+
+    def test_finds_table_with_columns(self, wiki_page_html):
+        table = fetch.extract_table(wiki_page_html)
+        assert table.startswith("<table") and "Istituto" in table
+        assert "Evento" not in table
+
+    def test_header_text_normalised(self):
+        html = (
+            "<table><tr><th> Isti<b>tuto</b> </th><th>Sì<sup></sup></th></tr></table>"
+        )
+        assert fetch.extract_table(html) is not None
+
+    @pytest.mark.parametrize(
+        "html",
+        [
+            "<html><body><p>no tables</p></body></html>",
+            "<table></table>",
+            "<table><tr><td>Istituto</td><td>Sì</td></tr></table>",
+        ],
+    )
+    def test_none_when_missing(self, html):
+        assert fetch.extract_table(html) is None
+
+    def test_custom_columns(self, wiki_page_html):
+        assert "Approvazione" in fetch.extract_table(wiki_page_html, ("Evento",))
+
+
+class TestFetchPage:
+    """fetch_page: conditional GET and session setup."""
+
+    def test_sends_validators(self, wiki_server, tmp_path):
+        html, changed = fetch.fetch_page(wiki_server.url, tmp_path)
+        assert changed and "Sondaggi" in html
+        html2, changed2 = fetch.fetch_page(wiki_server.url, tmp_path)
+        assert (html2, changed2) == (html, False)
+
+    def test_http_error_raises(self, tmp_path):
+        resp = Mock(status_code=404, raise_for_status=Mock(side_effect=OSError))
+        with pytest.raises(OSError):
+            fetch.fetch_page("http://x", tmp_path, Mock(get=Mock(return_value=resp)))
+        assert not any(tmp_path.iterdir())
+
+    def test_session_mounts_retrying_adapter(self):
+        session = fetch.make_session(retries=5, backoff=1.0)
+        retry = session.get_adapter("https://it.wikipedia.org").max_retries
+        assert retry.total == 5 and retry.backoff_factor == 1.0
+        assert "User-Agent" in session.headers
+
+    def test_section_api_url(self):
+        url = fetch.section_api_url("https://it.wikipedia.org/wiki/Pagina%C3%A0", 2)
+        assert url == (
+            "https://it.wikipedia.org/w/api.php?action=parse&format=json"
+            "&formatversion=2&prop=text&section=2&page=Pagina%C3%A0"
+        )
+
+
+class TestDownloadPages:
+    """download_pages / download_all: concurrent multi-page fetch."""
+
+    def test_pages_fetched_concurrently(self, wiki_server, tmp_path):
+        wiki_server.delay = 0.3
+        pages = [
+            fetch.Page(f"{wiki_server.url}/{i}", tmp_path / f"{i}.csv")
+            for i in range(4)
+        ]
+        start = time.perf_counter()
+        result = fetch.download_all(pages, concurrency=4, rate_per_host=None)
+        assert time.perf_counter() - start < 1.0
+        assert wiki_server.max_active == 4
+        assert all(result[p.csv_path] is True for p in pages)
+        assert all(p.csv_path.exists() for p in pages)
+
+    def test_concurrency_bounded(self, wiki_server, tmp_path):
+        wiki_server.delay = 0.05
+        pages = [
+            fetch.Page(f"{wiki_server.url}/{i}", tmp_path / f"{i}.csv")
+            for i in range(5)
+        ]
+        fetch.download_all(pages, concurrency=2, rate_per_host=None)
+        assert wiki_server.max_active <= 2
+        assert len(wiki_server.hits) == 5
+
+    def test_rate_limit_per_host(self, wiki_server, tmp_path):
+        pages = [
+            fetch.Page(f"{wiki_server.url}/{i}", tmp_path / f"{i}.csv")
+            for i in range(3)
+        ]
+        start = time.perf_counter()
+        fetch.download_all(pages, concurrency=3, rate_per_host=10)
+        assert time.perf_counter() - start >= 0.2
+
+    def test_per_page_selector_and_errors(self, wiki_server, tmp_path):
+        ok = fetch.Page(wiki_server.url + "/a", tmp_path / "a.csv", ("Evento",))
+        bad = fetch.Page(wiki_server.url + "/b", tmp_path / "b.csv", ("Nope",))
+        result = fetch.download_all([ok, bad], rate_per_host=None)
+        assert result[ok.csv_path] is True
+        assert isinstance(result[bad.csv_path], LookupError)
+        assert list(pd.read_csv(ok.csv_path).columns) == ["Evento", "Data"]
+        assert not bad.csv_path.exists()
+
+    def test_same_url_fetched_once(self, wiki_server, tmp_path):
+        pages = [
+            fetch.Page(wiki_server.url, tmp_path / "a.csv", ("Evento",)),
+            fetch.Page(wiki_server.url, tmp_path / "b.csv"),
+            fetch.Page(wiki_server.url, tmp_path / "c.csv", ("Nope",)),
+        ]
+        result = fetch.download_all(pages, cache_dir=tmp_path / "c")
+        assert len(wiki_server.hits) == 1
+        assert list(result) == [p.csv_path for p in pages]
+        assert result[pages[0].csv_path] is result[pages[1].csv_path] is True
+        assert isinstance(result[pages[2].csv_path], LookupError)
+        assert list(pd.read_csv(pages[0].csv_path).columns) == ["Evento", "Data"]
+        assert "Istituto" in pd.read_csv(pages[1].csv_path).columns
+
+    def test_failed_fetch_fails_every_page(self, tmp_path, monkeypatch):
+        def fail(*args):
+            raise ConnectionError("down")
+
+        monkeypatch.setattr(fetch, "fetch_page", fail)
+        pages = [fetch.Page("https://x.org/p", tmp_path / f"{i}.csv") for i in range(2)]
+        result = fetch.download_all(pages, rate_per_host=None)
+        assert result[pages[0].csv_path] is result[pages[1].csv_path]
+        assert isinstance(result[pages[0].csv_path], ConnectionError)
+
+    def test_cached_unchanged_pages(self, wiki_server, tmp_path):
+        page = fetch.Page(wiki_server.url, tmp_path / "p.csv")
+        fetch.download_all([page], cache_dir=tmp_path / "c")
+        again = fetch.download_all([page], cache_dir=tmp_path / "c")
+        assert again == {page.csv_path: False}
+        assert [h[2] for h in wiki_server.hits] == [200, 304]
+
+    @pytest.mark.parametrize(
+        "title,url",
+        [
+            (
+                "Referendum in Italia",
+                "https://it.wikipedia.org/wiki/Referendum_in_Italia",
+            ),
+            ("https://example.org/x", "https://example.org/x"),
+        ],
+    )
+    def test_page_url(self, title, url):
+        assert fetch.page_url(title) == url
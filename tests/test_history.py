@@ -0,0 +1,84 @@
+"""Tests for history module: SnapshotHistory, poll_key."""
+
+from datetime import UTC, date, datetime
+
+import pandas as pd
+import pytest
+
+import sondaggi.history as history
+
+T1, T2, T3 = (datetime(2026, 1, d, 12) for d in (10, 20, 30))
+
+
+@pytest.fixture
+def table(raw_df_two_dates):
+    return raw_df_two_dates.astype(str)
+
+
+class TestPollKey:
+    def test_strips_refs_and_spacing(self):
+        row = {"Data pubblicazione": "15  gennaio 2026[3]", "Istituto": " Ipsos[1]"}
+        assert history.poll_key(row) == ("15 gennaio 2026", "Ipsos")
+
+
+class TestSnapshotHistory:
+    """Appends store only changed rows; as_of and versions replay them."""
+
+    def test_unchanged_snapshot_adds_nothing(self, table, tmp_path):
+        h = history.SnapshotHistory(tmp_path)
+        assert h.append(table, T1)["added"] == len(table)
+        assert h.append(table, T2) | {"at": None} == {
+            "at": None,
+            "rows": len(table),
+            "added": 0,
+            "removed": 0,
+        }
+        assert len(history.SnapshotHistory(tmp_path).as_of(T2)) == len(table)
+
+    def test_as_of_replays_corrections_and_deletions(self, table, tmp_path):
+        h = history.SnapshotHistory(tmp_path)
+        h.append(table, T1)
+        corrected = table.copy()
+        corrected.loc[0, "Sì"] = "50%"
+        h.append(corrected, T2)
+        h.append(corrected.iloc[1:], T3)
+        h = history.SnapshotHistory(tmp_path)  # reload from disk
+        assert h.snapshots[["added", "removed"]].values.tolist() == [
+            [2, 0],
+            [1, 1],
+            [0, 1],
+        ]
+        pd.testing.assert_frame_equal(h.as_of(T1), table)
+        pd.testing.assert_frame_equal(
+            h.as_of(date(2026, 1, 20)), corrected.iloc[[1, 0]].reset_index(drop=True)
+        )
+        assert len(h.as_of("2026-01-30")) == 1
+        assert h.as_of(date(2026, 1, 9)).empty
+        assert len(h.as_of(datetime(2026, 1, 20, 11, tzinfo=UTC))) == 2
+
+    def test_versions_of_a_poll(self, table, tmp_path):
+        h = history.SnapshotHistory(tmp_path)
+        h.append(table, T1)
+        corrected = table.copy()
+        corrected.loc[0, "Sì"] = "50%"
+        h.append(corrected, T2)
+        key = history.poll_key(table.iloc[0].to_dict())
+        v = h.versions(*key)
+        assert v["Sì"].tolist() == [table.loc[0, "Sì"], "50%"]
+        assert v["removed"].tolist()[0] == pd.Timestamp(T2)
+        assert pd.isna(v["removed"].tolist()[1])
+        assert h.versions("1 gennaio 1900", "none").empty
+
+    def test_duplicate_rows_kept(self, table, tmp_path):
+        h = history.SnapshotHistory(tmp_path)
+        doubled = pd.concat([table, table.iloc[[0]]], ignore_index=True)
+        h.append(doubled, T1)
+        h.append(table, T2)
+        assert len(h.as_of(T1)) == 3 and len(h.as_of(T2)) == 2
+
+    def test_rejects_older_snapshot(self, table, tmp_path):
+        h = history.SnapshotHistory(tmp_path)
+        h.append(table, T2)
+        with pytest.raises(ValueError, match="older"):
+            h.append(table, T1)
+        assert len(h.append(table)) == 4  # default time: now
@@ -0,0 +1,31 @@
+"""Tests for the package namespace: submodules load on first access."""
+
+import subprocess
+import sys
+
+import pytest
+
+import sondaggi
+
+
+class TestLazySubmodules:
+    def test_attribute_imports_submodule(self):
+        import sondaggi.store
+
+        assert sondaggi.__getattr__("store") is sondaggi.store
+        assert set(sondaggi.SUBMODULES) <= set(dir(sondaggi))
+
+    def test_unknown_attribute(self):
+        with pytest.raises(AttributeError, match="no attribute 'nope'"):
+            sondaggi.nope  # noqa: B018
+
+    def test_import_loads_nothing_else(self):
+        code = (
+            "import sys, sondaggi; "
+            "print(sorted(m for m in sys.modules if m.startswith('sondaggi.'))); "
+            "print('pandas' in sys.modules)"
+        )
+        out = subprocess.run(
+            [sys.executable, "-c", code], capture_output=True, text=True, check=True
+        ).stdout
+        assert out.split() == ["[]", "False"]
@@ -0,0 +1,121 @@
+"""Tests for instrument module: Profiler, stage."""
+
+import importlib
+import json
+import pstats
+import sys
+
+import numpy as np
+
+import sondaggi.instrument as instrument
+
+
+def _allocate(mib: int) -> np.ndarray:
+    return np.ones(mib * 2**20, dtype=np.uint8)
+
+
+class TestStage:
+    def test_noop_without_profiler(self):
+        with instrument.stage("clean", rows_in=3) as record:
+            record["rows_out"] = 2
+        assert record == {"rows_out": 2}
+
+    def test_records_stages_in_order(self):
+        with instrument.Profiler() as profiler:
+            with instrument.stage("clean", rows_in=10) as record:
+                record["rows_out"] = 8
+            with instrument.stage("smooth"):
+                pass
+        clean, smooth = profiler.records
+        assert clean["stage"] == "clean"
+        assert (clean["rows_in"], clean["rows_out"]) == (10, 8)
+        assert (smooth["rows_in"], smooth["rows_out"]) == (None, None)
+        assert clean["wall_s"] >= 0 and clean["cpu_s"] >= 0
+        assert clean["depth"] == smooth["depth"] == 0
+        with instrument.stage("after"):
+            pass
+        assert len(profiler.records) == 2
+
+    def test_nested_peaks(self):
+        with instrument.Profiler() as profiler, instrument.stage("outer"):
+            big = _allocate(8)
+            del big
+            with instrument.stage("inner"):
+                small = _allocate(2)
+                del small
+        outer, inner = profiler.records
+        assert inner["depth"] == 1
+        assert 2 <= inner["py_peak_mib"] < 8
+        assert outer["py_peak_mib"] >= 8
+
+    def test_inner_peak_counts_for_outer(self):
+        with (
+            instrument.Profiler() as profiler,
+            instrument.stage("outer"),
+            instrument.stage("inner"),
+        ):
+            big = _allocate(8)
+            del big
+        outer, inner = profiler.records
+        assert outer["py_peak_mib"] >= inner["py_peak_mib"] >= 8
+
+    def test_max_rss(self, monkeypatch):
+        assert instrument.max_rss_mib() > 0
+        monkeypatch.setattr(instrument, "resource", None)
+        assert instrument.max_rss_mib() is None
+
+    def test_without_resource_module(self, monkeypatch):
+        monkeypatch.setitem(sys.modules, "resource", None)
+        try:
+            importlib.reload(instrument)
+            assert instrument.max_rss_mib() is None
+        finally:
+            monkeypatch.undo()
+            importlib.reload(instrument)
+
+
+class TestCProfile:
+    def test_dumps_selected_stage(self, tmp_path):
+        out = tmp_path / "smooth.prof"
+        with instrument.Profiler("smooth", out):
+            with instrument.stage("clean"):
+                sorted(range(10))
+            with instrument.stage("smooth"):
+                _allocate(1)
+        functions = {f[2] for f in pstats.Stats(str(out)).stats}
+        assert "_allocate" in functions
+
+    def test_default_path(self, tmp_path, monkeypatch):
+        monkeypatch.chdir(tmp_path)
+        with instrument.Profiler("clean"), instrument.stage("clean"):
+            pass
+        assert (tmp_path / "clean.prof").exists()
+
+
+class TestReport:
+    def _profiler(self, monkeypatch):
+        monkeypatch.setattr(instrument, "max_rss_mib", lambda: None)
+        with (
+            instrument.Profiler() as profiler,
+            instrument.stage("clean", rows_in=1234) as record,
+        ):
+            record["rows_out"] = 1000
+            with instrument.stage("parse_rows"):
+                pass
+        return profiler
+
+    def test_table(self, monkeypatch):
+        header, clean, parse = self._profiler(monkeypatch).table().splitlines()
+        assert header.split()[:3] == ["stage", "wall", "s"]
+        assert clean.startswith("clean ")
+        assert clean.split()[-2:] == ["1,234", "1,000"]
+        assert parse.startswith("  parse_rows")
+
+    def test_write(self, tmp_path, monkeypatch):
+        profiler = self._profiler(monkeypatch)
+        profiler.write(tmp_path / "profile.json")
+        records = json.loads((tmp_path / "profile.json").read_text())
+        assert [r["stage"] for r in records] == ["clean", "parse_rows"]
+        assert records[0]["rows_out"] == 1000
+        profiler.write(tmp_path / "profile.txt")
+        assert (tmp_path / "profile.txt").read_text() == profiler.table() + "\n"
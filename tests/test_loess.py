@@ -38,16 +38,119 @@ class TestLowess:
         # With heavy weight on middle, middle fit should be closer to 10
         assert out_heavy_middle[1, 1] >= out_uniform[1, 1]
 
-    def test_zero_weight_sum_uses_observed_y(self):
-        """When local weight sum is 0, lowess falls back to observed y (lines 21-24)."""
+    @pytest.mark.parametrize("method", ["window", "reference"])
+    def test_zero_weight_sum_uses_observed_y(self, method):
+        """When local weight sum is 0, lowess falls back to observed y."""
         x = np.array([0.0, 1.0, 2.0])
         y = np.array([1.0, 2.0, 3.0])
         w = np.array([0.0, 0.0, 1.0])  # k=2 nearest to x[0] have weight 0
-        out = loess.lowess(x, y, w, frac=0.67)
+        out = loess.lowess(x, y, w, frac=0.67, method=method)
         assert out.shape == (3, 2)
         assert out[0, 1] == y[0]  # fallback to observed value
         assert np.all(np.isfinite(out[:, 1]))
 
+    @pytest.mark.parametrize("frac", [0.05, 0.2, 0.4, 1.0])
+    def test_window_matches_reference(self, noisy_xyw, frac):
+        x, y, w = noisy_xyw
+        fast = loess.lowess(x, y, w, frac)
+        ref = loess.lowess(x, y, w, frac, method="reference")
+        np.testing.assert_array_equal(fast[:, 0], ref[:, 0])
+        ok = np.isfinite(ref[:, 1])
+        np.testing.assert_allclose(fast[ok, 1], ref[ok, 1], rtol=1e-9)
+        assert np.all(np.isfinite(fast[:, 1]))
+
+    def test_window_small_blocks(self, noisy_xyw, monkeypatch):
+        """Block-wise evaluation gives the same fit as a single block."""
+        x, y, w = noisy_xyw
+        full = loess.lowess(x, y, w, 0.3)
+        monkeypatch.setattr(loess, "_BLOCK_ELEMS", 50)
+        np.testing.assert_array_equal(loess.lowess(x, y, w, 0.3), full)
+
+    def test_single_point(self):
+        out = loess.lowess(np.array([3.0]), np.array([7.0]), np.ones(1), frac=0.5)
+        np.testing.assert_array_equal(out, [[3.0, 7.0]])
+
+    @pytest.mark.parametrize("method", ["window", "reference"])
+    def test_matrix_matches_per_column(self, noisy_xyw, method):
+        x, y, w = noisy_xyw
+        ys = np.column_stack([y, 100 - y, y / 2])
+        out = loess.lowess(x, ys, w, 0.3, method=method)
+        assert out.shape == (len(x), 4)
+        for c in range(3):
+            single = loess.lowess(x, ys[:, c], w, 0.3, method=method)
+            np.testing.assert_allclose(out[:, c + 1], single[:, 1], rtol=1e-12)
+
+    def test_unknown_method_raises(self, simple_xy):
+        x, y, w = simple_xy
+        with pytest.raises(ValueError, match="Unknown lowess method"):
+            loess.lowess(x, y, w, frac=0.5, method="nope")
+
+
+class TestLowessModel:
+    """LowessModel: incremental refit on appended points."""
+
+    @pytest.mark.parametrize("frac", [0.1, 0.4, 1.0])
+    def test_updates_equal_full_refit(self, noisy_xyw, frac):
+        x, y, w = noisy_xyw
+        model = loess.LowessModel(x[:50], y[:50], w[:50], frac)
+        np.testing.assert_array_equal(
+            model.result(), loess.lowess(x[:50], y[:50], w[:50], frac)
+        )
+        for a, b in [(50, 51), (51, 53), (53, 80)]:
+            model.update(x[a:b], y[a:b], w[a:b])
+            np.testing.assert_array_equal(
+                model.result(), loess.lowess(x[:b], y[:b], w[:b], frac)
+            )
+
+    def test_refits_only_changed_windows(self):
+        x = np.arange(1000.0)
+        model = loess.LowessModel(x, np.sin(x / 50), np.ones(1000), 0.02)
+        stale = model.update(np.array([500.5]), np.array([0.0]), np.ones(1))
+        assert model.k == 20
+        assert 0 < len(stale) <= 2 * model.k
+        assert 501 in stale
+
+    def test_growing_k_refits_everything(self, simple_xy):
+        x, y, w = simple_xy
+        model = loess.LowessModel(x, y, w, 0.5)
+        stale = model.update(np.array([5.0]), np.array([5.0]), np.ones(1))
+        assert len(stale) == 6
+
+    def test_matrix_responses(self, noisy_xyw):
+        x, y, w = noisy_xyw
+        ys = np.column_stack([y, -y])
+        model = loess.LowessModel(x[:40], ys[:40], w[:40], 0.3)
+        model.update(x[40:], ys[40:], w[40:])
+        np.testing.assert_array_equal(model.result(), loess.lowess(x, ys, w, 0.3))
+
+
+class TestLowessAt:
+    """lowess_at: direct evaluation at arbitrary query points."""
+
+    def test_at_data_points_matches_lowess(self, noisy_xyw):
+        x, y, w = noisy_xyw
+        out = loess.lowess(x, y, w, 0.3)
+        np.testing.assert_allclose(
+            loess.lowess_at(x, y, w, 0.3, out[:, 0]), out[:, 1], rtol=1e-12
+        )
+
+    def test_linear_data_reproduced_between_points(self, simple_xy):
+        x, y, w = simple_xy
+        q = np.array([0.5, 2.25, 3.9])
+        np.testing.assert_allclose(loess.lowess_at(x, y, w, 0.6, q), q)
+
+    def test_matrix_shape(self, noisy_xyw):
+        x, y, w = noisy_xyw
+        q = np.linspace(0, 119, 7)
+        out = loess.lowess_at(x, np.column_stack([y, y]), w, 0.4, q)
+        assert out.shape == (7, 2)
+        np.testing.assert_array_equal(out[:, 0], out[:, 1])
+
+    def test_zero_weight_uses_nearest_y(self):
+        x, y = np.array([0.0, 1.0, 2.0]), np.array([1.0, 2.0, 3.0])
+        out = loess.lowess_at(x, y, np.array([0.0, 0.0, 1.0]), 0.67, [0.2])
+        assert out[0] == 1.0
+
 
 class TestLoess:
     """loess: dense curve on time grid."""
@@ -78,3 +181,312 @@ class TestLoess:
         weights = pd.Series([1.0, np.nan, 1.0, 1.0], index=dates_series.index)
         t, v = loess.loess(dates_series, values_series, frac=0.5, weights=weights)
         assert np.all(np.isfinite(v))
+
+    @pytest.mark.parametrize("grid", [2, 50, 400])
+    def test_direct_grid_size(self, dates_series, values_series, weights_series, grid):
+        t, v = loess.loess(
+            dates_series, values_series, frac=0.5, weights=weights_series, grid=grid
+        )
+        assert len(t) == len(v) == grid
+        assert t.min() == dates_series.min() and t.max() == dates_series.max()
+        assert np.all(np.isfinite(v))
+
+    def test_direct_grid_fewer_than_four_days(self):
+        dates = pd.Series(pd.to_datetime(["2025-10-01", "2025-10-01", "2025-10-20"]))
+        values = pd.Series([50.0, 54.0, 48.0])
+        t, v = loess.loess(dates, values, 1.0, pd.Series([1.0, 1.0, 1.0]), grid=20)
+        assert len(t) == 20
+        assert np.all(np.isfinite(v))
+
+    @pytest.mark.parametrize("grid", [None, 30])
+    def test_dataframe_values(self, dates_series, values_series, weights_series, grid):
+        frame = pd.DataFrame({"a": values_series, "b": 100 - values_series})
+        t, v = loess.loess(dates_series, frame, 0.5, weights_series, grid=grid)
+        assert isinstance(v, pd.DataFrame)
+        assert list(v.columns) == ["a", "b"]
+        assert len(v) == len(t)
+        _, single = loess.loess(dates_series, values_series, 0.5, weights_series, grid)
+        np.testing.assert_allclose(v["a"], single)
+        np.testing.assert_allclose(v["a"] + v["b"], 100)
+
+
+class TestLoessBootstrap:
+    """loess_bootstrap: percentile bands from resampled polls."""
+
+    def test_band_brackets_curve(self, dates_series, values_series, weights_series):
+        t, lo, hi = loess.loess_bootstrap(
+            dates_series,
+            values_series,
+            1.0,
+            weights_series,
+            n_boot=60,
+            grid=25,
+            processes=1,
+        )
+        t_fit, v = loess.loess(dates_series, values_series, 1.0, weights_series, 25)
+        pd.testing.assert_series_equal(pd.Series(t), pd.Series(t_fit))
+        assert isinstance(lo, pd.Series) and len(lo) == 25
+        assert np.all(lo <= hi)
+        assert np.all((lo <= v + 1e-9) & (v <= hi + 1e-9))
+
+    def test_deterministic_across_pool_sizes(self, noisy_xyw, monkeypatch):
+        x, y, w = noisy_xyw
+        dates = pd.Series(pd.Timestamp("2025-09-01") + pd.to_timedelta(x, unit="D"))
+        frame = pd.DataFrame({"yes": y, "no": 100 - y})
+        monkeypatch.setattr(loess, "_BOOT_CHUNK", 10)
+        args = (dates, frame, 0.4, pd.Series(w))
+        _, lo1, hi1 = loess.loess_bootstrap(*args, n_boot=30, processes=1)
+        _, lo2, hi2 = loess.loess_bootstrap(*args, n_boot=30, processes=2)
+        pd.testing.assert_frame_equal(lo1, lo2)
+        pd.testing.assert_frame_equal(hi1, hi2)
+        assert list(lo1.columns) == ["yes", "no"]
+
+    def test_sampling_error_widens_band(
+        self, dates_series, values_series, weights_series
+    ):
+        args = (dates_series, values_series, 1.0, weights_series)
+        _, lo, hi = loess.loess_bootstrap(*args, n_boot=200, grid=5)
+        _, lo_s, hi_s = loess.loess_bootstrap(
+            *args, n_boot=200, grid=5, sample_sizes=pd.Series([50.0] * 4)
+        )
+        assert (hi_s - lo_s).mean() > (hi - lo).mean()
+
+    def test_unknown_sample_sizes_add_no_error(
+        self, dates_series, values_series, weights_series
+    ):
+        args = (dates_series, values_series, 1.0, weights_series)
+        bands = []
+        for unknown in (np.nan, 0.0):
+            with np.errstate(all="raise"):
+                _, lo, hi = loess.loess_bootstrap(
+                    *args, n_boot=50, grid=5, sample_sizes=pd.Series([50, unknown] * 2)
+                )
+            bands.append((lo, hi))
+        for a, b in zip(*bands, strict=True):
+            pd.testing.assert_series_equal(a, b)
+        assert np.isfinite(bands[1][0]).all()
+
+    def test_batched_replicates_match_single_fits(self, noisy_xyw):
+        x, y, w = noisy_xyw
+        days = np.sort(x)
+        q = np.linspace(-5, 125, 40)
+        seed = np.random.SeedSequence(3)
+        reps = loess._bootstrap_chunk(days, y, w, None, 0.3, q, 5, seed)
+        idx = np.sort(np.random.default_rng(seed).integers(0, len(x), (5, len(x))), 1)
+        for r in range(5):
+            single = loess.lowess_at(days[idx[r]], y[idx[r]], w[idx[r]], 0.3, q)
+            np.testing.assert_allclose(reps[r], single, rtol=1e-12)
+
+
+class TestFracScores:
+    """frac_scores/select_frac: cross-validated bandwidth from the hat diagonal."""
+
+    @staticmethod
+    def _smoother(xs, ws, k):
+        eye = np.eye(len(xs))
+        return loess._local_fit(xs, eye, ws, k, xs, eye)
+
+    @pytest.mark.parametrize("frac", [0.05, 0.3, 1.0])
+    def test_hat_matches_smoother_matrix(self, noisy_xyw, frac):
+        x, y, w = noisy_xyw
+        o = np.argsort(x, kind="stable")
+        xs, ys, ws = x[o], y[o], w[o]
+        k = max(int(frac * len(x)), 2)
+        hat = np.empty(len(x))
+        fit = loess._local_fit(xs, ys, ws, k, xs, ys, hat=hat)
+        smoother = self._smoother(xs, ws, k)
+        np.testing.assert_allclose(hat, np.diag(smoother), atol=1e-12)
+        np.testing.assert_allclose(fit, smoother @ ys, atol=1e-9)
+
+    @pytest.mark.parametrize("criterion", ["gcv", "loocv"])
+    def test_scores_match_definition(self, noisy_xyw, criterion):
+        x, y, w = noisy_xyw
+        fracs = np.array([0.2, 0.5])
+        got = loess.frac_scores(x, y, w, fracs, criterion)
+        o = np.argsort(x, kind="stable")
+        xs, ys, ws = x[o], y[o], w[o]
+        for frac, score in zip(fracs, got):
+            h = self._smoother(xs, ws, int(frac * len(x)))
+            r, d = ys - h @ ys, np.diag(h)
+            expected = (
+                np.mean(ws * (r / (1 - d)) ** 2)
+                if criterion == "loocv"
+                else np.mean(ws * r**2) / (1 - d.mean()) ** 2
+            )
+            assert score == pytest.approx(expected, rel=1e-9)
+
+    def test_prefers_wide_window_for_a_line(self):
+        rng = np.random.default_rng(1)
+        x = rng.uniform(0, 100, 300)
+        y = 40 + 0.1 * x + rng.normal(0, 2, 300)
+        scores = loess.frac_scores(x, y, np.ones(300))
+        assert loess.FRACS[scores.argmin()] >= 0.5
+
+    def test_prefers_narrow_window_for_wiggles(self):
+        rng = np.random.default_rng(1)
+        x = rng.uniform(0, 100, 300)
+        y = np.column_stack([np.sin(x / 4), np.cos(x / 4)]) * 5
+        scores = loess.frac_scores(x, y + rng.normal(0, 1, (300, 2)), np.ones(300))
+        assert loess.FRACS[scores.argmin()] <= 0.2
+
+    def test_subsampled_points_close_to_full(self, noisy_xyw, monkeypatch):
+        x, y, w = noisy_xyw
+        full = loess.frac_scores(x, y, w)
+        monkeypatch.setattr(loess, "_CV_POINTS", 40)
+        np.testing.assert_allclose(loess.frac_scores(x, y, w), full, rtol=0.3)
+
+    def test_pool_matches_inline(self, noisy_xyw, monkeypatch):
+        x, y, w = noisy_xyw
+        monkeypatch.setattr(loess, "_POOL_MIN_ELEMS", 0)
+        np.testing.assert_array_equal(
+            loess.frac_scores(x, y, w, processes=2),
+            loess.frac_scores(x, y, w, processes=1),
+        )
+
+    def test_unknown_criterion(self, noisy_xyw):
+        with pytest.raises(ValueError, match="Unknown criterion"):
+            loess.frac_scores(*noisy_xyw, criterion="aic")
+
+    def test_select_frac(self, noisy_xyw):
+        x, y, w = noisy_xyw
+        dates = pd.Series(pd.Timestamp("2025-09-01") + pd.to_timedelta(x, unit="D"))
+        frame = pd.DataFrame({"yes": y, "no": 100 - y})
+        frac, scores = loess.select_frac(dates, frame, pd.Series(w))
+        assert list(scores.index) == list(loess.FRACS)
+        assert scores.name == "gcv"
+        assert frac == scores.idxmin()
+
+    def test_interpolating_fit_scores_inf(self, simple_xy):
+        x, y, w = simple_xy
+        scores = loess.frac_scores(x, y, w, np.array([0.1, 1.0]), "loocv")
+        assert scores[0] == np.inf and np.isfinite(scores[1])
+
+
+class TestLoessAsof:
+    """loess_asof: curve from the polls up to each cutoff, on a shared grid."""
+
+    @pytest.fixture
+    def polls(self, noisy_xyw):
+        x, y, w = noisy_xyw
+        w = np.where(np.arange(len(w)) % 9 == 0, np.nan, w)
+        dates = pd.Series(pd.Timestamp("2025-09-01") + pd.to_timedelta(x, unit="D"))
+        return dates, pd.Series(y), pd.Series(w)
+
+    def test_rows_match_fit_on_prefix(self, polls):
+        dates, y, w = polls
+        out = loess.loess_asof(dates, y, 0.3, w, processes=1)
+        assert list(out.index) == sorted(dates.unique())
+        assert out.columns[0] == dates.min() and out.columns[-1] == dates.max()
+        for cutoff in out.index[::7]:
+            seen = dates <= cutoff
+            days, ws = loess._loess_inputs(dates[seen], w[seen])
+            q = (out.columns[out.columns <= cutoff] - dates[seen].min()).days
+            expected = loess.lowess_at(days, y[seen].values, ws, 0.3, q)
+            row = out.loc[cutoff]
+            np.testing.assert_allclose(row.iloc[: len(q)], expected, rtol=1e-10)
+            assert row.iloc[len(q) :].isna().all()
+
+    def test_calendar_cutoffs(self, polls):
+        dates, y, w = polls
+        by_poll = loess.loess_asof(dates, y, 0.3, w, grid=30, processes=1)
+        days = pd.date_range("2025-08-01", dates.max(), freq="D")[::-1]
+        daily = loess.loess_asof(dates, y, 0.3, w, days, grid=30, processes=1)
+        assert daily.index.is_monotonic_increasing and daily.shape[1] == 30
+        assert daily.loc[: dates.min() - pd.Timedelta(days=1)].isna().all().all()
+        pd.testing.assert_frame_equal(daily.loc[by_poll.index], by_poll)
+        # A day without new polls extends the previous fit to later grid days.
+        gap = days[~days.isin(by_poll.index) & (days > dates.min())][-1]
+        before = by_poll.loc[:gap].iloc[-1].dropna()
+        np.testing.assert_array_equal(daily.loc[gap].iloc[: len(before)], before)
+
+    def test_frame_values(self, polls):
+        dates, y, w = polls
+        frame = pd.DataFrame({"yes": y, "no": 100 - y})
+        out = loess.loess_asof(dates, frame, 0.4, w, grid=20)
+        assert out.columns.get_level_values(0).unique().tolist() == ["yes", "no"]
+        assert out.columns.names == [None, "date"]
+        single = loess.loess_asof(dates, y, 0.4, w, grid=20)
+        pd.testing.assert_frame_equal(out["yes"], single)
+        np.testing.assert_allclose((out["yes"] + out["no"]).stack().dropna(), 100)
+
+    def test_pool_matches_inline(self, polls, monkeypatch):
+        dates, y, w = polls
+        monkeypatch.setattr(loess, "_ASOF_CHUNK", 10)
+        inline = loess.loess_asof(dates, y, 0.3, w, grid=25, processes=1)
+        pooled = loess.loess_asof(dates, y, 0.3, w, grid=25, processes=2)
+        pd.testing.assert_frame_equal(inline, pooled)
+
+    def test_no_cutoffs(self, polls):
+        dates, y, w = polls
+        none = pd.DatetimeIndex([])
+        assert loess.loess_asof(dates, y, 0.3, w, none, grid=5).shape == (0, 5)
+        frame = pd.DataFrame({"yes": y, "no": 100 - y})
+        assert loess.loess_asof(dates, frame, 0.3, w, none, grid=5).shape == (0, 10)
+
+    def test_all_weights_missing(self, polls):
+        dates, y, _ = polls
+        w = pd.Series(np.nan, index=y.index)
+        out = loess.loess_asof(dates, y, 0.3, w, grid=10)
+        ones = loess.loess_asof(dates, y, 0.3, pd.Series(1.0, index=y.index), grid=10)
+        pd.testing.assert_frame_equal(out, ones)
+
+
+class TestBackfit:
+    """backfit_days: house effects alternated with the lowess trend."""
+
+    @pytest.fixture
+    def leaning(self):
+        rng = np.random.default_rng(3)
+        n = 600
+        days = np.sort(rng.integers(0, 200, n))
+        codes = rng.choice(4, n, p=[0.55, 0.15, 0.15, 0.15])
+        codes[::50] = -1  # polls without an istituto
+        lean = np.array([2.0, -1.0, 0.5, -1.5])
+        y = 50 + 4 * np.sin(days / 40) + np.where(codes >= 0, lean[codes], 0)
+        y = y + rng.normal(0, 1, n)
+        w = rng.uniform(0.5, 2, n)
+        return days, np.column_stack([y, 100 - y]), w, codes, lean
+
+    def test_recovers_leans(self, leaning):
+        days, y, w, codes, lean = leaning
+        effects, iterations = loess.backfit_days(days, y, w, codes, 5, 0.3)
+        assert effects.shape == (5, 2) and iterations < loess._BACKFIT_ITER
+        np.testing.assert_allclose(effects[:4, 0], lean - lean.mean(), atol=0.25)
+        np.testing.assert_allclose(effects[:, 1], -effects[:, 0])
+        assert effects[:4].sum(axis=0) == pytest.approx([0, 0], abs=1e-9)
+        assert (effects[4] == 0).all()  # a code with no polls
+
+    def test_fixed_point(self, leaning):
+        days, y, w, codes, _ = leaning
+        effects, _ = loess.backfit_days(days, y[:, 0], w, codes, 4, 0.3)
+        adjusted = y[:, 0] - np.append(effects, 0)[codes]
+        trend = loess.lowess(days, adjusted, w, 0.3)[:, 1]
+        means = [
+            np.average(y[codes == g, 0] - trend[codes == g], weights=w[codes == g])
+            for g in range(4)
+        ]
+        np.testing.assert_allclose(
+            effects, means - np.mean(means), atol=10 * loess._BACKFIT_TOL
+        )
+
+    @pytest.mark.parametrize("reference", [0, 2])
+    def test_reference_group(self, leaning, reference):
+        days, y, w, codes, _ = leaning
+        centred, _ = loess.backfit_days(days, y, w, codes, 4, 0.3)
+        effects, iterations = loess.backfit_days(days, y, w, codes, 4, 0.3, reference)
+        assert iterations < loess._BACKFIT_ITER
+        assert (effects[reference] == 0).all()
+        np.testing.assert_allclose(
+            effects, centred - centred[reference], atol=100 * loess._BACKFIT_TOL
+        )
+
+    def test_reference_without_polls(self, leaning):
+        days, y, w, codes, _ = leaning
+        with pytest.raises(ValueError, match="Reference group 4 has no polls"):
+            loess.backfit_days(days, y, w, codes, 5, 0.3, reference=4)
+
+    def test_single_group_centred(self, leaning):
+        days, y, w, _, _ = leaning
+        codes = np.zeros(len(days), dtype=int)
+        effects, iterations = loess.backfit_days(days, y, w, codes, 1, 0.3)
+        assert (effects == 0).all() and iterations == 1
@@ -0,0 +1,99 @@
+"""Tests for the command line: option parsing and the per-step commands."""
+
+import warnings
+
+import pandas as pd
+import pytest
+
+import sondaggi.__main__ as cli
+import sondaggi.plot as plot
+from benchmarks.synthetic import synthetic_table
+
+
+class TestParser:
+    """Options keep their value whether given before or after the command."""
+
+    @pytest.mark.parametrize(
+        ("option", "command", "dest", "value"),
+        [
+            (["--force"], "clean", "force", True),
+            (["--cache-dir", "x"], "smooth", "cache_dir", cli.Path("x")),
+            (["--frac", "0.2"], "smooth", "frac", 0.2),
+            (["--history-dir", "h"], "fetch", "history_dir", cli.Path("h")),
+            (["-o", "p.png"], "plot", "output", cli.Path("p.png")),
+        ],
+    )
+    def test_option_before_or_after_command(self, option, command, dest, value):
+        parser = cli._parser()
+        before = parser.parse_args([*option, command])
+        after = parser.parse_args([command, *option])
+        assert getattr(before, dest) == getattr(after, dest) == value
+        assert before.command is after.command is getattr(cli, f"run_{command}")
+
+    @pytest.mark.parametrize("argv", [[], ["clean"], ["smooth"], ["plot"]])
+    def test_defaults(self, argv):
+        args = cli._parser().parse_args(argv)
+        assert args.force is False and args.cache_dir == cli.CACHE_DIR
+        assert args.frac == 0.4 and args.chunksize == 50_000
+
+    def test_command_help_shows_defaults(self, capsys):
+        with pytest.raises(SystemExit):
+            cli._parser().parse_args(["clean", "--help"])
+        assert "(default: 50000)" in capsys.readouterr().out
+
+
+class TestCommands:
+    """clean, smooth and plot hand their files to one another."""
+
+    @pytest.fixture
+    def workdir(self, tmp_path, monkeypatch):
+        monkeypatch.chdir(tmp_path)
+        synthetic_table(200).to_csv("raw.csv", index=False)
+        return tmp_path
+
+    @staticmethod
+    def run(*argv):
+        with warnings.catch_warnings():
+            warnings.simplefilter("ignore")
+            cli.main(cli._parser().parse_args(argv))
+
+    def test_steps(self, workdir):
+        self.run("clean", "--input", "raw.csv")
+        assert cli.CSV_CLEAN.exists() and cli.STORE_CLEAN.exists()
+        polls, _ = cli._read_clean()
+        self.run("smooth", "--frac", "0.5", "--house-effects")
+        frac, curves, house, _ = cli._read_curves()
+        assert frac == 0.5 and list(curves.columns) == ["date", "yes_norm", "no_norm"]
+        expected = plot.house_effects(polls, 0.5)
+        pd.testing.assert_frame_equal(house, expected, check_exact=False, atol=1e-9)
+        self.run("plot", "-o", "plot.png")
+        assert (workdir / "plot.png").exists()
+        self.run("smooth")
+        assert cli._read_curves()[2] is None and not cli.CSV_HOUSE.exists()
+
+    def test_whole_pipeline(self, workdir):
+        self.run("--input", "raw.csv", "--house-effects", "-o", "plot.png")
+        assert cli.CSV_CURVES.exists() and cli.CSV_HOUSE.exists()
+        assert (workdir / "plot.png").exists()
+
+    def test_unknown_reference(self, workdir):
+        self.run("clean", "--input", "raw.csv")
+        with pytest.raises(SystemExit, match="No polls by istituto 'Nope'"):
+            self.run("smooth", "--house-effects", "--house-reference", "Nope")
+
+    @pytest.mark.parametrize(
+        ("command", "missing"),
+        [
+            ("clean", cli.CSV_RAW),
+            ("smooth", cli.STORE_CLEAN),
+            ("plot", cli.STORE_CLEAN),
+        ],
+    )
+    def test_missing_input(self, workdir, command, missing):
+        with pytest.raises(SystemExit, match=f"No {missing}"):
+            self.run(command)
+
+    def test_plot_without_curves(self, workdir):
+        self.run("clean", "--input", "raw.csv")
+        with pytest.raises(SystemExit, match=f"No {cli.CSV_CURVES}"):
+            self.run("plot")
@@ -2,6 +2,7 @@
 
 import pytest
 
+import sondaggi.instrument as instrument
 import sondaggi.plot as plot
 
 
@@ -15,3 +16,89 @@ class TestPlotLoess:
         assert out.exists()
         if frac == 0.5:
             assert out.stat().st_size > 0
+
+    def test_plot_loess_direct_grid(self, clean_plot_minimal, tmp_path):
+        out = tmp_path / "plot.png"
+        plot.plot_loess(clean_plot_minimal, frac=0.5, output_path=out, grid=100)
+        assert out.exists()
+
+    @pytest.mark.parametrize("sampling_error", [False, True])
+    def test_plot_loess_bootstrap_bands(
+        self, clean_plot_minimal, tmp_path, sampling_error
+    ):
+        out = tmp_path / "plot.png"
+        plot.plot_loess(
+            clean_plot_minimal,
+            frac=0.8,
+            output_path=out,
+            n_boot=20,
+            sampling_error=sampling_error,
+        )
+        assert out.exists()
+
+    def test_plot_loess_precomputed_curves(self, clean_plot_minimal, tmp_path):
+        curves = plot.loess_curves(clean_plot_minimal, frac=0.8, n_boot=10)
+        assert list(curves.columns[:3]) == ["date", "yes_norm", "no_norm"]
+        assert {"yes_norm_lower", "no_norm_upper"} <= set(curves.columns)
+        out = tmp_path / "plot.png"
+        plot.plot_loess(clean_plot_minimal, frac=0.8, output_path=out, curves=curves)
+        assert out.exists()
+
+    def test_plot_loess_shows_without_path(self, clean_plot_minimal, monkeypatch):
+        shown = []
+        monkeypatch.setattr("matplotlib.pyplot.show", lambda: shown.append(True))
+        plot.plot_loess(clean_plot_minimal, frac=0.8)
+        assert shown == [True]
+
+    def test_plot_loess_profiled_stages(self, clean_plot_minimal, tmp_path):
+        with instrument.Profiler() as profiler:
+            plot.plot_loess(
+                clean_plot_minimal, frac=0.8, output_path=tmp_path / "p.png", n_boot=5
+            )
+        assert [r["stage"] for r in profiler.records] == [
+            "loess",
+            "bootstrap",
+            "savefig",
+        ]
+        assert profiler.records[0]["rows_in"] == len(clean_plot_minimal)
+
+    def test_auto_frac(self, clean_plot_minimal):
+        frac, scores = plot.auto_frac(clean_plot_minimal, "loocv")
+        assert frac in scores.index
+        assert scores.name == "loocv"
+
+    def test_asof_curves(self, clean_plot_minimal):
+        out = plot.asof_curves(clean_plot_minimal, frac=0.8)
+        assert list(out.columns) == ["cutoff", "date", "yes_norm", "no_norm"]
+        assert (out["date"] <= out["cutoff"]).all()
+        assert set(out["cutoff"]) == set(clean_plot_minimal["date"])
+        last = out[out["cutoff"] == out["cutoff"].max()]
+        assert last["date"].min() == clean_plot_minimal["date"].min()
+
+    def test_plot_loess_missing_sample_sizes(self, clean_plot_minimal, tmp_path):
+        df = clean_plot_minimal.assign(
+            sample_size=clean_plot_minimal["sample_size"].mask(lambda s: s > 700)
+        )
+        out = tmp_path / "plot.png"
+        plot.plot_loess(df, frac=0.8, output_path=out)
+        assert out.exists()
+
+    def test_house_effects(self, clean_plot_minimal, tmp_path):
+        house = plot.house_effects(clean_plot_minimal, frac=0.8)
+        assert list(house.index) == ["A", "B"] and house.index.name == "istituto"
+        assert house["polls"].tolist() == [3, 2]
+        assert house[["yes_norm", "no_norm"]].sum().abs().max() < 1e-9
+        assert house.attrs["iterations"] >= 1
+        relative = plot.house_effects(clean_plot_minimal, frac=0.8, reference="B")
+        assert relative.loc["B", "yes_norm"] == 0
+        assert relative.loc["A", "yes_norm"] == pytest.approx(
+            house.loc["A", "yes_norm"] - house.loc["B", "yes_norm"], abs=1e-3
+        )
+        with pytest.raises(ValueError, match="No polls by istituto 'Z'"):
+            plot.house_effects(clean_plot_minimal, frac=0.8, reference="Z")
+        corrected = plot.loess_curves(clean_plot_minimal, frac=0.8, house=house)
+        raw = plot.loess_curves(clean_plot_minimal, frac=0.8)
+        assert not corrected["yes_norm"].equals(raw["yes_norm"])
+        out = tmp_path / "plot.png"
+        plot.plot_loess(clean_plot_minimal, frac=0.8, output_path=out, house=house)
+        assert out.exists()
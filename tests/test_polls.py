@@ -0,0 +1,103 @@
+"""Tests for polls module: the compact Polls container."""
+
+import numpy as np
+import pandas as pd
+
+import sondaggi.loess as loess
+import sondaggi.plot as plot
+import sondaggi.polls as polls
+
+
+class TestPolls:
+    """Typed, sorted arrays with the LOESS weights precomputed."""
+
+    def test_typed_and_sorted(self, clean_plot_minimal):
+        df = clean_plot_minimal.iloc[[3, 0, 4, 1, 2]]
+        p = polls.Polls.from_frame(df)
+        assert len(p) == 5
+        assert p.day.dtype == np.int32 and p.sample_size.dtype == np.int32
+        assert p.values.dtype == p.margin.dtype == p.weights.dtype == np.float32
+        assert (np.diff(p.day) > 0).all()
+        assert p.order.tolist() == [1, 3, 4, 0, 2]
+        assert p.start == pd.Timestamp("2025-10-01")
+        assert p.day[0] == (pd.Timestamp("2025-10-01") - pd.Timestamp(0)).days
+        assert list(p.pollsters[p.pollster]) == ["A", "B", "A", "B", "A"]
+        np.testing.assert_array_equal(
+            p.share("no_norm"), clean_plot_minimal["no_norm"].to_numpy(np.float32)
+        )
+
+    def test_weights_match_loess_inputs(self, clean_plot_minimal):
+        sizes = clean_plot_minimal["sample_size"].mask(lambda s: s > 850)
+        p = polls.Polls.from_frame(clean_plot_minimal.assign(sample_size=sizes))
+        _, w = loess._loess_inputs(clean_plot_minimal["date"], sizes)
+        np.testing.assert_allclose(p.weights, w, rtol=1e-6)
+        assert p.weighted
+        assert np.isnan(p.sample_sizes()).sum() == 2
+
+    def test_missing_columns(self, clean_plot_minimal):
+        p = polls.Polls.from_frame(clean_plot_minimal[["date", *polls.SHARES]])
+        assert not p.weighted
+        assert (p.weights == len(p)).all()
+        assert (p.pollster == -1).all() and np.isnan(p.margin).all()
+
+    def test_round_trip(self, clean_df):
+        df = polls.Polls.from_frame(clean_df).to_frame()
+        expected = clean_df.sort_values("date", kind="stable", ignore_index=True)
+        assert list(df.columns) == list(clean_df.columns)
+        assert df["istituto"].tolist() == expected["istituto"].tolist()
+        assert (df["date"] == expected["date"]).all()
+        np.testing.assert_allclose(df["yes_norm"], expected["yes_norm"], rtol=1e-6)
+
+    def test_house_offsets(self, clean_plot_minimal):
+        df = clean_plot_minimal.assign(istituto=["A", "B", None, "C", "A"])
+        p = polls.Polls.from_frame(df)
+        effects = pd.DataFrame(
+            {"polls": [2, 1], "yes_norm": [1.5, -2.0], "no_norm": [-1.5, 2.0]},
+            index=pd.Index(["A", "B"], name="istituto"),
+        )
+        np.testing.assert_array_equal(
+            p.house_offsets(effects)[:, 0], [1.5, -2.0, 0, 0, 1.5]
+        )
+
+    def test_to_dates(self, clean_plot_minimal):
+        p = polls.Polls.from_frame(clean_plot_minimal)
+        t = p.to_dates(p.day[0] + np.array([0, 0.5, 14]))
+        assert list(t) == [
+            pd.Timestamp("2025-10-01"),
+            pd.Timestamp("2025-10-01 12:00"),
+            pd.Timestamp("2025-10-15"),
+        ]
+
+
+class TestPollsInPlot:
+    """plot functions take Polls as they take the DataFrame."""
+
+    def test_curves_match_frame(self, clean_plot_minimal):
+        p = polls.Polls.from_frame(clean_plot_minimal)
+        assert plot.as_polls(p) is p
+        from_polls = plot.loess_curves(p, 0.8, n_boot=10)
+        pd.testing.assert_frame_equal(
+            from_polls, plot.loess_curves(clean_plot_minimal, 0.8, n_boot=10)
+        )
+        t, smooth = loess.loess(
+            clean_plot_minimal["date"],
+            clean_plot_minimal[list(polls.SHARES)],
+            0.8,
+            clean_plot_minimal["sample_size"],
+        )
+        np.testing.assert_allclose(from_polls[list(polls.SHARES)], smooth, rtol=1e-6)
+        assert (abs(from_polls["date"] - t) < pd.Timedelta(1, "us")).all()
+
+    def test_asof_matches_loess_asof(self, clean_plot_minimal):
+        p = polls.Polls.from_frame(clean_plot_minimal.iloc[::-1])
+        cols = list(polls.SHARES)
+        expected = loess.loess_asof(
+            clean_plot_minimal["date"],
+            clean_plot_minimal[cols],
+            0.8,
+            clean_plot_minimal["sample_size"],
+        )
+        got = plot.asof_fits(p, 0.8)
+        assert got.index.equals(expected.index)
+        assert got.columns.equals(expected.columns)
+        np.testing.assert_allclose(got, expected, rtol=1e-6)
@@ -0,0 +1,66 @@
+"""Tests for store module: write_store, read_store, read_columns."""
+
+import json
+
+import numpy as np
+import pandas as pd
+import pytest
+
+import sondaggi.store as store
+
+
+class TestStore:
+    """Round trip of the clean table through the columnar store."""
+
+    def test_round_trip_typed(self, clean_df, tmp_path):
+        path = tmp_path / "clean.store"
+        store.write_store(clean_df, path)
+        df = store.read_store(path)
+        assert list(df.columns) == list(clean_df.columns)
+        assert df["date"].dtype == "datetime64[s]"
+        assert isinstance(df["istituto"].dtype, pd.CategoricalDtype)
+        assert (df["yes_norm"].dtype, df["sample_size"].dtype) == ("f4", "f4")
+        assert (df["date"] == clean_df["date"]).all()
+        assert df["istituto"].tolist() == clean_df["istituto"].tolist()
+        np.testing.assert_allclose(df["no_norm"], clean_df["no_norm"], rtol=1e-6)
+
+    def test_mmap_zero_copy(self, clean_df, tmp_path):
+        store.write_store(clean_df, tmp_path / "s")
+        cols = store.read_columns(tmp_path / "s", ["yes_norm", "date"])
+        assert isinstance(cols["yes_norm"], np.memmap)
+        base = store.read_store(tmp_path / "s", ["yes_norm"])["yes_norm"].to_numpy()
+        while base is not None and not isinstance(base, np.memmap):
+            base = base.base
+        assert base is not None
+        assert not isinstance(
+            store.read_columns(tmp_path / "s", mmap=False)["no_norm"], np.memmap
+        )
+
+    def test_missing_values_and_overwrite(self, clean_df, tmp_path):
+        path = tmp_path / "s"
+        store.write_store(clean_df, path)
+        clean_df.loc[1, ["istituto", "sample_size"]] = [np.nan, np.nan]
+        store.write_store(clean_df.iloc[:2], path)
+        df = store.read_store(path)
+        assert len(df) == 2
+        assert pd.isna(df.loc[1, "istituto"]) and np.isnan(df.loc[1, "sample_size"])
+        assert sorted(p.name for p in tmp_path.iterdir()) == ["s"]
+
+    def test_non_ascii_categories_utf8(self, clean_df, tmp_path):
+        names = ["Società Ëuropea", "Ipsos"] * len(clean_df)
+        clean_df["istituto"] = names[: len(clean_df)]
+        store.write_store(clean_df, tmp_path / "s")
+        schema = (tmp_path / "s" / store.SCHEMA_FILE).read_bytes()
+        assert "Società Ëuropea".encode() in schema
+        assert (
+            store.read_store(tmp_path / "s")["istituto"].tolist()
+            == clean_df["istituto"].tolist()
+        )
+
+    def test_version_mismatch(self, clean_df, tmp_path):
+        store.write_store(clean_df, tmp_path / "s")
+        schema_path = tmp_path / "s" / store.SCHEMA_FILE
+        schema = json.loads(schema_path.read_text())
+        schema_path.write_text(json.dumps(schema | {"version": 0}))
+        with pytest.raises(ValueError, match="version"):
+            store.read_store(tmp_path / "s")